@@ -0,0 +1,380 @@
+"""Callable analyses that compute features and save their plots.
+
+Each analysis is split in two steps. Its compute step takes a decoded
+signal, computes the feature through the shared feature engine and cache,
+and returns the plot data reduced to what the figure can show: waveforms
+decimated to about two points per pixel, and spectrogram and MFCC images
+pooled along time to one column per pixel of the figure's width, so that
+the data sent to a renderer stays small whatever the length of the file.
+Its draw step renders that data on a pre-styled figure template.
+``prepare_file`` runs the compute steps of a file and ``render_analysis``
+the draw step of one analysis, so that the batch runner can render in a
+separate pool; ``analyse_file`` does both in-process.
+"""
+
+import logging
+import os
+import numpy as np
+
+from .catalogue import catalogue_key
+from .config import (
+    get_resampler,
+    get_sample_rate,
+    get_setting,
+    output_config,
+)
+from .envelopes import amplitude_envelope
+from .logging import log_context, stage
+from .feature_store import write_features
+from .features import FeatureEngine, amplitude_to_db, cached_features
+from .decimation import decimate, decimate_signal, pool_frames
+from .matplotlib_plots import (
+    configure_plot,
+    create_custom_colormap,
+    style_colorbar,
+    template_points,
+    template_width,
+)
+from .parameters import (
+    DEFAULT_ENVELOPE_FRAME_SIZE,
+    DEFAULT_ENVELOPE_HOP_LENGTH,
+    DEFAULT_N_MFCC,
+    ORIGINAL_SIGNAL_COLOR,
+    AMPLITUDE_ENVELOPE_COLOR,
+    RMS_ENERGY_COLOR,
+)
+from .rendering import render_figure
+from .utils import load_audio_file
+
+
+def output_stem(audio_file_path, audio_dir=None):
+    """Return the name of the outputs of an audio file, without prefix.
+
+    The name is the catalogue key of the file, with its relative directory
+    joined by underscores, so that files in subdirectories or sharing a
+    name but for their extension never write to the same outputs. Files
+    outside of the audio directory are named relative to their own
+    directory.
+
+    Args:
+        audio_file_path (str): The path to the audio file.
+        audio_dir (str): The audio directory. Defaults to the AUDIO_DIR
+            setting.
+    """
+    if audio_dir is None:
+        audio_dir = get_setting("AUDIO_DIR")
+    if os.path.relpath(audio_file_path, audio_dir).startswith(os.pardir):
+        audio_dir = os.path.dirname(audio_file_path)
+    return catalogue_key(audio_file_path, audio_dir).replace("/", "_")
+
+
+def output_name(audio_file_path, analysis, audio_dir=None):
+    """Return the output file name of an analysis of an audio file."""
+    return f"{ANALYSES[analysis][1]}_{output_stem(audio_file_path, audio_dir)}"
+
+
+def output_path(audio_file_path, analysis, audio_dir=None):
+    """Return the path of the figure saved by an analysis."""
+    analysis_type = ANALYSES[analysis][0]
+    file_name = output_name(audio_file_path, analysis, audio_dir)
+    return output_config.get_output_path(analysis_type, file_name)
+
+
+def arrays_path(audio_file_path, audio_dir=None):
+    """Return the path of the feature store of an audio file."""
+    return output_config.get_output_path(
+        "arrays", output_stem(audio_file_path, audio_dir), "h5"
+    )
+
+
+def _waveform_data(y, sr, t_frames, curve, label, color, audio_file_path):
+    """Return the plot data of a waveform with a frame-level curve."""
+    n_points = template_points("signal")
+    time, signal = decimate_signal(y, sr, n_points)
+    t_frames, curve = decimate(curve, n_points, x=t_frames, method="lttb")
+    return {
+        "title": os.path.basename(audio_file_path),
+        "subtitle": f"Original Signal and {label}",
+        "time": time,
+        "signal": signal,
+        "t_frames": t_frames,
+        "curve": curve,
+        "label": label,
+        "color": color,
+    }
+
+
+def _envelope(audio_file_path, y, sr):
+    """Return the amplitude envelope through the feature cache."""
+    return output_config.feature_cache.get_or_compute(
+        audio_file_path,
+        lambda: {"envelope": amplitude_envelope(y)},
+        feature="envelope",
+        sr=sr,
+        frame_size=DEFAULT_ENVELOPE_FRAME_SIZE,
+        hop_length=DEFAULT_ENVELOPE_HOP_LENGTH,
+        res_type=get_resampler(),
+    )["envelope"]
+
+
+def compute_envelope(audio_file_path, y, sr, engine):
+    """Compute the amplitude envelope."""
+    import librosa
+
+    envelope = _envelope(audio_file_path, y, sr)
+    t_frames = librosa.frames_to_time(
+        np.arange(len(envelope)),
+        sr=sr,
+        hop_length=DEFAULT_ENVELOPE_HOP_LENGTH,
+    )
+    return _waveform_data(
+        y,
+        sr,
+        t_frames,
+        envelope,
+        "Amplitude Envelope",
+        AMPLITUDE_ENVELOPE_COLOR,
+        audio_file_path,
+    )
+
+
+def compute_rms(audio_file_path, y, sr, engine):
+    """Compute the RMS energy."""
+    rms_energy = cached_features(
+        audio_file_path, y, sr, features=("rms",), engine=engine
+    )["rms"]
+    return _waveform_data(
+        y,
+        sr,
+        engine.frame_times(),
+        rms_energy,
+        "RMS Energy",
+        RMS_ENERGY_COLOR,
+        audio_file_path,
+    )
+
+
+def compute_spectrogram(audio_file_path, y, sr, engine):
+    """Compute the spectrogram in dB, pooled to the figure's width."""
+    D = cached_features(
+        audio_file_path, y, sr, features=("spectrogram",), engine=engine
+    )["spectrogram"]
+    # dB is monotonic and its reference is the maximum, so max pooling the
+    # magnitude first gives the pooled dB image
+    D, factor = pool_frames(D, template_width("image"), method="max")
+    return {
+        "title": os.path.basename(audio_file_path),
+        "image": amplitude_to_db(D, ref=np.max),
+        "sr": sr,
+        "hop_length": engine.hop_length * factor,
+    }
+
+
+def compute_mfcc(audio_file_path, y, sr, engine):
+    """Compute the MFCCs, pooled to the figure's width."""
+    mfccs = cached_features(
+        audio_file_path,
+        y,
+        sr,
+        features=("mfcc",),
+        n_mfcc=DEFAULT_N_MFCC,
+        engine=engine,
+    )["mfcc"]
+    mfccs, factor = pool_frames(mfccs, template_width("image"), "mean")
+    return {
+        "title": os.path.basename(audio_file_path),
+        "image": mfccs,
+        "sr": sr,
+        "hop_length": engine.hop_length * factor,
+    }
+
+
+def draw_waveform(template, data):
+    """Draw a waveform with a frame-level curve on top."""
+    ax = template.ax
+    ax.plot(
+        data["time"],
+        data["signal"],
+        color=ORIGINAL_SIGNAL_COLOR,
+        label="Original Signal",
+    )
+    ax.plot(
+        data["t_frames"],
+        data["curve"],
+        color=data["color"],
+        label=data["label"],
+    )
+    configure_plot(ax, title=data["title"], subtitle=data["subtitle"])
+
+
+def draw_spectrogram(template, data):
+    """Draw a log-frequency spectrogram."""
+    import librosa.display
+
+    img = librosa.display.specshow(
+        data["image"],
+        sr=data["sr"],
+        hop_length=data["hop_length"],
+        x_axis="time",
+        y_axis="log",
+        ax=template.ax,
+    )
+    cbar = template.figure.colorbar(img, cax=template.cax, format="%+2.0f dB")
+    style_colorbar(cbar)
+    configure_plot(template.ax, title=data["title"], subtitle="Spectrogram")
+
+
+def draw_mfcc(template, data):
+    """Draw MFCCs with the custom colormap."""
+    import librosa.display
+
+    img = librosa.display.specshow(
+        data["image"],
+        sr=data["sr"],
+        hop_length=data["hop_length"],
+        x_axis="time",
+        ax=template.ax,
+        cmap=create_custom_colormap(),
+    )
+    style_colorbar(template.figure.colorbar(img, cax=template.cax))
+    configure_plot(template.ax, title=data["title"], subtitle="MFCCs")
+
+
+# Analyses by name:
+# (analysis type, output prefix, compute step, draw step, figure template)
+ANALYSES = {
+    "envelope": (
+        "time_domain",
+        "AE",
+        compute_envelope,
+        draw_waveform,
+        "signal",
+    ),
+    "rms": ("time_domain", "RMS", compute_rms, draw_waveform, "signal"),
+    "spectrogram": (
+        "frequency_domain",
+        "Spectrogram",
+        compute_spectrogram,
+        draw_spectrogram,
+        "image",
+    ),
+    "mfcc": ("frequency_domain", "MFCC", compute_mfcc, draw_mfcc, "image"),
+}
+
+
+def analysis_arrays(analysis, audio_file_path, y, sr, engine):
+    """Return the full feature array of an analysis for the feature store.
+
+    Returns:
+        tuple: The frames, time along the last axis, and their parameters.
+    """
+    if analysis == "envelope":
+        return _envelope(audio_file_path, y, sr), {
+            "sr": sr,
+            "hop_length": DEFAULT_ENVELOPE_HOP_LENGTH,
+            "frame_size": DEFAULT_ENVELOPE_FRAME_SIZE,
+        }
+    frames = cached_features(
+        audio_file_path,
+        y,
+        sr,
+        features=(analysis,),
+        n_mfcc=DEFAULT_N_MFCC,
+        engine=engine,
+    )[analysis]
+    return frames, {
+        "sr": sr,
+        "hop_length": engine.hop_length,
+        "n_fft": engine.n_fft,
+    }
+
+
+def _check_analyses(analyses):
+    unknown = set(analyses) - set(ANALYSES)
+    if unknown:
+        raise ValueError(f"Unknown analyses: {sorted(unknown)}")
+
+
+def prepare_file(
+    audio_file_path,
+    analyses=tuple(ANALYSES),
+    audio_dir=None,
+    store_arrays=False,
+):
+    """Decode an audio file once and compute the plot data of analyses.
+
+    Each analysis runs at the sample rate declared for it in
+    ``ANALYSIS_SAMPLE_RATES``. The analyses sharing a rate share one
+    signal and feature engine, and each rate is resampled at most once.
+
+    Args:
+        audio_file_path (str): The path to the audio file.
+        analyses (tuple): The names of the analyses to run.
+        audio_dir (str): The audio directory outputs are named relative to.
+            Defaults to the AUDIO_DIR setting.
+        store_arrays (bool): Whether to also save the full feature arrays
+            of the analyses in the feature store of the file.
+
+    Returns:
+        list: An ``(analysis, data, output_path)`` tuple per analysis, ready
+        for ``render_analysis``.
+    """
+    _check_analyses(analyses)
+    with log_context(audio_file_path):
+        logging.info(f"Analysing {audio_file_path}: {', '.join(analyses)}")
+        signals = {}
+        prepared = []
+        arrays = {}
+        for analysis in analyses:
+            target_sr = get_sample_rate(analysis)
+            if target_sr not in signals:
+                y, sr = load_audio_file(audio_file_path, sr=target_sr)
+                signals[target_sr] = (y, sr, FeatureEngine(y, sr))
+            y, sr, engine = signals[target_sr]
+            with stage(f"compute.{analysis}"):
+                data = ANALYSES[analysis][2](audio_file_path, y, sr, engine)
+            prepared.append(
+                (
+                    analysis,
+                    data,
+                    output_path(audio_file_path, analysis, audio_dir),
+                )
+            )
+            if store_arrays:
+                arrays[analysis] = analysis_arrays(
+                    analysis, audio_file_path, y, sr, engine
+                )
+        if arrays:
+            with stage("save_arrays"):
+                write_features(
+                    arrays_path(audio_file_path, audio_dir),
+                    audio_file_path,
+                    arrays,
+                )
+        return prepared
+
+
+def render_analysis(analysis, data, output_path):
+    """Render the plot data of an analysis on its figure template."""
+    _, _, _, draw, kind = ANALYSES[analysis]
+    return render_figure(draw, data, output_path, kind)
+
+
+def analyse_file(audio_file_path, analyses=tuple(ANALYSES), audio_dir=None):
+    """Decode an audio file once, run the given analyses and save the plots.
+
+    Args:
+        audio_file_path (str): The path to the audio file.
+        analyses (tuple): The names of the analyses to run.
+        audio_dir (str): The audio directory outputs are named relative to.
+            Defaults to the AUDIO_DIR setting.
+
+    Returns:
+        dict: The path of the saved figure of each analysis.
+    """
+    return {
+        analysis: render_analysis(analysis, data, path)
+        for analysis, data, path in prepare_file(
+            audio_file_path, analyses, audio_dir
+        )
+    }
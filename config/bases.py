@@ -0,0 +1,94 @@
+"""Precomputed windows, filterbanks and DCT bases of the spectral features.
+
+Every STFT needs its analysis window, every mel spectrogram its mel
+filterbank and every MFCC its DCT basis. librosa builds them again on each
+call, which costs more than the transforms themselves for short clips and
+for the per-hop frames of the real-time analyser. The functions here build
+each basis once per parameter set and return the same read-only array on
+later calls, for up to ``BASIS_CACHE_SIZE`` parameter sets each.
+
+The mel filterbank has about 1.5% non-zero weights at the default
+parameters, so ``project_mel`` applies it as a sparse matrix, which is
+several times faster than the dense product. Set ``SPARSE_MEL_BASIS`` to
+False to use the dense filterbank.
+"""
+
+import functools
+import numpy as np
+
+from .parameters import BASIS_CACHE_SIZE, SPARSE_MEL_BASIS
+
+
+def _read_only(array):
+    """Protect a shared basis from being modified in place."""
+    array.setflags(write=False)
+    return array
+
+
+@functools.lru_cache(maxsize=BASIS_CACHE_SIZE)
+def stft_window(n_fft, window="hann"):
+    """Return the periodic analysis window of an STFT, as librosa's."""
+    import librosa
+
+    return _read_only(
+        librosa.filters.get_window(window, n_fft, fftbins=True).astype(
+            np.float32
+        )
+    )
+
+
+@functools.lru_cache(maxsize=BASIS_CACHE_SIZE)
+def mel_basis(sr, n_fft, n_mels=128):
+    """Return the mel filterbank of ``librosa.filters.mel``."""
+    import librosa
+
+    return _read_only(librosa.filters.mel(sr=sr, n_fft=n_fft, n_mels=n_mels))
+
+
+@functools.lru_cache(maxsize=BASIS_CACHE_SIZE)
+def sparse_mel_basis(sr, n_fft, n_mels=128):
+    """Return the mel filterbank as a sparse CSR matrix."""
+    import scipy.sparse
+
+    return scipy.sparse.csr_matrix(mel_basis(sr, n_fft, n_mels))
+
+
+@functools.lru_cache(maxsize=BASIS_CACHE_SIZE)
+def dct_basis(n_mfcc, n_mels=128):
+    """Return the orthonormal DCT-II rows applied by librosa's MFCC."""
+    import scipy.fft
+
+    basis = scipy.fft.dct(np.eye(n_mels), type=2, norm="ortho", axis=0)
+    return _read_only(basis[:n_mfcc].astype(np.float32))
+
+
+def project_mel(power, sr, n_fft, n_mels=128, sparse=SPARSE_MEL_BASIS):
+    """Project power spectrograms on the mel filterbank.
+
+    Args:
+        power (np.ndarray): The power spectrogram, of shape (..., bins,
+            frames).
+        sr (int): The sampling rate of the audio.
+        n_fft (int): The length of the windowed signal for FFT.
+        n_mels (int): The number of mel bands.
+        sparse (bool): Whether to apply the sparse filterbank.
+
+    Returns:
+        np.ndarray: The mel spectrogram, of shape (..., n_mels, frames).
+    """
+    if not sparse:
+        return np.matmul(mel_basis(sr, n_fft, n_mels), power)
+
+    basis = sparse_mel_basis(sr, n_fft, n_mels)
+    if power.ndim == 2:
+        return basis @ power
+    # Line up the frames of every spectrogram for a single sparse product
+    frames = np.moveaxis(power, -2, 0)
+    mel = basis @ frames.reshape(frames.shape[0], -1)
+    mel = mel.reshape((n_mels,) + frames.shape[1:])
+    return np.ascontiguousarray(np.moveaxis(mel, 0, -2))
+
+
+def mfcc_from_log_mel(log_mel, n_mfcc):
+    """Return the MFCCs of log-mel spectrograms as ``librosa.feature.mfcc``."""
+    return np.matmul(dct_basis(n_mfcc, log_mel.shape[-2]), log_mel)
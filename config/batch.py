@@ -0,0 +1,156 @@
+"""Parallel batch analysis over the audio directory.
+
+``run_batch`` plans the work from the audio catalogue of the AUDIO_DIR
+setting, skips the files whose outputs are newer than the audio, and
+computes the selected analyses on the rest across a process pool, longest
+files first.
+Each file is decoded once per batch, in the worker that analyses it. The
+figures are rendered headless in a separate ``RenderPool`` as soon as the
+plot data of a file is ready, so rendering overlaps with computation.
+"""
+
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .analyses import ANALYSES, arrays_path, output_path, prepare_file
+from .config import audio_config, get_setting
+from .feature_store import stored_features
+from .logging import worker_initializer
+from .rendering import RenderPool
+
+
+def pending_analyses(
+    audio_file_path, analyses, audio_dir=None, store_arrays=False
+):
+    """Return the analyses whose output is missing or older than the audio.
+
+    With ``store_arrays``, analyses whose feature arrays are missing from
+    the feature store of the file are pending as well. ``audio_dir``, the
+    directory outputs are named relative to, defaults to the AUDIO_DIR
+    setting.
+    """
+    source_mtime = os.path.getmtime(audio_file_path)
+    stored = []
+    if store_arrays:
+        stored = stored_features(
+            arrays_path(audio_file_path, audio_dir), audio_file_path
+        )
+    pending = []
+    for analysis in analyses:
+        path = output_path(audio_file_path, analysis, audio_dir)
+        if (
+            not os.path.exists(path)
+            or os.path.getmtime(path) < source_mtime
+            or (store_arrays and analysis not in stored)
+        ):
+            pending.append(analysis)
+    return pending
+
+
+def run_batch(
+    analyses=tuple(ANALYSES),
+    audio_dir=None,
+    workers=None,
+    force=False,
+    render_workers=None,
+    store_arrays=False,
+):
+    """Run analyses over every audio file in a directory.
+
+    Args:
+        analyses (tuple): The names of the analyses to run.
+        audio_dir (str): The directory to search for audio files.
+            Defaults to the AUDIO_DIR setting.
+        workers (int): The number of worker processes. Defaults to the
+            number of CPUs.
+        force (bool): Whether to rerun analyses whose outputs are up to date.
+        render_workers (int): The number of figure rendering processes.
+            Defaults to the number of CPUs.
+        store_arrays (bool): Whether to also save the full feature arrays
+            of every file in its feature store.
+
+    Returns:
+        dict: A summary with the "done", "skipped" and "failed" files.
+    """
+    unknown = set(analyses) - set(ANALYSES)
+    if unknown:
+        raise ValueError(f"Unknown analyses: {sorted(unknown)}")
+
+    if audio_dir is None:
+        audio_dir = get_setting("AUDIO_DIR")
+
+    # Plan from the catalogue, longest files first, so that the pool is not
+    # left waiting on one long file at the end of the batch.
+    catalogue = audio_config.catalogue_for(audio_dir)
+    catalogue.update()
+    entries = catalogue.filter(order_by="duration", descending=True)
+
+    summary = {"done": [], "skipped": [], "failed": []}
+    jobs = {}
+    for audio_file_path in (entry["path"] for entry in entries):
+        if force:
+            pending = list(analyses)
+        else:
+            pending = pending_analyses(
+                audio_file_path, analyses, audio_dir, store_arrays
+            )
+        if pending:
+            jobs[audio_file_path] = pending
+        else:
+            summary["skipped"].append(audio_file_path)
+
+    logging.info(
+        f"Batch: {len(jobs)} files to analyse, "
+        f"{len(summary['skipped'])} up to date"
+    )
+    if not jobs:
+        return summary
+
+    failed = {}
+    with ProcessPoolExecutor(
+        max_workers=workers, **worker_initializer()
+    ) as executor, RenderPool(render_workers) as render_pool:
+        futures = {
+            executor.submit(
+                prepare_file, path, pending, audio_dir, store_arrays
+            ): path
+            for path, pending in jobs.items()
+        }
+        renders = {}
+        for future in as_completed(futures):
+            audio_file_path = futures[future]
+            try:
+                prepared = future.result()
+            except Exception as e:
+                failed[audio_file_path] = e
+                continue
+            for analysis, data, path in prepared:
+                draw, kind = ANALYSES[analysis][3:]
+                render = render_pool.submit(draw, data, path, kind)
+                renders[render] = audio_file_path
+
+        for render in as_completed(renders):
+            audio_file_path = renders[render]
+            try:
+                render.result()
+            except Exception as e:
+                failed.setdefault(audio_file_path, e)
+
+    for audio_file_path in jobs:
+        if audio_file_path in failed:
+            summary["failed"].append(audio_file_path)
+            logging.error(
+                f"Error analysing {audio_file_path}: "
+                f"{failed[audio_file_path]}"
+            )
+        else:
+            summary["done"].append(audio_file_path)
+            logging.info(f"Analysed {audio_file_path}")
+
+    logging.info(
+        f"Batch finished: {len(summary['done'])} done, "
+        f"{len(summary['skipped'])} skipped, "
+        f"{len(summary['failed'])} failed"
+    )
+    return summary
@@ -0,0 +1,271 @@
+"""Offline benchmarking of the analysis hot paths.
+
+Benchmarks run on synthetic signals generated here, so they need neither
+the audio collection nor a network connection and give the same input on
+every machine and commit. Each benchmark reports its wall time over a few
+repeats and the peak memory allocated during one extra traced run.
+
+Results of a run are stored as JSON under ``BENCHMARK_DIR``, one file per
+commit, so that ``compare_results`` can report the regressions between two
+commits.
+"""
+
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess  # nosec B404 - only runs git
+import time
+import tracemalloc
+import numpy as np
+
+from .logging import unmeasured
+from .paths import BASE_DIR
+
+# Samples generated at once by synthetic_signal
+_SYNTHESIS_BLOCK = 2**20
+
+# Fields identifying a benchmark across runs
+BENCHMARK_KEYS = ("case", "duration", "sr", "n_fft", "hop_length")
+
+
+def synthetic_signal(duration, sr, seed=0):
+    """Generate a deterministic test signal resembling music.
+
+    The signal mixes a swept tone with harmonics, a slow tremolo and some
+    noise, so that spectra, envelopes and MFCCs are not degenerate. It is
+    generated block by block in float32 to keep hour-long signals cheap.
+
+    Args:
+        duration (float): The length of the signal in seconds.
+        sr (int): The sampling rate.
+        seed (int): The seed of the noise.
+
+    Returns:
+        np.ndarray: The signal, in float32.
+    """
+    n_samples = int(duration * sr)
+    y = np.empty(n_samples, dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    for start in range(0, n_samples, _SYNTHESIS_BLOCK):
+        stop = min(start + _SYNTHESIS_BLOCK, n_samples)
+        t = np.arange(start, stop) / sr
+        # Sweep the fundamental between 110 Hz and 880 Hz every 10 seconds
+        phase = 2 * np.pi * (110 * t + 385 * (t - np.sin(0.2 * np.pi * t)))
+        block = (
+            sum(np.sin(k * phase) / k**1.5 for k in range(1, 6))
+            * 0.3
+            * (1 + 0.5 * np.sin(2 * np.pi * 3 * t))
+        )
+        block += 0.01 * rng.standard_normal(len(t))
+        y[start:stop] = block
+    return y
+
+
+def measure(func, repeat=3):
+    """Time a call and measure the peak memory it allocates.
+
+    Args:
+        func (callable): The call to measure, without arguments.
+        repeat (int): The number of timed calls.
+
+    Returns:
+        dict: The minimum and median wall time in seconds over the timed
+        calls, and the peak memory in bytes allocated by an extra call
+        traced with tracemalloc.
+    """
+    # Stage instrumentation would add its own overhead to the timings
+    with unmeasured():
+        # Warm up lazy imports and caches so that they are not timed
+        func()
+
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+
+        # Tracing slows allocations down, so memory is measured separately
+        tracemalloc.start()
+        try:
+            baseline = tracemalloc.get_traced_memory()[0]
+            func()
+            peak = tracemalloc.get_traced_memory()[1] - baseline
+        finally:
+            tracemalloc.stop()
+
+    return {
+        "time_min": min(times),
+        "time_median": statistics.median(times),
+        "peak_bytes": peak,
+        "repeat": repeat,
+    }
+
+
+def git_commit():
+    """Return the short hash of the checked out commit and whether the
+    working tree has uncommitted changes."""
+    try:
+        commit = subprocess.run(  # nosec B603 B607
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        status = subprocess.run(  # nosec B603 B607
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+    return commit, bool(status.strip())
+
+
+def environment_info():
+    """Return the versions and machine details a run depends on."""
+    import librosa
+    import matplotlib
+
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "librosa": librosa.__version__,
+        "matplotlib": matplotlib.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def results_path(benchmark_dir, commit):
+    """Return the path of the results of a commit."""
+    return os.path.join(benchmark_dir, f"{commit}.json")
+
+
+def save_results(results, benchmark_dir, commit=None):
+    """Store the results of a run under the current commit.
+
+    Args:
+        results (list): The result of each benchmark as a dict.
+        benchmark_dir (str): The directory of the stored results.
+        commit (str): The name to store the results under. Defaults to the
+            short hash of the checked out commit, suffixed with "-dirty"
+            if the working tree has uncommitted changes.
+
+    Returns:
+        str: The path of the results file.
+    """
+    head, dirty = git_commit()
+    if commit is None:
+        commit = f"{head}-dirty" if dirty else head
+    os.makedirs(benchmark_dir, exist_ok=True)
+    path = results_path(benchmark_dir, commit)
+    with open(path, "w") as results_file:
+        json.dump(
+            {
+                "commit": commit,
+                "git_head": head,
+                "dirty": dirty,
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "environment": environment_info(),
+                "results": results,
+            },
+            results_file,
+            indent=2,
+        )
+    logging.info(f"Benchmark results saved to {path}")
+    return path
+
+
+def load_results(path_or_commit, benchmark_dir):
+    """Load stored results from a file path or a commit name."""
+    path = path_or_commit
+    if not os.path.exists(path):
+        path = results_path(benchmark_dir, path_or_commit)
+    with open(path) as results_file:
+        return json.load(results_file)
+
+
+def compare_results(baseline, current, threshold=0.1):
+    """Compare the benchmarks two runs have in common.
+
+    Times are compared on their minimum over the repeats, which is the
+    least sensitive to noise from other processes.
+
+    Args:
+        baseline (dict): The stored results to compare against.
+        current (dict): The new results.
+        threshold (float): The relative slowdown or memory growth above
+            which a benchmark is reported as a regression.
+
+    Returns:
+        list: A dict per common benchmark with its time and memory ratios
+        (current / baseline) and whether it regressed.
+    """
+
+    def by_key(run):
+        return {
+            tuple(result[key] for key in BENCHMARK_KEYS): result
+            for result in run["results"]
+        }
+
+    before, after = by_key(baseline), by_key(current)
+    comparison = []
+    for key in sorted(before.keys() & after.keys(), key=str):
+        old, new = before[key], after[key]
+        time_ratio = new["time_min"] / max(old["time_min"], 1e-9)
+        memory_ratio = new["peak_bytes"] / max(old["peak_bytes"], 1)
+        comparison.append(
+            {
+                **dict(zip(BENCHMARK_KEYS, key)),
+                "time_ratio": time_ratio,
+                "memory_ratio": memory_ratio,
+                "regression": time_ratio > 1 + threshold
+                or memory_ratio > 1 + threshold,
+            }
+        )
+    return comparison
+
+
+def format_table(rows, columns):
+    """Format dicts as a plain text table with the given columns.
+
+    Missing values, given as None, are shown as "-".
+    """
+
+    def cell(value):
+        if value is None:
+            return "-"
+        if isinstance(value, float):
+            return f"{value:.4g}"
+        return str(value)
+
+    cells = [[cell(row[column]) for column in columns] for row in rows]
+    widths = [
+        max([len(column)] + [len(line[i]) for line in cells])
+        for i, column in enumerate(columns)
+    ]
+    lines = [
+        "  ".join(
+            column.ljust(width) for column, width in zip(columns, widths)
+        )
+    ]
+    lines.append("  ".join("-" * width for width in widths))
+    for row, line in zip(rows, cells):
+        lines.append(
+            "  ".join(
+                # Text is aligned left and numbers right
+                (
+                    value.ljust(width)
+                    if isinstance(row[column], str)
+                    else value.rjust(width)
+                )
+                for column, value, width in zip(columns, line, widths)
+            )
+        )
+    return "\n".join(lines)
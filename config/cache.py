@@ -0,0 +1,213 @@
+"""Content-addressed on-disk cache for computed features.
+
+Entries are keyed on the SHA-256 of the audio file content together with
+the analysis parameters, so a cached feature is reused for as long as
+neither the audio nor the parameters change, even if the file is renamed
+or moved. Arrays are stored as ``.npy`` files and returned memory-mapped.
+
+The cache is kept below a size cap by evicting the least recently used
+entries. Every hit refreshes the modification time of its entry, which is
+the recency used for eviction. Each process keeps a running total of the
+cache size, scanned once and then updated by its own writes and
+evictions, and only scans the entries again when the total goes over the
+cap. Eviction then trims the cache to ``EVICTION_TARGET`` of the cap, so
+that a full cache is scanned once per that much newly written data rather
+than on every write.
+"""
+
+import functools
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import numpy as np
+
+_HASH_CHUNK_SIZE = 2**20
+
+# Fraction of the size cap that eviction trims the cache to
+EVICTION_TARGET = 0.9
+
+
+@functools.lru_cache(maxsize=1024)
+def _file_hash(audio_file_path, size, mtime_ns):
+    """Hash the content of a file, memoised on its size and mtime."""
+    digest = hashlib.sha256()
+    with open(audio_file_path, "rb") as audio_file:
+        for chunk in iter(lambda: audio_file.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_hash(audio_file_path):
+    """Return the SHA-256 of a file's content."""
+    stat = os.stat(audio_file_path)
+    return _file_hash(
+        os.path.abspath(audio_file_path), stat.st_size, stat.st_mtime_ns
+    )
+
+
+class FeatureCache:
+    """On-disk feature cache with a size cap and LRU eviction.
+
+    Args:
+        cache_dir (str): The directory holding the cache entries.
+        max_bytes (int): The size cap of the cache. A cap of 0 disables the
+            cache.
+    """
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        # Running total of the size of the cache, None until scanned
+        self._total = None
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def key(self, audio_file_path, **params):
+        """Build the cache key for a file and a set of parameters."""
+        payload = json.dumps(
+            {"content": file_hash(audio_file_path), "params": params},
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def get(self, key):
+        """Return the memory-mapped arrays of an entry, or None on a miss."""
+        entry_dir = self._entry_dir(key)
+        if not os.path.isdir(entry_dir):
+            return None
+        try:
+            arrays = {
+                os.path.splitext(name)[0]: _load(os.path.join(entry_dir, name))
+                for name in os.listdir(entry_dir)
+                if name.endswith(".npy")
+            }
+            os.utime(entry_dir)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Discarding unreadable cache entry {key}: {e}")
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            return None
+        return arrays
+
+    def put(self, key, arrays):
+        """Store arrays under a key and return them memory-mapped."""
+        entry_dir = self._entry_dir(key)
+        os.makedirs(os.path.dirname(entry_dir), exist_ok=True)
+
+        # Write into a temporary directory first so that concurrent readers
+        # never see a partially written entry.
+        tmp_dir = tempfile.mkdtemp(
+            prefix=".tmp-", dir=os.path.dirname(entry_dir)
+        )
+        try:
+            for name, array in arrays.items():
+                np.save(os.path.join(tmp_dir, f"{name}.npy"), array)
+            size = _dir_size(tmp_dir)
+            os.replace(tmp_dir, entry_dir)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if not os.path.isdir(entry_dir):
+                raise
+        else:
+            if self._total is not None:
+                self._total += size
+
+        if self._total is None or self._total > self.max_bytes:
+            self.evict()
+        return self.get(key) or arrays
+
+    def remove(self, key):
+        """Remove an entry from the cache."""
+        entry_dir = self._entry_dir(key)
+        if self._total is not None and os.path.isdir(entry_dir):
+            self._total -= _dir_size(entry_dir)
+        shutil.rmtree(entry_dir, ignore_errors=True)
+
+    def get_or_compute(self, audio_file_path, compute, **params):
+        """Return cached arrays, computing and storing them on a miss.
+
+        Args:
+            audio_file_path (str): The path to the analysed audio file.
+            compute (callable): Returns a dict of arrays to cache.
+            **params: The analysis parameters the arrays depend on.
+
+        Returns:
+            dict: The arrays keyed by name.
+        """
+        if not self.enabled:
+            return compute()
+
+        key = self.key(audio_file_path, **params)
+        arrays = self.get(key)
+        if arrays is not None:
+            logging.info(f"Feature cache hit for {audio_file_path}")
+            return arrays
+
+        logging.info(f"Feature cache miss for {audio_file_path}")
+        return self.put(key, compute())
+
+    def _entries(self):
+        """List (mtime, size, path) for every entry in the cache."""
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for prefix in os.scandir(self.cache_dir):
+            if not prefix.is_dir():
+                continue
+            for entry in os.scandir(prefix.path):
+                if not entry.is_dir() or entry.name.startswith("."):
+                    continue
+                entries.append(
+                    (entry.stat().st_mtime, _dir_size(entry.path), entry.path)
+                )
+        return entries
+
+    def size(self):
+        """Return the total size of the cache in bytes."""
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """Remove least recently used entries until under the eviction target.
+
+        Scans every entry, and resets the running total of the cache size
+        to what the scan found, which includes the entries written by
+        other processes.
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            self._total = total
+            return
+        for _, size, path in entries:
+            if total <= self.max_bytes * EVICTION_TARGET:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            logging.info(f"Evicted feature cache entry: {path}")
+        self._total = total
+
+    def clear(self):
+        """Remove every entry from the cache."""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        self._total = 0
+
+
+def _dir_size(path):
+    """Return the total size of the files of a directory."""
+    return sum(f.stat().st_size for f in os.scandir(path) if f.is_file())
+
+
+def _load(path):
+    """Load an array memory-mapped, falling back for empty arrays."""
+    try:
+        return np.load(path, mmap_mode="r")
+    except ValueError:
+        return np.load(path)
@@ -0,0 +1,320 @@
+"""Catalogue of the audio files in the audio directory.
+
+The catalogue reads the duration, sample rate, channel count, codec and
+size of every audio file from its header, without decoding any audio, and
+keeps them in a local SQLite index. ``update`` only reads the headers of
+files that are new or whose size or modification time changed since the
+last scan, and drops files that no longer exist.
+
+Files are identified by their path relative to the audio directory,
+without the extension, e.g. ``"sax-baritone_a3"`` or ``"live/set_1"``.
+Files sharing that path but for their extension, such as ``a.wav`` and
+``a.mp3``, keep the extension in their keys (``"a.wav"`` and ``"a.mp3"``)
+so that each has its own entry. The short aliases of ``AUDIO_FILES`` are
+looked up separately, before the catalogue.
+"""
+
+import functools
+import logging
+import os
+import sqlite3
+
+from .paths import AUDIO_DIR, CATALOGUE_PATH
+
+# File extensions recognised as audio
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".flac", ".ogg", ".aiff", ".aif", ".m4a")
+
+_COLUMNS = (
+    "key",
+    "path",
+    "size",
+    "mtime_ns",
+    "duration",
+    "sample_rate",
+    "channels",
+    "frames",
+    "codec",
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS audio_files (
+    key TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    duration REAL,
+    sample_rate INTEGER,
+    channels INTEGER,
+    frames INTEGER,
+    codec TEXT
+);
+CREATE INDEX IF NOT EXISTS audio_files_duration ON audio_files (duration);
+"""
+
+
+def discover_audio_files(audio_dir=AUDIO_DIR, extensions=AUDIO_EXTENSIONS):
+    """Return the sorted paths of every audio file under a directory."""
+    audio_files = []
+    for root, _, file_names in os.walk(audio_dir):
+        for file_name in file_names:
+            if file_name.lower().endswith(extensions):
+                audio_files.append(os.path.join(root, file_name))
+    return sorted(audio_files)
+
+
+def _relative_key(audio_file_path, audio_dir):
+    """Return the path of a file relative to a directory, as a key."""
+    rel_path = os.path.relpath(audio_file_path, audio_dir)
+    return rel_path.replace(os.sep, "/")
+
+
+def catalogue_keys(audio_file_paths, audio_dir=AUDIO_DIR):
+    """Map audio files to their catalogue keys.
+
+    A file is keyed by its path relative to ``audio_dir`` without the
+    extension, unless other files of the list share that key; all of them
+    are then keyed with their extension.
+
+    Returns:
+        dict: The key of every path.
+    """
+    by_stem = {}
+    for audio_file_path in audio_file_paths:
+        key = _relative_key(audio_file_path, audio_dir)
+        by_stem.setdefault(os.path.splitext(key)[0], []).append(
+            (audio_file_path, key)
+        )
+    keys = {}
+    for stem, files in by_stem.items():
+        for audio_file_path, key in files:
+            keys[audio_file_path] = stem if len(files) == 1 else key
+    return keys
+
+
+@functools.lru_cache(maxsize=64)
+def _audio_names(directory, mtime_ns):
+    """Group the audio files of a directory by stem, memoised on its mtime.
+
+    Adding, removing or renaming a file changes the modification time of
+    its directory, which lists it again.
+    """
+    names = {}
+    for name in os.listdir(directory):
+        if name.lower().endswith(AUDIO_EXTENSIONS):
+            names.setdefault(os.path.splitext(name)[0], []).append(name)
+    return names
+
+
+def catalogue_key(audio_file_path, audio_dir):
+    """Return the catalogue key of one audio file.
+
+    Gives the key ``catalogue_keys`` gives the file among the audio files
+    of its directory, so the key keeps the extension if another audio
+    file of the same directory shares its name but for the extension.
+    """
+    directory, file_name = os.path.split(audio_file_path)
+    names = []
+    if os.path.isdir(directory or "."):
+        mtime_ns = os.stat(directory or ".").st_mtime_ns
+        names = _audio_names(directory or ".", mtime_ns).get(
+            os.path.splitext(file_name)[0], []
+        )
+    siblings = [os.path.join(directory, name) for name in names]
+    if audio_file_path not in siblings:
+        siblings.append(audio_file_path)
+    return catalogue_keys(siblings, audio_dir)[audio_file_path]
+
+
+def read_header(audio_file_path):
+    """Read the stream properties of an audio file from its header.
+
+    Returns:
+        dict: The duration, sample rate, channels, frames and codec.
+    """
+    import soundfile as sf
+
+    try:
+        info = sf.info(audio_file_path)
+        return {
+            "duration": info.duration,
+            "sample_rate": info.samplerate,
+            "channels": info.channels,
+            "frames": info.frames,
+            "codec": f"{info.format}/{info.subtype}",
+        }
+    except RuntimeError:
+        # Formats libsndfile cannot open are probed by audioread, which
+        # asks the backend for the stream properties without decoding.
+        import audioread
+
+        with audioread.audio_open(audio_file_path) as audio_file:
+            extension = os.path.splitext(audio_file_path)[1].lstrip(".")
+            return {
+                "duration": audio_file.duration,
+                "sample_rate": audio_file.samplerate,
+                "channels": audio_file.channels,
+                "frames": round(audio_file.duration * audio_file.samplerate),
+                "codec": extension.upper(),
+            }
+
+
+class AudioCatalogue:
+    """SQLite index of the audio files in a directory.
+
+    Args:
+        index_path (str): The path to the SQLite index.
+        audio_dir (str): The directory to catalogue.
+    """
+
+    def __init__(self, index_path=CATALOGUE_PATH, audio_dir=AUDIO_DIR):
+        self.index_path = index_path
+        self.audio_dir = audio_dir
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        connection = sqlite3.connect(self.index_path)
+        connection.row_factory = sqlite3.Row
+        connection.executescript(_SCHEMA)
+        return connection
+
+    def key_for(self, audio_file_path):
+        """Return the catalogue key of an audio file."""
+        return catalogue_key(audio_file_path, self.audio_dir)
+
+    def update(self):
+        """Bring the index up to date with the audio directory.
+
+        Returns:
+            dict: The number of "added", "updated", "removed" and
+            "unchanged" files.
+        """
+        counts = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+        with self._connect() as connection:
+            known = {
+                row["key"]: (row["size"], row["mtime_ns"])
+                for row in connection.execute(
+                    "SELECT key, size, mtime_ns FROM audio_files"
+                )
+            }
+            seen = set()
+            audio_files = discover_audio_files(self.audio_dir)
+            keys = catalogue_keys(audio_files, self.audio_dir)
+            for audio_file_path in audio_files:
+                key = keys[audio_file_path]
+                seen.add(key)
+                stat = os.stat(audio_file_path)
+                if known.get(key) == (stat.st_size, stat.st_mtime_ns):
+                    counts["unchanged"] += 1
+                    continue
+                try:
+                    header = read_header(audio_file_path)
+                except Exception as e:
+                    logging.error(
+                        f"Could not read header of {audio_file_path}: {e}"
+                    )
+                    continue
+                connection.execute(  # nosec B608 - fixed column names
+                    f"INSERT OR REPLACE INTO audio_files "
+                    f"({', '.join(_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(_COLUMNS))})",
+                    (
+                        key,
+                        audio_file_path,
+                        stat.st_size,
+                        stat.st_mtime_ns,
+                        header["duration"],
+                        header["sample_rate"],
+                        header["channels"],
+                        header["frames"],
+                        header["codec"],
+                    ),
+                )
+                counts["updated" if key in known else "added"] += 1
+
+            removed = set(known) - seen
+            connection.executemany(
+                "DELETE FROM audio_files WHERE key = ?",
+                [(key,) for key in removed],
+            )
+            counts["removed"] = len(removed)
+        connection.close()
+        logging.info(f"Audio catalogue updated: {counts}")
+        return counts
+
+    def get(self, key):
+        """Return the catalogue entry of a key, or None if unknown."""
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT * FROM audio_files WHERE key = ?", (key,)
+            ).fetchone()
+        connection.close()
+        return dict(row) if row else None
+
+    def filter(
+        self,
+        min_duration=None,
+        max_duration=None,
+        sample_rate=None,
+        channels=None,
+        codec=None,
+        order_by="key",
+        descending=False,
+    ):
+        """Return the catalogue entries matching every given filter.
+
+        Args:
+            min_duration (float): The minimum duration in seconds.
+            max_duration (float): The maximum duration in seconds.
+            sample_rate (int): The exact sample rate.
+            channels (int): The exact number of channels.
+            codec (str): A substring of the codec, e.g. "WAV" or "MPEG".
+            order_by (str): The column to sort by.
+            descending (bool): Whether to sort in descending order.
+
+        Returns:
+            list: The matching entries as dicts.
+        """
+        if order_by not in _COLUMNS:
+            raise ValueError(f"Unknown catalogue column: {order_by}")
+
+        clauses, values = [], []
+        for clause, value in (
+            ("duration >= ?", min_duration),
+            ("duration <= ?", max_duration),
+            ("sample_rate = ?", sample_rate),
+            ("channels = ?", channels),
+            ("codec LIKE ?", None if codec is None else f"%{codec}%"),
+        ):
+            if value is not None:
+                clauses.append(clause)
+                values.append(value)
+
+        query = "SELECT * FROM audio_files"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        # order_by is checked against the known columns above
+        direction = "DESC" if descending else "ASC"
+        query += f" ORDER BY {order_by} {direction}"  # nosec B608
+
+        with self._connect() as connection:
+            rows = connection.execute(query, values).fetchall()
+        connection.close()
+        return [dict(row) for row in rows]
+
+    def shards(self, n_shards, **filters):
+        """Split the matching files into shards of similar total duration.
+
+        Files are assigned longest first to the shard with the least
+        duration so far.
+
+        Returns:
+            list: ``n_shards`` lists of catalogue entries.
+        """
+        shards = [[] for _ in range(n_shards)]
+        totals = [0.0] * n_shards
+        entries = self.filter(order_by="duration", descending=True, **filters)
+        for entry in entries:
+            shard = totals.index(min(totals))
+            shards[shard].append(entry)
+            totals[shard] += entry["duration"] or 0.0
+        return shards
@@ -0,0 +1,178 @@
+"""Multi-channel analysis of stereo and multi-channel sources.
+
+The analyses load audio downmixed to mono, which loses the difference
+between channels. ``channel_features`` decodes a file once without
+downmixing, through the store of decoded audio, and computes the features
+of every channel in a single vectorized pass over a (channels, samples)
+array: the envelope frames every row at once and ``FeatureEngine`` takes
+one STFT of all channels.
+
+The channels can be analysed as they are, downmixed to mono, or as the
+mid (L + R) / 2 and side (L - R) / 2 signals of a stereo source, which
+separates the centre of the mix from its stereo width.
+"""
+
+import logging
+import numpy as np
+
+from .config import get_sample_rate
+from .envelopes import amplitude_envelope
+from .features import FeatureEngine
+from .parameters import DEFAULT_N_FFT, DEFAULT_HOP_LENGTH, DEFAULT_N_MFCC
+from .utils import load_analysis_audio
+
+# Channel layouts supported by split_channels
+CHANNEL_LAYOUTS = ("channels", "mono", "mid_side")
+
+# Features computed by channel_features
+CHANNEL_FEATURES = ("envelope", "rms", "spectrogram", "mfcc")
+
+# Columns of the channel loudness table
+LOUDNESS_COLUMNS = ("channel", "rms_dbfs", "peak_rms_dbfs", "peak_dbfs")
+
+# Centred RMS frames at either end of a signal that read zero padding
+_EDGE_FRAMES = -(-DEFAULT_N_FFT // 2 // DEFAULT_HOP_LENGTH)
+
+# Rows mixing a stereo pair into its mid and side signals
+_MID_SIDE = np.array([[0.5, 0.5], [0.5, -0.5]], dtype=np.float32)
+
+
+def channel_names(n_channels, layout="channels"):
+    """Return the names of the rows ``split_channels`` returns."""
+    if layout == "mono":
+        return ["mono"]
+    if layout == "mid_side":
+        return ["mid", "side"]
+    if n_channels == 1:
+        return ["mono"]
+    if n_channels == 2:
+        return ["left", "right"]
+    return [f"channel_{index}" for index in range(n_channels)]
+
+
+def split_channels(y, layout="channels"):
+    """Arrange a decoded signal as one row per analysed channel.
+
+    Args:
+        y (np.ndarray): The signal, of shape (samples,) for mono sources or
+            (channels, samples) as loaded with ``mono=False``.
+        layout (str): "channels" for each channel as is, "mono" for the
+            downmix of ``librosa.to_mono`` or "mid_side" for the mid and
+            side signals of a stereo source.
+
+    Returns:
+        tuple: The float32 (rows, samples) array and the name of each row.
+    """
+    if layout not in CHANNEL_LAYOUTS:
+        raise ValueError(f"Unknown channel layout: {layout}")
+
+    y = np.atleast_2d(np.asarray(y, dtype=np.float32))
+    if layout == "mono":
+        rows = y.mean(axis=0, keepdims=True)
+    elif layout == "mid_side":
+        if y.shape[0] != 2:
+            raise ValueError(
+                f"Mid/side needs a stereo source, got {y.shape[0]} channels"
+            )
+        rows = _MID_SIDE @ y
+    else:
+        rows = y
+    return rows, channel_names(y.shape[0], layout)
+
+
+def channel_features(
+    audio_file_path,
+    features=CHANNEL_FEATURES,
+    layout="channels",
+    n_mfcc=DEFAULT_N_MFCC,
+    envelope_mode="max",
+):
+    """Compute features of every channel of a file in one pass.
+
+    The file is decoded once, then loaded without downmixing at the sample
+    rate of each analysis, and every feature is computed for all channels
+    at once. Analyses at the same sample rate share one STFT.
+
+    Args:
+        audio_file_path (str): The path to the audio file.
+        features (tuple): Any of "envelope", "rms", "spectrogram" and
+            "mfcc".
+        layout (str): The channel layout, as in ``split_channels``.
+        n_mfcc (int): The number of MFCCs to return.
+        envelope_mode (str): The mode of ``amplitude_envelope``.
+
+    Returns:
+        tuple: The channel names, and a dict of the features keyed by name,
+        each with a leading channel axis.
+    """
+    unknown = set(features) - set(CHANNEL_FEATURES)
+    if unknown:
+        raise ValueError(f"Unknown channel features: {sorted(unknown)}")
+
+    by_rate = {}
+    for feature in features:
+        by_rate.setdefault(get_sample_rate(feature), []).append(feature)
+
+    names, results = None, {}
+    for group in by_rate.values():
+        y, sr = load_analysis_audio(audio_file_path, group[0], mono=False)
+        rows, names = split_channels(y, layout)
+        engine = FeatureEngine(rows, sr)
+        for feature in group:
+            if feature == "envelope":
+                results[feature] = amplitude_envelope(rows, mode=envelope_mode)
+            elif feature == "rms":
+                results[feature] = engine.rms()
+            elif feature == "spectrogram":
+                results[feature] = engine.spectrogram()
+            else:
+                results[feature] = engine.mfcc(n_mfcc=n_mfcc)
+    logging.info(
+        f"Computed {', '.join(features)} of {audio_file_path} for "
+        f"channels {', '.join(names)}"
+    )
+    return names, results
+
+
+def _dbfs(amplitude):
+    """Convert an amplitude relative to full scale to dBFS."""
+    return float(20 * np.log10(max(float(amplitude), 1e-10)))
+
+
+def channel_loudness(names, rms, envelope=None, edge_frames=_EDGE_FRAMES):
+    """Summarise the loudness of each channel.
+
+    The overall RMS level averages the power of the frames that lie
+    wholly within the signal, since the centred frames at either end
+    partly read the zero padding around it.
+
+    Args:
+        names (list): The channel names.
+        rms (np.ndarray): The RMS energy frames of each channel, as
+            computed by ``FeatureEngine.rms``.
+        envelope (np.ndarray): The absolute amplitude envelope of each
+            channel, as computed with ``envelope_mode="abs"``, for its
+            sample peak, or None.
+        edge_frames (int): The number of frames at either end that read
+            zero padding.
+
+    Returns:
+        list: A dict per channel with its overall RMS level, the level of
+        its loudest RMS frame and its sample peak, in dBFS.
+    """
+    if rms.shape[-1] > 2 * edge_frames:
+        interior = rms[..., edge_frames:-edge_frames]
+    else:
+        interior = rms
+    rows = []
+    for index, name in enumerate(names):
+        row = {
+            "channel": name,
+            "rms_dbfs": _dbfs(np.sqrt(np.mean(np.square(interior[index])))),
+            "peak_rms_dbfs": _dbfs(rms[index].max()),
+            "peak_dbfs": None,
+        }
+        if envelope is not None:
+            row["peak_dbfs"] = _dbfs(envelope[index].max())
+        rows.append(row)
+    return rows
@@ -1,25 +1,71 @@
+import functools
+import hashlib
 import os
-from dotenv import load_dotenv
-from .paths import (
-    BASE_DIR,
-    DATA_DIR,
-    OUTPUT_DIR,
-    AUDIO_DIR,
-    AUDIO_FILES,
-    OUTPUT_DIRS,
-)
+from . import paths, parameters
+from .paths import AUDIO_FILES, OUTPUT_DIRS
 
 # from .parameters import *
 
-# Load environment variables from a .env file
-load_dotenv()
+# Settings that can be overridden with environment variables, and their
+# defaults. They are resolved on first access, so that importing this module
+# neither reads the .env file nor touches the file system.
+_SETTINGS = {
+    "BASE_DIR": paths.BASE_DIR,
+    "DATA_DIR": paths.DATA_DIR,
+    "OUTPUT_DIR": paths.OUTPUT_DIR,
+    "AUDIO_DIR": paths.AUDIO_DIR,
+    "FEATURE_CACHE_DIR": paths.FEATURE_CACHE_DIR,
+    "DECODED_AUDIO_DIR": paths.DECODED_AUDIO_DIR,
+    "SPECTROGRAM_TILES_DIR": paths.SPECTROGRAM_TILES_DIR,
+    "CATALOGUE_PATH": paths.CATALOGUE_PATH,
+    "BENCHMARK_DIR": paths.BENCHMARK_DIR,
+    "SIMILARITY_INDEX_PATH": paths.SIMILARITY_INDEX_PATH,
+    "FEATURE_CACHE_MAX_BYTES": parameters.FEATURE_CACHE_MAX_BYTES,
+    "DECODED_AUDIO_MAX_BYTES": parameters.DECODED_AUDIO_MAX_BYTES,
+    "MEMORY_BUDGET_BYTES": parameters.MEMORY_BUDGET_BYTES,
+    "RESAMPLE_QUALITY": parameters.RESAMPLE_QUALITY,
+    "SERVICE_CACHE_MAX_BYTES": parameters.SERVICE_CACHE_MAX_BYTES,
+}
 
 
-# Override default paths with environment variables if provided
-BASE_DIR = os.getenv("BASE_DIR", BASE_DIR)
-DATA_DIR = os.getenv("DATA_DIR", DATA_DIR)
-OUTPUT_DIR = os.getenv("OUTPUT_DIR", OUTPUT_DIR)
-AUDIO_DIR = os.getenv("AUDIO_DIR", AUDIO_DIR)
+@functools.lru_cache(maxsize=None)
+def load_environment():
+    """Load environment variables from a .env file, once per process."""
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+
+def get_setting(name):
+    """Return a setting, overridden by the environment if provided."""
+    load_environment()
+    default = _SETTINGS[name]
+    return type(default)(os.getenv(name, default))
+
+
+def __getattr__(name):
+    # Resolve the settings lazily when imported as module attributes
+    if name in _SETTINGS:
+        return get_setting(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def get_resampler(quality=None):
+    """Return the librosa resampler of a quality, "fast" or "high".
+
+    Defaults to the RESAMPLE_QUALITY setting.
+    """
+    quality = quality or get_setting("RESAMPLE_QUALITY")
+    if quality not in parameters.RESAMPLERS:
+        raise ValueError(f"Unknown resampling quality: {quality}")
+    return parameters.RESAMPLERS[quality]
+
+
+def get_sample_rate(analysis):
+    """Return the sample rate an analysis runs at, None for native."""
+    if analysis not in parameters.ANALYSIS_SAMPLE_RATES:
+        raise ValueError(f"No sample rate declared for analysis: {analysis}")
+    return parameters.ANALYSIS_SAMPLE_RATES[analysis]
 
 
 def get_output_path(analysis_type, file_name, extension="png"):
@@ -28,18 +74,83 @@ def get_output_path(analysis_type, file_name, extension="png"):
     output_dir = OUTPUT_DIRS.get(analysis_type)
     if not output_dir:
         raise ValueError(f"Unknown analysis type: {analysis_type}")
+    os.makedirs(output_dir, exist_ok=True)
     return os.path.join(output_dir, f"{file_name}.{extension}")
 
 
 class AudioConfig:
-    """Configuration for audio files."""
+    """Configuration for audio files.
+
+    Audio files are looked up by the short aliases of ``AUDIO_FILES`` first,
+    then by their key in the audio catalogue.
+    """
 
     def __init__(self):
-        self.audio_dir = AUDIO_DIR
         self.audio_files = AUDIO_FILES
 
+    @property
+    def audio_dir(self):
+        return get_setting("AUDIO_DIR")
+
+    @functools.cached_property
+    def catalogue(self):
+        from .catalogue import AudioCatalogue
+
+        return AudioCatalogue(get_setting("CATALOGUE_PATH"), self.audio_dir)
+
+    def catalogue_for(self, audio_dir=None):
+        """Return the catalogue of a directory, separate for non-default ones.
+
+        Directories other than the AUDIO_DIR setting are catalogued next to
+        the default catalogue, in an index named after a digest of their
+        absolute path.
+        """
+        from .catalogue import AudioCatalogue
+
+        audio_dir = os.path.abspath(audio_dir or self.audio_dir)
+        if audio_dir == os.path.abspath(self.audio_dir):
+            return self.catalogue
+        digest = hashlib.sha256(audio_dir.encode()).hexdigest()[:12]
+        root, extension = os.path.splitext(get_setting("CATALOGUE_PATH"))
+        return AudioCatalogue(f"{root}_{digest}{extension}", audio_dir)
+
+    @functools.cached_property
+    def decoded_audio(self):
+        from .decoded_audio import DecodedAudioStore
+
+        return DecodedAudioStore(
+            get_setting("DECODED_AUDIO_DIR"),
+            get_setting("DECODED_AUDIO_MAX_BYTES"),
+        )
+
     def get_audio_file(self, key):
-        return self.audio_files.get(key)
+        """Return the path of an alias or catalogue key, or None.
+
+        A key missing from the catalogue updates it once before giving up,
+        so that new files are found without updating it beforehand.
+        """
+        if key in self.audio_files:
+            return self.audio_files[key]
+        entry = self.catalogue.get(key)
+        if entry is None:
+            self.update_catalogue()
+            entry = self.catalogue.get(key)
+        return entry["path"] if entry else None
+
+    def get_audio_info(self, key):
+        """Return the catalogue entry (duration, sample rate, ...) of a key."""
+        audio_file_path = self.get_audio_file(key)
+        if audio_file_path is None:
+            return None
+        return self.catalogue.get(self.catalogue.key_for(audio_file_path))
+
+    def update_catalogue(self):
+        """Rescan the audio directory, reading only new or changed files."""
+        return self.catalogue.update()
+
+    def find_audio_files(self, **filters):
+        """Return the catalogue entries matching the given filters."""
+        return self.catalogue.filter(**filters)
 
 
 class OutputConfig:
@@ -48,8 +159,20 @@ class OutputConfig:
     def __init__(self):
         self.output_dirs = OUTPUT_DIRS
 
+    @functools.cached_property
+    def feature_cache(self):
+        from .cache import FeatureCache
+
+        return FeatureCache(
+            get_setting("FEATURE_CACHE_DIR"),
+            get_setting("FEATURE_CACHE_MAX_BYTES"),
+        )
+
     def get_output_directory(self, analysis_type):
-        return self.output_dirs.get(analysis_type)
+        output_dir = self.output_dirs.get(analysis_type)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        return output_dir
 
     def get_output_path(self, analysis_type, file_name, extension="png"):
         return get_output_path(analysis_type, file_name, extension)
@@ -0,0 +1,228 @@
+"""Level-of-detail decimation of signals for plotting.
+
+A figure cannot show more points than it has pixels, so handing every
+sample of a long recording to matplotlib or plotly only costs render time
+and file size. The functions here reduce a signal to a target number of
+points while keeping its visual shape:
+
+- ``minmax`` keeps the smallest and largest sample of each bucket, which
+  preserves every peak of a waveform drawn one bucket per pixel.
+- ``lttb`` (Largest-Triangle-Three-Buckets) keeps the point of each bucket
+  forming the largest triangle with its neighbours, which suits smoother
+  curves such as envelopes.
+
+A ``TimeAxis`` stands in for the time array of a signal, so the time of a
+sample is only computed for the samples that are kept. ``pool_frames``
+does the same for images such as spectrograms, pooling consecutive frames
+down to the pixel width of the figure.
+"""
+
+import numpy as np
+
+from .parameters import DECIMATION_METHOD
+
+# Decimation methods supported by decimate
+DECIMATION_METHODS = ("minmax", "lttb")
+
+# Pooling methods supported by pool_frames
+POOLING_METHODS = ("max", "mean")
+
+
+class TimeAxis:
+    """The time in seconds of each sample of a signal, computed on access.
+
+    Behaves like ``np.arange(n_samples) / sr`` for ``len``, indexing and
+    slicing without allocating it.
+
+    Args:
+        n_samples (int): The number of samples of the signal.
+        sr (int): The sampling rate of the signal.
+    """
+
+    def __init__(self, n_samples, sr):
+        self.n_samples = n_samples
+        self.sr = sr
+
+    def __len__(self):
+        return self.n_samples
+
+    @property
+    def shape(self):
+        return (self.n_samples,)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return np.arange(*index.indices(self.n_samples)) / self.sr
+        index = np.asarray(index)
+        if index.dtype == bool:
+            index = np.flatnonzero(index)
+        return np.where(index < 0, index + self.n_samples, index) / self.sr
+
+    def __array__(self, dtype=None, copy=None):
+        return np.arange(self.n_samples, dtype=dtype) / self.sr
+
+
+def minmax_indices(y, n_buckets):
+    """Return the indices of the minimum and maximum of each bucket.
+
+    Args:
+        y (np.ndarray): The signal to decimate.
+        n_buckets (int): The number of buckets to split the signal into.
+
+    Returns:
+        np.ndarray: The selected indices in increasing order, two per bucket.
+    """
+    n_samples = len(y)
+    if n_samples <= 2 * n_buckets:
+        return np.arange(n_samples)
+
+    bucket_size = -(-n_samples // n_buckets)
+    n_whole = n_samples // bucket_size
+    body = y[: n_whole * bucket_size].reshape(n_whole, bucket_size)
+    offsets = np.arange(n_whole) * bucket_size
+    lows = [body.argmin(axis=1) + offsets]
+    highs = [body.argmax(axis=1) + offsets]
+
+    tail_start = n_whole * bucket_size
+    tail = y[tail_start:]
+    if len(tail):
+        lows.append([tail_start + tail.argmin()])
+        highs.append([tail_start + tail.argmax()])
+
+    pairs = np.stack([np.concatenate(lows), np.concatenate(highs)], axis=1)
+    return np.sort(pairs, axis=1).ravel()
+
+
+def lttb_indices(y, n_out, x=None):
+    """Return the indices selected by Largest-Triangle-Three-Buckets.
+
+    Args:
+        y (np.ndarray): The signal to decimate.
+        n_out (int): The number of points to keep.
+        x (np.ndarray): The x values of the signal. Defaults to the sample
+            indices, which avoids building an x array for uniform signals.
+
+    Returns:
+        np.ndarray: The selected indices in increasing order.
+    """
+    n_samples = len(y)
+    if n_out >= n_samples or n_out < 3:
+        return np.arange(n_samples)
+
+    def x_values(start, end):
+        if x is None:
+            return np.arange(start, end, dtype=np.float64)
+        return np.asarray(x[start:end], dtype=np.float64)
+
+    # The first and last points are always kept, the rest is split into
+    # n_out - 2 buckets.
+    edges = np.linspace(1, n_samples - 1, n_out - 1).astype(np.int64)
+    y_means = np.add.reduceat(y[: edges[-1]], edges[:-1], dtype=np.float64)
+    y_means /= np.diff(edges)
+    if x is None:
+        x_means = (edges[:-1] + edges[1:] - 1) / 2
+    else:
+        x_means = np.add.reduceat(
+            np.asarray(x[: edges[-1]], dtype=np.float64), edges[:-1]
+        )
+        x_means /= np.diff(edges)
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n_samples - 1
+    anchor = 0
+    anchor_x = x_values(0, 1)[0]
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 1 < n_out - 2:
+            next_x, next_y = x_means[i + 1], y_means[i + 1]
+        else:
+            next_x = x_values(n_samples - 1, n_samples)[0]
+            next_y = y[-1]
+
+        bucket_x = x_values(start, end)
+        areas = np.abs(
+            (anchor_x - next_x) * (y[start:end] - y[anchor])
+            - (anchor_x - bucket_x) * (next_y - y[anchor])
+        )
+        best = int(areas.argmax())
+        anchor = start + best
+        anchor_x = bucket_x[best]
+        selected[i + 1] = anchor
+    return selected
+
+
+def decimate(y, n_points, x=None, method=DECIMATION_METHOD):
+    """Reduce a signal to about ``n_points`` points for plotting.
+
+    Args:
+        y (np.ndarray): The signal to decimate.
+        n_points (int): The target number of points.
+        x (np.ndarray): The x values of the signal. Defaults to the sample
+            indices.
+        method (str): "minmax" or "lttb".
+
+    Returns:
+        tuple: The decimated x and y values.
+    """
+    if method not in DECIMATION_METHODS:
+        raise ValueError(f"Unknown decimation method: {method}")
+
+    y = np.asarray(y)
+    if method == "minmax":
+        indices = minmax_indices(y, max(1, n_points // 2))
+    else:
+        indices = lttb_indices(y, n_points, x=x)
+
+    if x is None:
+        x_out = indices
+    elif isinstance(x, TimeAxis):
+        x_out = x[indices]
+    else:
+        x_out = np.asarray(x)[indices]
+    return x_out, y[indices]
+
+
+def decimate_signal(y, sr, n_points, method=DECIMATION_METHOD):
+    """Decimate an audio signal and return its time axis in seconds.
+
+    The time axis is only built for the kept samples, never for the whole
+    signal.
+    """
+    indices, values = decimate(y, n_points, method=method)
+    return indices / sr, values
+
+
+def pool_frames(image, n_columns, method="max"):
+    """Pool the frames of an image down to at most ``n_columns`` columns.
+
+    Consecutive frames, along the last axis, are pooled in groups of
+    ``factor`` frames, the smallest integer that brings them to at most
+    ``n_columns``; the last group may be shorter. Each column then starts
+    ``factor`` frames after the previous one, so the hop length of the
+    pooled image is ``factor`` times that of the frames.
+
+    Args:
+        image (np.ndarray): The image, with frames along the last axis.
+        n_columns (int): The largest number of columns to keep.
+        method (str): "max", which keeps transients visible, or "mean".
+
+    Returns:
+        tuple: The pooled float32 image and the pooling factor.
+    """
+    if method not in POOLING_METHODS:
+        raise ValueError(f"Unknown pooling method: {method}")
+
+    n_frames = image.shape[-1]
+    factor = max(1, -(-n_frames // max(1, n_columns)))
+    if factor == 1:
+        return np.asarray(image, dtype=np.float32), 1
+
+    starts = np.arange(0, n_frames, factor)
+    if method == "max":
+        pooled = np.maximum.reduceat(image, starts, axis=-1)
+    else:
+        counts = np.diff(np.append(starts, n_frames))
+        pooled = np.add.reduceat(image, starts, axis=-1, dtype=np.float64)
+        pooled /= counts
+    return pooled.astype(np.float32, copy=False), factor
@@ -0,0 +1,157 @@
+"""On-disk store of decoded audio.
+
+Decoding compressed audio with ``librosa.load`` costs far more than the
+analyses that follow it. The store keeps the decoded float32 PCM of every
+file and sample rate as an ``.npy`` file and returns it as a read-only
+memory map, so reloading a track only maps the file into memory.
+
+Signals at other sample rates are resampled from the stored decoded PCM
+and stored in turn, so each file is decoded once and each (file, rate)
+pair resampled once, whichever analysis asks for it first.
+
+Entries are keyed on the path of the source and the decoding parameters.
+They remember the size, modification time and SHA-256 of the source: an
+entry is reused as is while the size and modification time match, and
+after a touch only if the content hash still matches. Otherwise the source
+is decoded again. The store shares the layout and LRU size cap of the
+feature cache.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import numpy as np
+
+from .cache import FeatureCache, file_hash
+
+
+def decode_audio(audio_file_path, sr=None, mono=True, res_type="soxr_hq"):
+    """Decode an audio file to float32 PCM with librosa.
+
+    Args:
+        audio_file_path (str): The path to the audio file.
+        sr (int): The sample rate to resample to, or None for the native
+            sample rate.
+        mono (bool): Whether to mix down to mono.
+        res_type (str): The librosa resampler.
+
+    Returns:
+        tuple: The decoded signal and its sample rate.
+    """
+    import librosa
+
+    return librosa.load(audio_file_path, sr=sr, mono=mono, res_type=res_type)
+
+
+def resample_audio(y, orig_sr, target_sr, res_type="soxr_hq"):
+    """Resample a signal with librosa, keeping float32."""
+    import librosa
+
+    return librosa.resample(
+        np.asarray(y), orig_sr=orig_sr, target_sr=target_sr, res_type=res_type
+    ).astype(np.float32, copy=False)
+
+
+class DecodedAudioStore(FeatureCache):
+    """Store of decoded PCM with a size cap and LRU eviction.
+
+    Args:
+        cache_dir (str): The directory holding the decoded audio.
+        max_bytes (int): The size cap of the store. A cap of 0 disables the
+            store, and every load decodes the file.
+    """
+
+    def key(self, audio_file_path, **params):
+        """Build the key of a source file and its decoding parameters."""
+        payload = json.dumps(
+            {"path": os.path.abspath(audio_file_path), "params": params},
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _is_fresh(self, key, arrays, audio_file_path, stat):
+        """Check an entry against its source, refreshing a touched one."""
+        source = (stat.st_size, stat.st_mtime_ns)
+        if tuple(arrays["source"]) == source:
+            return True
+
+        digest = bytes.fromhex(file_hash(audio_file_path))
+        if arrays["sha256"].tobytes() != digest:
+            return False
+
+        # The content is unchanged: record the new size and mtime so that
+        # the next load does not hash the file again.
+        path = os.path.join(self._entry_dir(key), "source.npy")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as source_file:
+            np.save(source_file, np.array(source, dtype=np.int64))
+        os.replace(tmp_path, path)
+        return True
+
+    def _load_entry(self, audio_file_path, produce, **params):
+        """Return the stored signal of an entry, producing it on a miss."""
+        stat = os.stat(audio_file_path)
+        key = self.key(audio_file_path, **params)
+        arrays = self.get(key)
+        if arrays is not None:
+            if self._is_fresh(key, arrays, audio_file_path, stat):
+                logging.info(f"Decoded audio hit for {audio_file_path}")
+                return arrays["pcm"], int(arrays["sr"])
+            logging.info(f"Decoded audio of {audio_file_path} is stale")
+            self.remove(key)
+
+        y, sr = produce()
+        arrays = self.put(
+            key,
+            {
+                "pcm": np.asarray(y, dtype=np.float32),
+                "sr": np.array(sr, dtype=np.int64),
+                "source": np.array(
+                    (stat.st_size, stat.st_mtime_ns), dtype=np.int64
+                ),
+                "sha256": np.frombuffer(
+                    bytes.fromhex(file_hash(audio_file_path)), dtype=np.uint8
+                ),
+            },
+        )
+        return arrays["pcm"], int(arrays["sr"])
+
+    def load(self, audio_file_path, sr=None, mono=True, res_type="soxr_hq"):
+        """Return the decoded signal of a file, decoding it on a miss.
+
+        Args:
+            audio_file_path (str): The path to the audio file.
+            sr (int): The sample rate to resample to, or None for the
+                native sample rate.
+            mono (bool): Whether to mix down to mono.
+            res_type (str): The librosa resampler.
+
+        Returns:
+            tuple: The signal as a read-only memory map, and its sample
+            rate.
+        """
+        if not self.enabled:
+            return decode_audio(
+                audio_file_path, sr=sr, mono=mono, res_type=res_type
+            )
+
+        y, native_sr = self._load_entry(
+            audio_file_path,
+            lambda: decode_audio(audio_file_path, mono=mono),
+            sr=None,
+            mono=mono,
+        )
+        if sr is None or sr == native_sr:
+            return y, native_sr
+
+        def produce():
+            logging.info(
+                f"Resampling {audio_file_path} from {native_sr} Hz to "
+                f"{sr} Hz with {res_type}"
+            )
+            return resample_audio(y, native_sr, sr, res_type), sr
+
+        return self._load_entry(
+            audio_file_path, produce, sr=sr, mono=mono, res_type=res_type
+        )
@@ -0,0 +1,177 @@
+"""Amplitude envelopes in linear time.
+
+Framing the signal and taking the maximum of every frame compares each
+sample once per frame that contains it, which is ``frame_size / hop``
+times per sample. ``sliding_max`` reduces every hop-sized block of the
+signal once, in a single ``reduceat`` pass that also yields the partial
+block at the end of each frame, then slides a van Herk/Gil-Werman running
+maximum over the block maxima. The cost no longer grows with the overlap
+between frames, and the result is exactly the same as
+``frames.max(axis=0)``.
+"""
+
+import numpy as np
+
+from .parameters import (
+    DEFAULT_ENVELOPE_FRAME_SIZE,
+    DEFAULT_ENVELOPE_HOP_LENGTH,
+)
+
+# Envelope modes supported by amplitude_envelope
+ENVELOPE_MODES = ("max", "min", "abs")
+
+
+def _identity(dtype, ufunc):
+    """Return the value that never wins a maximum or minimum."""
+    if np.issubdtype(dtype, np.floating):
+        return -np.inf if ufunc is np.maximum else np.inf
+    info = np.iinfo(dtype)
+    return info.min if ufunc is np.maximum else info.max
+
+
+def _running_extreme(x, window, ufunc):
+    """Apply ``ufunc`` over every ``window`` consecutive values, hop 1.
+
+    Uses the van Herk/Gil-Werman running extrema over blocks of ``window``
+    values. Returns one value per full window.
+    """
+    if window == 1:
+        return x
+    n_windows = x.shape[-1] - window + 1
+    n_blocks = -(-x.shape[-1] // window)
+    padded = np.full(
+        x.shape[:-1] + (n_blocks * window,),
+        _identity(x.dtype, ufunc),
+        dtype=x.dtype,
+    )
+    padded[..., : x.shape[-1]] = x
+    blocks = padded.reshape(x.shape[:-1] + (n_blocks, window))
+
+    forward = ufunc.accumulate(blocks, axis=-1).reshape(padded.shape)
+    backward = ufunc.accumulate(blocks[..., ::-1], axis=-1)[..., ::-1]
+    backward = backward.reshape(padded.shape)
+
+    starts = np.arange(n_windows)
+    return ufunc(backward[..., starts], forward[..., starts + window - 1])
+
+
+def _sliding_extreme(x, frame_length, hop_length, ufunc):
+    """Apply ``np.maximum`` or ``np.minimum`` over every frame of ``x``."""
+    x = np.asarray(x)
+    n_samples = x.shape[-1]
+    if n_samples < frame_length:
+        raise ValueError(
+            f"Input is too short (n={n_samples}) "
+            f"for frame_length={frame_length}"
+        )
+
+    n_frames = 1 + (n_samples - frame_length) // hop_length
+    n_used = (n_frames - 1) * hop_length + frame_length
+    x = x[..., :n_used]
+    n_full, n_rest = divmod(frame_length, hop_length)
+
+    # Frames shorter than the hop do not overlap: reduce each one directly
+    if n_full == 0:
+        starts = np.arange(n_frames) * hop_length
+        bounds = np.stack([starts, starts + frame_length], axis=-1)
+        bounds = bounds.ravel()[:-1]
+        return ufunc.reduceat(x, bounds, axis=-1)[..., ::2]
+
+    # Split the signal at every hop and, if the frame is not a whole number
+    # of hops, n_rest samples after every hop. A single reduceat pass then
+    # gives the head and tail of each hop-sized block.
+    n_blocks = n_frames + n_full - 1
+    block_starts = np.arange(n_blocks + (1 if n_rest else 0)) * hop_length
+    if not n_rest:
+        blocks = ufunc.reduceat(x, block_starts, axis=-1)
+        return _running_extreme(blocks, n_full, ufunc)
+
+    bounds = np.stack([block_starts, block_starts + n_rest], axis=-1)
+    segments = ufunc.reduceat(x, bounds.ravel()[:-1], axis=-1)
+    heads = segments[..., ::2]
+    blocks = ufunc(heads[..., :-1], segments[..., 1::2])
+
+    # Frame k covers hop blocks k to k + n_full - 1 and the head of block
+    # k + n_full.
+    envelope = _running_extreme(blocks, n_full, ufunc)
+    return ufunc(envelope, heads[..., n_full:])
+
+
+def sliding_max(x, frame_length, hop_length):
+    """Return the maximum of every frame of ``x`` along the last axis."""
+    return _sliding_extreme(x, frame_length, hop_length, np.maximum)
+
+
+def sliding_min(x, frame_length, hop_length):
+    """Return the minimum of every frame of ``x`` along the last axis."""
+    return _sliding_extreme(x, frame_length, hop_length, np.minimum)
+
+
+def peak_hold(envelope, decay):
+    """Hold the peaks of a non-negative envelope with exponential decay.
+
+    Each frame is the larger of its own value and the previous held value
+    multiplied by ``decay``. The recursion is evaluated without a Python
+    loop as a running maximum in the log domain.
+
+    Args:
+        envelope (np.ndarray): The non-negative envelope.
+        decay (float): The factor applied per frame, between 0 and 1.
+
+    Returns:
+        np.ndarray: The held envelope.
+    """
+    if not 0 < decay < 1:
+        raise ValueError(f"decay must be between 0 and 1, got {decay}")
+    envelope = np.asarray(envelope)
+    if np.any(envelope < 0):
+        raise ValueError("Peak hold requires a non-negative envelope")
+
+    log_decay = np.log(decay)
+    steps = np.arange(envelope.shape[-1]) * log_decay
+    with np.errstate(divide="ignore"):
+        log_envelope = np.log(envelope.astype(np.float64))
+    held = np.maximum.accumulate(log_envelope - steps, axis=-1) + steps
+    return np.exp(held).astype(envelope.dtype)
+
+
+def amplitude_envelope(
+    y,
+    frame_size=DEFAULT_ENVELOPE_FRAME_SIZE,
+    hop_length=DEFAULT_ENVELOPE_HOP_LENGTH,
+    mode="max",
+    decay=None,
+):
+    """Calculate the amplitude envelope of an audio signal.
+
+    Args:
+        y (np.ndarray): The audio time series.
+        frame_size (int): The number of samples per frame.
+        hop_length (int): The number of samples between successive frames.
+        mode (str): "max" for the largest sample of each frame, "min" for
+            the smallest and "abs" for the largest absolute value.
+        decay (float): Optional per-frame peak-hold decay, only valid with
+            ``mode="abs"``.
+
+    Returns:
+        np.ndarray: The envelope, one value per frame.
+    """
+    if mode not in ENVELOPE_MODES:
+        raise ValueError(f"Unknown envelope mode: {mode}")
+    if decay is not None and mode != "abs":
+        raise ValueError("Peak-hold decay requires mode='abs'")
+
+    if mode == "max":
+        return sliding_max(y, frame_size, hop_length)
+    if mode == "min":
+        return sliding_min(y, frame_size, hop_length)
+
+    # The largest absolute value is either the maximum or minus the minimum,
+    # which avoids allocating np.abs(y) for the whole signal.
+    envelope = np.maximum(
+        sliding_max(y, frame_size, hop_length),
+        -sliding_min(y, frame_size, hop_length),
+    )
+    if decay is not None:
+        envelope = peak_hold(envelope, decay)
+    return envelope
@@ -0,0 +1,250 @@
+"""Chunked, compressed store of feature arrays for downstream use.
+
+The analyses keep only the plots they save. A ``FeatureStore`` keeps the
+full feature arrays of an audio file in an HDF5 file, written with h5py:
+one dataset per feature, with one row per frame, split into compressed
+chunks of about ``FEATURE_STORE_CHUNK_BYTES``. Datasets can grow, so a
+long recording can be appended block by block while it is streamed.
+
+Reading a time range or a subset of the features only decompresses the
+chunks that hold them, so training jobs can sample frames from many files
+without loading whole files or running the analyses again. Each dataset
+records the sample rate and hop length of its frames, and the file records
+the audio file it was computed from.
+"""
+
+import logging
+import os
+import numpy as np
+
+from .parameters import (
+    FEATURE_STORE_CHUNK_BYTES,
+    FEATURE_STORE_COMPRESSION,
+)
+
+
+def _frame_rows(frames):
+    """Return time-last feature frames as rows, one per frame."""
+    return np.ascontiguousarray(np.asarray(frames).T)
+
+
+class FeatureStore:
+    """The feature arrays of one audio file, in an HDF5 file.
+
+    Features are passed in with time along the last axis, like everywhere
+    else in the analyses, and stored and read back with one row per frame,
+    the layout training jobs consume.
+
+    Use as a context manager to close the file.
+
+    Args:
+        path (str): The path of the HDF5 file.
+        mode (str): "r" to read, "a" to read and write, or "w" to start a
+            new file.
+    """
+
+    def __init__(self, path, mode="r"):
+        import h5py
+
+        if mode != "r":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._file = h5py.File(path, mode)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._file.close()
+
+    @property
+    def metadata(self):
+        """The metadata of the file, such as its source audio file."""
+        return dict(self._file.attrs)
+
+    def set_metadata(self, **metadata):
+        """Record metadata about the file."""
+        self._file.attrs.update(metadata)
+
+    @property
+    def features(self):
+        """The names of the stored features."""
+        return list(self._file.keys())
+
+    def info(self, feature):
+        """Return the frame parameters and shape of a stored feature."""
+        dataset = self._file[feature]
+        return {**dataset.attrs, "shape": dataset.shape}
+
+    def append(self, feature, frames, sr=None, hop_length=None, **attrs):
+        """Append frames to a feature, creating it on first use.
+
+        Args:
+            feature (str): The name of the feature.
+            frames (np.ndarray): The new frames, time along the last axis.
+            sr (int): The sample rate the feature was computed at.
+            hop_length (int): The number of samples between frames.
+            **attrs: Further parameters of the feature, such as n_fft.
+        """
+        rows = _frame_rows(frames)
+        if feature not in self._file:
+            if sr is None or hop_length is None:
+                raise ValueError(
+                    f"New feature {feature} needs its sr and hop_length"
+                )
+            row_bytes = rows.itemsize * int(np.prod(rows.shape[1:]))
+            chunk_rows = max(1, FEATURE_STORE_CHUNK_BYTES // row_bytes)
+            dataset = self._file.create_dataset(
+                feature,
+                shape=(0,) + rows.shape[1:],
+                maxshape=(None,) + rows.shape[1:],
+                dtype=rows.dtype,
+                chunks=(chunk_rows,) + rows.shape[1:],
+                compression=FEATURE_STORE_COMPRESSION,
+                shuffle=True,
+            )
+            dataset.attrs.update(sr=sr, hop_length=hop_length, **attrs)
+
+        dataset = self._file[feature]
+        start = dataset.shape[0]
+        dataset.resize(start + len(rows), axis=0)
+        dataset[start:] = rows
+
+    def write(self, feature, frames, sr, hop_length, **attrs):
+        """Store a feature, replacing any stored frames of it."""
+        if feature in self._file:
+            del self._file[feature]
+        self.append(feature, frames, sr=sr, hop_length=hop_length, **attrs)
+
+    def frame_range(self, feature, start=None, stop=None):
+        """Return the frames of a feature from ``start`` to ``stop``.
+
+        Frame ``i`` is at ``i * hop_length / sr`` seconds, as given by
+        ``librosa.frames_to_time``.
+
+        Args:
+            feature (str): The name of the feature.
+            start (float): The start time in seconds, or None.
+            stop (float): The end time in seconds, excluded, or None.
+
+        Returns:
+            slice: The rows of the frames in the time range.
+        """
+        dataset = self._file[feature]
+        frame_rate = dataset.attrs["sr"] / dataset.attrs["hop_length"]
+        n_frames = dataset.shape[0]
+
+        def frame(time, default):
+            if time is None:
+                return default
+            return min(max(int(np.ceil(time * frame_rate)), 0), n_frames)
+
+        return slice(frame(start, 0), frame(stop, n_frames))
+
+    def times(self, feature, start=None, stop=None):
+        """Return the time in seconds of the frames of a time range."""
+        rows = self.frame_range(feature, start, stop)
+        attrs = self._file[feature].attrs
+        return (
+            np.arange(rows.start, rows.stop)
+            * attrs["hop_length"]
+            / attrs["sr"]
+        )
+
+    def read(self, features=None, start=None, stop=None):
+        """Read a time range of some or all features.
+
+        Args:
+            features (list): The features to read, or None for all.
+            start (float): The start time in seconds, or None.
+            stop (float): The end time in seconds, excluded, or None.
+
+        Returns:
+            dict: The frames of each feature, one row per frame.
+        """
+        if features is None:
+            features = self.features
+        return {
+            feature: self._file[feature][
+                self.frame_range(feature, start, stop)
+            ]
+            for feature in features
+        }
+
+
+def source_metadata(audio_file_path):
+    """Return the metadata identifying the source of stored features."""
+    stat = os.stat(audio_file_path)
+    return {
+        "source": os.path.abspath(audio_file_path),
+        "source_size": stat.st_size,
+        "source_mtime_ns": stat.st_mtime_ns,
+    }
+
+
+def stored_features(path, audio_file_path):
+    """Return the features stored for the current version of a file."""
+    if not os.path.exists(path):
+        return []
+    with FeatureStore(path) as store:
+        metadata = store.metadata
+        current = source_metadata(audio_file_path)
+        if any(metadata.get(key) != current[key] for key in current):
+            return []
+        return store.features
+
+
+def write_features(path, audio_file_path, arrays):
+    """Store features of an audio file, keeping its other stored features.
+
+    Args:
+        path (str): The path of the HDF5 file.
+        audio_file_path (str): The path to the audio file.
+        arrays (dict): The frames, sample rate, hop length and further
+            parameters of each feature, keyed by name.
+    """
+    mode = "a" if stored_features(path, audio_file_path) else "w"
+    with FeatureStore(path, mode) as store:
+        store.set_metadata(**source_metadata(audio_file_path))
+        for feature, (frames, params) in arrays.items():
+            store.write(feature, frames, **params)
+    logging.info(f"Feature arrays saved to {path}")
+
+
+def stream_to_store(audio_file_path, path, features=("envelope", "rms")):
+    """Stream features of a long recording into a store block by block.
+
+    Only one block of audio and its frames are held in memory at a time.
+
+    Args:
+        audio_file_path (str): The path to the audio file.
+        path (str): The path of the HDF5 file, which is replaced.
+        features (tuple): Any of the streaming features of
+            ``config.streaming``.
+    """
+    import soundfile as sf
+
+    from .parameters import (
+        DEFAULT_ENVELOPE_HOP_LENGTH,
+        DEFAULT_HOP_LENGTH,
+        DEFAULT_N_FFT,
+    )
+    from .streaming import stream_features
+
+    sr = sf.info(audio_file_path).samplerate
+    params = {
+        name: {"hop_length": DEFAULT_HOP_LENGTH, "n_fft": DEFAULT_N_FFT}
+        for name in features
+    }
+    if "envelope" in params:
+        params["envelope"] = {"hop_length": DEFAULT_ENVELOPE_HOP_LENGTH}
+
+    with FeatureStore(path, "w") as store:
+        store.set_metadata(**source_metadata(audio_file_path))
+        for results in stream_features(audio_file_path, features):
+            for feature, frames in results.items():
+                store.append(feature, frames, sr=sr, **params[feature])
+    logging.info(f"Streamed feature arrays saved to {path}")
@@ -0,0 +1,518 @@
+"""Shared feature engine for the frequency domain analyses.
+
+The spectrogram and MFCC analyses start from the same short-time Fourier
+transform. ``FeatureEngine`` computes that transform once for a decoded
+signal and derives every feature from the cached result, so a run that
+needs several features only pays for one STFT. The RMS energy uses the
+same framing, but is taken over the samples of each frame, as
+``librosa.feature.rms(y=y)`` does, and so needs no transform.
+
+Within a memory budget, the engine never holds the complex STFT of the
+whole signal: the magnitude is computed chunk by chunk into a float32
+buffer, and the mel spectrogram chunk by chunk from the magnitude. The
+number of frames per chunk is chosen so that the temporary arrays of a
+chunk fit in the budget. ``amplitude_to_db`` converts to dB in place.
+The window, mel filterbank and DCT basis come from ``config.bases``, which
+builds each of them once per parameter set.
+
+Multi-channel signals of shape (channels, samples) go through the same
+single pass: every feature gains a leading channel axis, and the 80 dB
+floor of the MFCCs is applied per channel, so each channel gets the
+features it would get on its own.
+"""
+
+import logging
+import numpy as np
+
+from .bases import mfcc_from_log_mel, project_mel, stft_window
+from .config import get_resampler, get_setting, output_config
+from .logging import stage, unmeasured
+from .parameters import DEFAULT_N_FFT, DEFAULT_HOP_LENGTH, DEFAULT_N_MFCC
+from .utils import load_audio
+
+# Features that can be derived from the shared STFT
+FEATURES = ("spectrogram", "mel", "mfcc", "rms")
+
+
+def frames_per_chunk(bytes_per_frame, memory_budget, n_frames):
+    """Return the number of frames whose temporaries fit in a budget.
+
+    Args:
+        bytes_per_frame (int): The temporary memory needed per frame.
+        memory_budget (int): The budget in bytes, or 0 for no budget.
+        n_frames (int): The total number of frames.
+
+    Returns:
+        int: The frames per chunk, at least one and at most ``n_frames``.
+    """
+    if not memory_budget:
+        return max(n_frames, 1)
+    return max(1, min(n_frames, memory_budget // bytes_per_frame))
+
+
+def _segment(y, start, stop):
+    """Return ``y[..., start:stop]``, reading zeros outside of the signal."""
+    n_samples = y.shape[-1]
+    if start >= 0 and stop <= n_samples:
+        return y[..., start:stop]
+    segment = np.zeros(y.shape[:-1] + (stop - start,), dtype=np.float32)
+    first, last = max(start, 0), min(stop, n_samples)
+    lo, hi = first - start, last - start
+    segment[..., lo:hi] = y[..., first:last]
+    return segment
+
+
+def stft_magnitude(
+    y,
+    n_fft=DEFAULT_N_FFT,
+    hop_length=DEFAULT_HOP_LENGTH,
+    center=True,
+    memory_budget=0,
+    out=None,
+    win_length=None,
+):
+    """Compute the STFT magnitude chunk by chunk into a float32 buffer.
+
+    Gives the same result as ``np.abs(librosa.stft(y))``, with centring
+    padded with zeros, without holding the complex STFT of the signal.
+
+    Args:
+        y (np.ndarray): The audio time series, or one per channel.
+        n_fft (int): The length of the windowed signal for FFT.
+        hop_length (int): The number of samples between successive frames.
+        center (bool): Whether frames are centred on their sample position.
+        memory_budget (int): The memory in bytes the temporaries of a chunk
+            may take, or 0 to transform the signal at once.
+        out (np.ndarray): A float32 buffer of shape ([channels,] bins,
+            frames) to write to. Allocated if None.
+        win_length (int): The length of the window, zero-padded to
+            ``n_fft``. Defaults to ``n_fft``.
+
+    Returns:
+        np.ndarray: The magnitude spectrogram.
+    """
+    import librosa
+
+    pad = n_fft // 2 if center else 0
+    n_frames = 1 + (y.shape[-1] + 2 * pad - n_fft) // hop_length
+    n_bins = 1 + n_fft // 2
+    if out is None:
+        out = np.empty(y.shape[:-1] + (n_bins, n_frames), dtype=np.float32)
+
+    # The complex STFT of a chunk, its windowed frames and their transform
+    n_channels = int(np.prod(y.shape[:-1]))
+    chunk = frames_per_chunk(
+        n_channels * (n_bins * 8 + n_fft * 8), memory_budget, n_frames
+    )
+    for first in range(0, n_frames, chunk):
+        last = min(first + chunk, n_frames)
+        start = first * hop_length - pad
+        stop = (last - 1) * hop_length + n_fft - pad
+        stft = librosa.stft(
+            _segment(y, start, stop),
+            n_fft=n_fft,
+            hop_length=hop_length,
+            win_length=win_length,
+            window=stft_window(win_length or n_fft),
+            center=False,
+        )
+        np.abs(stft, out=out[..., first:last])
+    return out
+
+
+def frame_rms(
+    y,
+    frame_length=DEFAULT_N_FFT,
+    hop_length=DEFAULT_HOP_LENGTH,
+    center=True,
+    memory_budget=0,
+):
+    """Compute the time-domain RMS of each frame chunk by chunk.
+
+    Gives the same result as ``librosa.feature.rms(y=y)``, with centring
+    padded with zeros, without framing the whole signal at once.
+
+    Args:
+        y (np.ndarray): The audio time series, or one per channel.
+        frame_length (int): The length of each frame.
+        hop_length (int): The number of samples between successive frames.
+        center (bool): Whether frames are centred on their sample position.
+        memory_budget (int): The memory in bytes the frames of a chunk may
+            take, or 0 to frame the signal at once.
+
+    Returns:
+        np.ndarray: The RMS of each frame, of shape ([channels,] frames).
+    """
+    pad = frame_length // 2 if center else 0
+    n_frames = 1 + (y.shape[-1] + 2 * pad - frame_length) // hop_length
+    out = np.empty(y.shape[:-1] + (max(n_frames, 0),), dtype=np.float32)
+
+    n_channels = int(np.prod(y.shape[:-1]))
+    chunk = frames_per_chunk(
+        n_channels * frame_length * 8, memory_budget, n_frames
+    )
+    for first in range(0, n_frames, chunk):
+        last = min(first + chunk, n_frames)
+        start = first * hop_length - pad
+        stop = (last - 1) * hop_length + frame_length - pad
+        frames = np.lib.stride_tricks.sliding_window_view(
+            _segment(y, start, stop), frame_length, axis=-1
+        )[..., ::hop_length, :]
+        power = np.mean(np.square(frames, dtype=np.float32), axis=-1)
+        np.sqrt(power, out=out[..., first:last])
+    return out
+
+
+def amplitude_to_db(S, ref=np.max, amin=1e-5, top_db=80.0, out=None):
+    """Convert an amplitude spectrogram to dB in a single float32 buffer.
+
+    Gives the same result as ``librosa.amplitude_to_db``, which allocates
+    several temporary arrays the size of the spectrogram.
+
+    Args:
+        S (np.ndarray): The amplitude spectrogram.
+        ref (float or callable): The reference amplitude, or a function of
+            ``S`` returning it.
+        amin (float): The smallest amplitude considered.
+        top_db (float): The floor below the loudest value, or None.
+        out (np.ndarray): The float32 buffer to write to, which may be
+            ``S`` itself. Allocated if None.
+
+    Returns:
+        np.ndarray: The spectrogram in dB.
+    """
+    ref_value = ref(S) if callable(ref) else ref
+    if out is None:
+        out = np.empty(S.shape, dtype=np.float32)
+    np.maximum(S, amin, out=out)
+    np.log10(out, out=out)
+    out *= 20.0
+    out -= 20.0 * np.log10(max(amin, float(ref_value)))
+    if top_db is not None:
+        np.maximum(out, out.max() - top_db, out=out)
+    return out
+
+
+def power_to_db(S, top_db=80.0, amin=1e-10):
+    """Convert power spectrograms to dB, floored per spectrogram.
+
+    Gives the same result as ``librosa.power_to_db`` on each spectrogram
+    of ``S`` along its last two axes, such as each channel or each clip.
+    """
+    log_spec = 10.0 * np.log10(np.maximum(amin, S))
+    if top_db is not None:
+        floor = log_spec.max(axis=(-2, -1), keepdims=True) - top_db
+        np.maximum(log_spec, floor, out=log_spec)
+    return log_spec
+
+
+class FeatureEngine:
+    """Compute STFT-based features from a single transform.
+
+    Args:
+        y (np.ndarray): The audio time series, or a (channels, samples)
+            array to compute the features of every channel at once.
+        sr (int): The sampling rate of the audio.
+        n_fft (int): The length of the windowed signal for FFT.
+        hop_length (int): The number of samples between successive frames.
+        center (bool): Whether frames are centred on their sample position.
+        memory_budget (int): The memory in bytes the temporaries of a chunk
+            may take, or 0 to compute every feature at once. Defaults to
+            the MEMORY_BUDGET_BYTES setting.
+        win_length (int): The length of the window, zero-padded to
+            ``n_fft``. Defaults to ``n_fft``.
+    """
+
+    def __init__(
+        self,
+        y,
+        sr,
+        n_fft=DEFAULT_N_FFT,
+        hop_length=DEFAULT_HOP_LENGTH,
+        center=True,
+        memory_budget=None,
+        win_length=None,
+    ):
+        self.y = y
+        self.sr = sr
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.center = center
+        if memory_budget is None:
+            memory_budget = get_setting("MEMORY_BUDGET_BYTES")
+        self.memory_budget = memory_budget
+        self.win_length = win_length or n_fft
+        self._stft = None
+        self._magnitude = None
+        self._power = None
+        self._mel = {}
+
+    @property
+    def stft(self):
+        """The complex STFT of the signal, computed on first access."""
+        if self._stft is None:
+            import librosa
+
+            with stage("stft", n_fft=self.n_fft, hop_length=self.hop_length):
+                self._stft = librosa.stft(
+                    self.y,
+                    n_fft=self.n_fft,
+                    hop_length=self.hop_length,
+                    win_length=self.win_length,
+                    window=stft_window(self.win_length),
+                    center=self.center,
+                )
+            logging.debug(
+                f"Computed STFT (n_fft={self.n_fft}, "
+                f"hop_length={self.hop_length})."
+            )
+        return self._stft
+
+    @property
+    def magnitude(self):
+        """The magnitude of the STFT, in chunks within the memory budget."""
+        if self._magnitude is None:
+            if self._stft is not None or not self.memory_budget:
+                self._magnitude = np.abs(self.stft)
+                return self._magnitude
+
+            with stage("stft", n_fft=self.n_fft, hop_length=self.hop_length):
+                self._magnitude = stft_magnitude(
+                    self.y,
+                    n_fft=self.n_fft,
+                    hop_length=self.hop_length,
+                    center=self.center,
+                    memory_budget=self.memory_budget,
+                    win_length=self.win_length,
+                )
+            logging.debug(
+                f"Computed STFT magnitude (n_fft={self.n_fft}, "
+                f"hop_length={self.hop_length})."
+            )
+        return self._magnitude
+
+    def with_hop_length(self, hop_length):
+        """Return an engine at a multiple of the hop length, sharing the STFT.
+
+        Frame ``i`` of a hop ``k`` times longer is frame ``k * i`` of this
+        engine, so the new engine takes every ``k``-th frame of the
+        magnitude spectrogram, without copying it.
+        """
+        factor, rest = divmod(hop_length, self.hop_length)
+        if rest or factor < 1:
+            raise ValueError(
+                f"hop_length {hop_length} is not a multiple of "
+                f"{self.hop_length}"
+            )
+        engine = FeatureEngine(
+            self.y,
+            self.sr,
+            n_fft=self.n_fft,
+            hop_length=hop_length,
+            center=self.center,
+            memory_budget=self.memory_budget,
+            win_length=self.win_length,
+        )
+        engine._magnitude = self.magnitude[..., ::factor]
+        return engine
+
+    @property
+    def power(self):
+        """The power spectrum of the STFT."""
+        if self._power is None:
+            self._power = self.magnitude**2
+        return self._power
+
+    @property
+    def n_frames(self):
+        """The number of STFT frames, known without computing the STFT."""
+        n_samples = self.y.shape[-1]
+        if self.center:
+            return 1 + n_samples // self.hop_length
+        return 1 + (n_samples - self.n_fft) // self.hop_length
+
+    def spectrogram(self):
+        """Return the magnitude spectrogram."""
+        return self.magnitude
+
+    def mel(self, n_mels=128):
+        """Return the mel power spectrogram."""
+        if n_mels not in self._mel:
+            if self._power is not None or not self.memory_budget:
+                power = self.power
+                with stage("mel", n_mels=n_mels):
+                    self._mel[n_mels] = project_mel(
+                        power, self.sr, self.n_fft, n_mels
+                    )
+                return self._mel[n_mels]
+
+            magnitude = self.magnitude
+            with stage("mel", n_mels=n_mels):
+                self._mel[n_mels] = self._chunked_mel(magnitude, n_mels)
+        return self._mel[n_mels]
+
+    def _chunked_mel(self, magnitude, n_mels):
+        """Project the power of the magnitude on mel bands chunk by chunk."""
+        n_frames = magnitude.shape[-1]
+        mel = np.empty(
+            magnitude.shape[:-2] + (n_mels, n_frames), dtype=np.float32
+        )
+        chunk = frames_per_chunk(
+            magnitude[..., 0].size * 4, self.memory_budget, n_frames
+        )
+        for first in range(0, n_frames, chunk):
+            last = min(first + chunk, n_frames)
+            power = np.square(magnitude[..., first:last])
+            mel[..., first:last] = project_mel(
+                power, self.sr, self.n_fft, n_mels
+            )
+        return mel
+
+    def mfcc(self, n_mfcc=DEFAULT_N_MFCC, n_mels=128, top_db=80.0):
+        """Return the MFCCs, matching ``librosa.feature.mfcc`` on ``y``.
+
+        The ``top_db`` floor is relative to the loudest frame of each
+        channel.
+        """
+        mel = self.mel(n_mels)
+        with stage("mfcc", n_mfcc=n_mfcc):
+            log_mel = power_to_db(mel, top_db=top_db)
+            return mfcc_from_log_mel(log_mel, n_mfcc)
+
+    def rms(self):
+        """Return the RMS energy of each frame, as ``librosa.feature.rms``.
+
+        The RMS is taken over the samples of each frame rather than over
+        its windowed spectrum, which the Hann window would lower by about
+        4.26 dB, so it is a true level and needs no STFT.
+        """
+        with stage("rms"):
+            return frame_rms(
+                self.y,
+                frame_length=self.n_fft,
+                hop_length=self.hop_length,
+                center=self.center,
+                memory_budget=self.memory_budget,
+            )
+
+    def frame_times(self):
+        """Return the time in seconds of each STFT frame."""
+        import librosa
+
+        return librosa.frames_to_time(
+            np.arange(self.n_frames), sr=self.sr, hop_length=self.hop_length
+        )
+
+
+def warm_up(sr=22050, n_fft=DEFAULT_N_FFT, hop_length=DEFAULT_HOP_LENGTH):
+    """Run the STFT-based features once on a short silent signal.
+
+    The first features computed in a process pay for importing librosa and
+    initialising its FFT and filters, which takes seconds. Warming up
+    keeps that cost out of later timings and out of the first frame of a
+    stream.
+    """
+    y = np.zeros(2 * n_fft, dtype=np.float32)
+    with unmeasured():
+        engine = FeatureEngine(y, sr, n_fft=n_fft, hop_length=hop_length)
+        engine.mfcc()
+        engine.rms()
+
+
+def cached_features(
+    audio_file_path,
+    y,
+    sr,
+    features=("spectrogram", "mfcc", "rms"),
+    n_fft=DEFAULT_N_FFT,
+    hop_length=DEFAULT_HOP_LENGTH,
+    n_mfcc=DEFAULT_N_MFCC,
+    engine=None,
+):
+    """Return features from the feature cache, computing missing ones.
+
+    Each feature is cached separately, and the STFT is only computed if at
+    least one of the requested features is missing from the cache.
+
+    Args:
+        audio_file_path (str): The path to the analysed audio file.
+        y (np.ndarray): The audio time series.
+        sr (int): The sampling rate of the audio.
+        features (tuple): Any of "spectrogram", "mel", "mfcc" and "rms".
+        n_fft (int): The length of the windowed signal for FFT.
+        hop_length (int): The number of samples between successive frames.
+        n_mfcc (int): The number of MFCCs to return.
+        engine (FeatureEngine): An engine to reuse for missing features.
+
+    Returns:
+        dict: The requested features keyed by name.
+    """
+    if engine is None:
+        engine = FeatureEngine(y, sr, n_fft=n_fft, hop_length=hop_length)
+
+    results = {}
+    for feature in features:
+        if feature not in FEATURES:
+            raise ValueError(f"Unknown feature: {feature}")
+        # The resampler is part of the key, since it changes resampled
+        # signals and so their features
+        params = {
+            "sr": sr,
+            "n_fft": n_fft,
+            "hop_length": hop_length,
+            "res_type": get_resampler(),
+        }
+        if feature == "mfcc":
+            params["n_mfcc"] = n_mfcc
+        elif feature == "rms":
+            # Keys the time-domain RMS apart from the spectral RMS that
+            # earlier versions cached under the same parameters
+            params["frame_length"] = n_fft
+
+        def compute(feature=feature):
+            if feature == "mfcc":
+                return {feature: engine.mfcc(n_mfcc=n_mfcc)}
+            return {feature: getattr(engine, feature)()}
+
+        arrays = output_config.feature_cache.get_or_compute(
+            audio_file_path, compute, feature=feature, **params
+        )
+        results[feature] = arrays[feature]
+    return results
+
+
+def compute_features(
+    audio_file_key,
+    features=("spectrogram", "mfcc", "rms"),
+    n_fft=DEFAULT_N_FFT,
+    hop_length=DEFAULT_HOP_LENGTH,
+):
+    """Decode an audio file once and compute the requested features.
+
+    Args:
+        audio_file_key (str): The key of the audio file to analyse.
+        features (tuple): Any of "spectrogram", "mel", "mfcc" and "rms".
+        n_fft (int): The length of the windowed signal for FFT.
+        hop_length (int): The number of samples between successive frames.
+
+    Returns:
+        tuple: A tuple containing:
+            - engine (FeatureEngine): The engine holding the shared STFT.
+            - results (dict): The requested features keyed by name.
+        Returns (None, None) if audio loading fails.
+    """
+    y, sr, audio_file_path = load_audio(audio_file_key)
+    if y is None or sr is None:
+        return None, None
+
+    engine = FeatureEngine(y, sr, n_fft=n_fft, hop_length=hop_length)
+    results = cached_features(
+        audio_file_path,
+        y,
+        sr,
+        features,
+        n_fft=n_fft,
+        hop_length=hop_length,
+        engine=engine,
+    )
+    return engine, results
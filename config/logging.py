@@ -1,10 +1,185 @@
+"""Logging setup and per-stage instrumentation.
+
+``setup_logging`` logs plain text messages to the console and to a log
+file per notebook or script. In queued mode, every record, including those
+of worker processes initialised with ``worker_initializer``, is put on a
+queue and written by a single listener thread, so logging never blocks the
+analyses on the console or the disk and the log file has a single writer.
+Records carry the name of the process that logged them and the file it was
+processing, as set by ``log_context``.
+
+``stage`` and ``timed`` measure a stage of an
+analysis, such as loading, computing, plotting or saving: its wall time,
+CPU time and, when ``trace_stage_memory`` turns it on, the peak memory
+allocated while it runs, as traced by ``tracemalloc``. Every measured
+stage is logged as a record carrying the measurements, which the log file
+stores as a JSON line, and the stages of a run are aggregated by name into
+a summary table logged when the run exits.
+"""
+
+import atexit
+import contextvars
+import functools
+import json
 import logging
+import multiprocessing
 import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+
 from .paths import BASE_DIR
+from .parameters import TRACE_STAGE_MEMORY
+
+# Format of the plain text log messages
+LOG_FORMAT = "%(asctime)s - %(levelname)s: %(message)s"
+
+# Format of queued log messages, which come from several processes
+QUEUED_LOG_FORMAT = "%(asctime)s - %(levelname)s [%(context)s]: %(message)s"
+
+# Columns of the stage summary table
+STAGE_SUMMARY_COLUMNS = (
+    "stage",
+    "calls",
+    "wall_s",
+    "cpu_s",
+    "peak_mb",
+    "wall_share",
+)
+
+# The open stages of each thread, innermost last
+_open_stages = threading.local()
+
+# The file being processed, set by log_context
+_file_context = contextvars.ContextVar("file_context", default=None)
+
+# The listener writing the records of the queue in queued mode
+_listener = None
+
+# Whether stages trace their peak memory, set by trace_stage_memory
+_trace_stages = TRACE_STAGE_MEMORY
+
+
+class ContextFilter(logging.Filter):
+    """Add the logging process and the file being processed to records.
+
+    Records that already carry the fields, such as those received from
+    worker processes, keep them.
+    """
+
+    def filter(self, record):
+        if not hasattr(record, "worker"):
+            record.worker = record.processName
+            record.file = _file_context.get()
+            record.context = record.worker
+            if record.file:
+                record.context += f" {os.path.basename(record.file)}"
+        return True
+
+
+@contextmanager
+def log_context(file):
+    """Tag the records logged in this context with the file processed."""
+    token = _file_context.set(file)
+    try:
+        yield
+    finally:
+        _file_context.reset(token)
+
+
+class StageFormatter(logging.Formatter):
+    """Format stage records as JSON lines and other records as text."""
+
+    def format(self, record):
+        stage = getattr(record, "stage", None)
+        if stage is None:
+            return super().format(record)
+        return json.dumps(
+            {
+                "time": self.formatTime(record),
+                "level": record.levelname,
+                "worker": getattr(record, "worker", record.processName),
+                "file": getattr(record, "file", None),
+                **stage,
+            }
+        )
 
 
-def setup_logging(notebook_path):
-    """Configure logging for the analysis notebooks."""
+class StageCollector(logging.Handler):
+    """Aggregate the stage records of a run by name for its summary table.
+
+    Only the totals of each stage name are kept, so that long-running
+    processes, such as the analysis service, collect in constant memory.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.clear()
+
+    def clear(self):
+        """Forget the stages collected so far."""
+        self.rows = {}
+        self.outer_wall_s = 0.0
+
+    def emit(self, record):
+        stage = getattr(record, "stage", None)
+        if stage is not None:
+            self.add(stage)
+
+    def add(self, record):
+        """Add a stage record to the totals of its stage name."""
+        row = self.rows.setdefault(
+            record["stage"],
+            {
+                "stage": record["stage"],
+                "calls": 0,
+                "wall_s": 0.0,
+                "cpu_s": 0.0,
+                "peak_mb": None,
+            },
+        )
+        row["calls"] += 1
+        row["wall_s"] += record["wall_s"]
+        row["cpu_s"] += record["cpu_s"]
+        if record.get("peak_bytes") is not None:
+            peak_mb = record["peak_bytes"] / 2**20
+            row["peak_mb"] = max(row["peak_mb"] or 0.0, peak_mb)
+        if record["depth"] == 0:
+            self.outer_wall_s += record["wall_s"]
+
+    def summary(self):
+        """Return a row per stage name, as ``summarise_stages``."""
+        total = self.outer_wall_s or 1.0
+        rows = [
+            dict(row, wall_share=row["wall_s"] / total)
+            for row in self.rows.values()
+        ]
+        return sorted(rows, key=lambda row: -row["wall_s"])
+
+
+# The collector of the current run, attached to the root logger
+stage_collector = StageCollector()
+
+
+def _queue_handler(queue):
+    """Return a handler putting tagged records on a queue."""
+    handler = QueueHandler(queue)
+    handler.addFilter(ContextFilter())
+    return handler
+
+
+def setup_logging(notebook_path, queued=False):
+    """Configure logging for the analysis notebooks.
+
+    Args:
+        notebook_path (str): The path of the notebook or script, which
+            names the log file.
+        queued (bool): Whether to log through a queue written by a single
+            listener thread. Process pools should then initialise their
+            workers with ``worker_initializer``.
+    """
     rel_path = os.path.relpath(
         notebook_path, os.path.join(BASE_DIR, "notebooks")
     )
@@ -21,14 +196,230 @@ def setup_logging(notebook_path):
     log_file = os.path.join(log_dir, log_file_name)
 
     # Clear any existing handlers
+    stop_queue_listener()
     for handler in logging.root.handlers[:]:
         logging.root.removeHandler(handler)
 
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(levelname)s: %(message)s",
-        handlers=[
-            logging.StreamHandler(),  # Output logs to the console
-            logging.FileHandler(log_file),  # Also log to a file
-        ],
-    )
+    log_format = QUEUED_LOG_FORMAT if queued else LOG_FORMAT
+    stream_handler = logging.StreamHandler()  # Output logs to the console
+    stream_handler.setFormatter(logging.Formatter(log_format))
+    file_handler = logging.FileHandler(log_file)  # Also log to a file
+    file_handler.setFormatter(StageFormatter(log_format))
+    handlers = [stream_handler, file_handler, stage_collector]
+    for handler in handlers:
+        handler.addFilter(ContextFilter())
+    stage_collector.clear()
+
+    if queued:
+        global _listener
+        queue = multiprocessing.Queue(-1)
+        _listener = QueueListener(queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        handlers = [_queue_handler(queue)]
+    for handler in handlers:
+        logging.root.addHandler(handler)
+    logging.root.setLevel(logging.INFO)
+
+    # Exit handlers run last in first out: registering here runs the
+    # shutdown before multiprocessing closes the queue at exit.
+    atexit.unregister(_shutdown)
+    atexit.register(_shutdown)
+
+
+def stop_queue_listener():
+    """Write the queued records and stop the listener of queued mode."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def trace_stage_memory(enabled=True):
+    """Turn the tracing of the peak memory of stages on or off.
+
+    Tracing runs the stages, including the imports they trigger, under
+    ``tracemalloc``, which slows them down severalfold. Workers of pools
+    created after the call with ``worker_initializer`` inherit the choice.
+    """
+    global _trace_stages
+    _trace_stages = enabled
+
+
+def init_worker_logging(queue, initializer=None, trace_memory=False):
+    """Send the records of a worker process to the queue of the listener.
+
+    Args:
+        queue (multiprocessing.Queue): The queue of queued mode, or None to
+            leave the logging of the worker as inherited.
+        initializer (callable): Another initializer to run afterwards.
+        trace_memory (bool): Whether the stages of the worker trace their
+            peak memory.
+    """
+    trace_stage_memory(trace_memory)
+    if queue is not None:
+        for handler in logging.root.handlers[:]:
+            logging.root.removeHandler(handler)
+        logging.root.addHandler(_queue_handler(queue))
+        logging.root.setLevel(logging.INFO)
+    if initializer is not None:
+        initializer()
+
+
+def worker_initializer(initializer=None):
+    """Return the initializer arguments of a process pool.
+
+    Workers of a pool created with them log through the queue of queued
+    mode, if it is set up, trace the memory of their stages if this process
+    does, and then run ``initializer``::
+
+        ProcessPoolExecutor(max_workers, **worker_initializer())
+
+    Returns:
+        dict: The "initializer" and "initargs" of the pool.
+    """
+    queue = _listener.queue if _listener is not None else None
+    return {
+        "initializer": init_worker_logging,
+        "initargs": (queue, initializer, _trace_stages),
+    }
+
+
+def _trace_memory():
+    """Start tracing allocations for the outermost stage of a thread.
+
+    Returns:
+        bool: Whether stages own the tracing. Tracing started elsewhere,
+        for instance by a benchmark, is left alone and stages then report
+        no peak memory, since measuring it would reset the other peak.
+    """
+    if not _trace_stages:
+        return False
+    if tracemalloc.is_tracing():
+        return bool(getattr(_open_stages, "owned", False))
+    tracemalloc.start()
+    _open_stages.owned = True
+    return True
+
+
+@contextmanager
+def stage(name, **context):
+    """Measure a stage of work and log it as a structured record.
+
+    Stages nest: the peak memory of an outer stage includes the peaks of
+    the stages it contains.
+
+    Args:
+        name (str): The name of the stage, such as "load" or "stft".
+        **context: Fields added to the record, such as the file path.
+
+    Yields:
+        dict: The record, filled in when the stage ends.
+    """
+    if getattr(_open_stages, "suspended", False):
+        yield {"stage": name, **context}
+        return
+
+    stack = getattr(_open_stages, "stack", None)
+    if stack is None:
+        stack = _open_stages.stack = []
+    traced = _trace_memory()
+    if traced:
+        current, peak = tracemalloc.get_traced_memory()
+        if stack:
+            stack[-1]["peak"] = max(stack[-1]["peak"], peak)
+        tracemalloc.reset_peak()
+    else:
+        current = 0
+    frame = {"start": current, "peak": current}
+    record = {"stage": name, "depth": len(stack), **context}
+    stack.append(frame)
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield record
+    finally:
+        record["wall_s"] = time.perf_counter() - wall
+        record["cpu_s"] = time.process_time() - cpu
+        stack.pop()
+        record["peak_bytes"] = None
+        if traced:
+            peak = max(frame["peak"], tracemalloc.get_traced_memory()[1])
+            record["peak_bytes"] = peak - frame["start"]
+            if stack:
+                stack[-1]["peak"] = max(stack[-1]["peak"], peak)
+            else:
+                tracemalloc.stop()
+                _open_stages.owned = False
+        logging.info(
+            f"Stage {name}: {record['wall_s']:.3f} s wall, "
+            f"{record['cpu_s']:.3f} s CPU",
+            extra={"stage": record},
+        )
+
+
+@contextmanager
+def unmeasured():
+    """Skip the measurement of the stages run in this thread.
+
+    Used around work too fine-grained to measure, such as the per-hop
+    frames of the real-time analyser.
+    """
+    suspended = getattr(_open_stages, "suspended", False)
+    _open_stages.suspended = True
+    try:
+        yield
+    finally:
+        _open_stages.suspended = suspended
+
+
+def timed(name=None):
+    """Decorate a function to measure each call as a stage.
+
+    Args:
+        name (str): The name of the stage. Defaults to the function name.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name or func.__name__):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def summarise_stages(stages):
+    """Aggregate stage records by stage name.
+
+    Args:
+        stages (list): The stage records of a run.
+
+    Returns:
+        list: A row per stage, slowest first, with its number of calls,
+        total wall and CPU time, largest peak memory (None if memory
+        tracing was off for all its calls) and share of the wall time of
+        the outermost stages. A nested stage counts towards
+        its own share and that of the stage containing it.
+    """
+    collector = StageCollector()
+    for record in stages:
+        collector.add(record)
+    return collector.summary()
+
+
+def log_stage_summary():
+    """Log the summary table of the stages measured in this run."""
+    if not stage_collector.rows:
+        return
+    from .benchmarking import format_table
+
+    table = format_table(stage_collector.summary(), STAGE_SUMMARY_COLUMNS)
+    logging.info(f"Stage summary:\n{table}")
+
+
+def _shutdown():
+    """Log the stage summary, then write the remaining queued records."""
+    log_stage_summary()
+    stop_queue_listener()
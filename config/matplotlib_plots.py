@@ -1,7 +1,7 @@
 # import matplotlib.pyplot as plt
-from matplotlib.colors import LinearSegmentedColormap
-
+import functools
 
+from .decimation import decimate
 from .parameters import (
     BACKGROUND_COLOR,
     # ORIGINAL_SIGNAL_COLOR,
@@ -9,17 +9,59 @@ from .parameters import (
     SPINE_COLOR,
     FONTSIZE_TITLE,
     FONTSIZE_SUBTITLE,
+    DECIMATION_METHOD,
+    FIGURE_SIZE,
+    FIGURE_DPI,
 )
 
+# Axes rectangles of the figure templates in figure coordinates, leaving
+# room above the axes for the title and subtitle added by configure_plot.
+TEMPLATE_AXES = {
+    "signal": {"ax": (0.06, 0.11, 0.92, 0.71)},
+    "image": {
+        "ax": (0.06, 0.11, 0.82, 0.71),
+        "cax": (0.9, 0.11, 0.015, 0.71),
+    },
+}
+
 
 def create_custom_colormap():
+    from matplotlib.colors import LinearSegmentedColormap
+
     colors = ["#5E81AC", "#81A1C1", "#88C0D0", "#D08770", "#BF616A"]
     cmap_name = "custom_mfcc"
     return LinearSegmentedColormap.from_list(cmap_name, colors, N=256)
 
 
-def configure_plot(ax, title, subtitle):
-    """Configure the plot with the given title and subtitle."""
+def target_points(ax):
+    """Return the number of points worth drawing across an axes."""
+    return 2 * max(1, int(ax.bbox.width))
+
+
+def plot_signal(ax, x, y, method=DECIMATION_METHOD, sr=None, **kwargs):
+    """Plot a signal decimated to the pixel width of the axes.
+
+    If ``x`` is None and ``sr`` is given, the time axis is generated only
+    for the samples that are kept.
+    """
+    in_samples = x is None and sr is not None
+    x, y = decimate(y, target_points(ax), x=x, method=method)
+    if in_samples:
+        x = x / sr
+    return ax.plot(x, y, **kwargs)
+
+
+def decimate_lines(ax, method=DECIMATION_METHOD):
+    """Decimate every line of an axes that has more points than pixels."""
+    n_points = target_points(ax)
+    for line in ax.get_lines():
+        x, y = line.get_data()
+        if len(y) > n_points:
+            line.set_data(*decimate(y, n_points, x=x, method=method))
+
+
+def style_axes(ax):
+    """Apply the colours and labels shared by every plot to an axes."""
     # Set background color
     ax.figure.patch.set_facecolor(BACKGROUND_COLOR)
     ax.set_facecolor(BACKGROUND_COLOR)
@@ -36,6 +78,20 @@ def configure_plot(ax, title, subtitle):
     ax.tick_params(axis="x", colors=SPINE_COLOR)
     ax.tick_params(axis="y", colors=SPINE_COLOR)
 
+
+def style_colorbar(cbar):
+    """Match the colours of a colorbar to the plot."""
+    cbar.ax.set_facecolor(BACKGROUND_COLOR)
+    cbar.ax.yaxis.set_tick_params(color=SPINE_COLOR, labelcolor=SPINE_COLOR)
+    cbar.outline.set_edgecolor(SPINE_COLOR)
+
+
+def configure_plot(ax, title, subtitle):
+    """Configure the plot with the given title and subtitle."""
+    # Reduce long signals to what the axes can display
+    decimate_lines(ax)
+    style_axes(ax)
+
     # Add the song title in bold and the subtitle below it
     ax.text(
         0.5,
@@ -58,7 +114,11 @@ def configure_plot(ax, title, subtitle):
         ha="center",
     )
 
-    # Customise the legend
+    # Customise the legend. Image plots have no labelled artists, and an
+    # empty legend placed with loc="best" scans every cell of the image.
+    if not ax.get_legend_handles_labels()[0]:
+        return
+
     legend = ax.legend(
         facecolor=BACKGROUND_COLOR,
         edgecolor=SPINE_COLOR,
@@ -67,3 +127,78 @@ def configure_plot(ax, title, subtitle):
 
     for text in legend.get_texts():
         text.set_color(SPINE_COLOR)
+
+
+def template_width(kind="signal"):
+    """Return the width in pixels of a template's axes."""
+    return int(TEMPLATE_AXES[kind]["ax"][2] * FIGURE_SIZE[0] * FIGURE_DPI)
+
+
+def template_points(kind="signal"):
+    """Return the number of points worth drawing across a template's axes.
+
+    Unlike ``target_points`` it needs no figure, so signals can be
+    decimated before they are sent to a renderer.
+    """
+    return 2 * template_width(kind)
+
+
+class FigureTemplate:
+    """A pre-styled figure that is cleared and redrawn for every plot.
+
+    The figure is built without pyplot on an Agg canvas, so it renders
+    headless whatever the active backend is. Its axes are created and
+    styled once, and ``reset`` only removes what the previous plot drew,
+    which is much cheaper than building a new figure per plot.
+
+    Args:
+        kind (str): "signal" for line plots or "image" for spectrogram-like
+            plots with a colorbar.
+    """
+
+    def __init__(self, kind="signal"):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        if kind not in TEMPLATE_AXES:
+            raise ValueError(f"Unknown figure template: {kind}")
+
+        self.kind = kind
+        self.figure = Figure(figsize=FIGURE_SIZE, dpi=FIGURE_DPI)
+        FigureCanvasAgg(self.figure)
+        self.ax = self.figure.add_axes(TEMPLATE_AXES[kind]["ax"])
+        style_axes(self.ax)
+        self.cax = None
+        if "cax" in TEMPLATE_AXES[kind]:
+            self.cax = self.figure.add_axes(TEMPLATE_AXES[kind]["cax"])
+
+    def reset(self):
+        """Remove the artists, scales and limits set by the last plot."""
+        ax = self.ax
+        artists = (*ax.lines, *ax.images, *ax.collections, *ax.patches)
+        for artist in (*artists, *ax.texts):
+            artist.remove()
+        if ax.get_legend() is not None:
+            ax.get_legend().remove()
+
+        # Setting the scales restores their default tickers, and limits
+        # set explicitly by the last plot turn autoscaling off.
+        ax.set_xscale("linear")
+        ax.set_yscale("linear")
+        ax.set_autoscale_on(True)
+        ax.relim()
+        ax.autoscale_view()
+
+        if self.cax is not None:
+            self.cax.cla()
+        return self
+
+    def save(self, output_path):
+        """Render the figure to a file."""
+        self.figure.savefig(output_path, facecolor=BACKGROUND_COLOR)
+
+
+@functools.lru_cache(maxsize=None)
+def get_template(kind="signal"):
+    """Return the figure template of a kind, created once per process."""
+    return FigureTemplate(kind)
@@ -5,11 +5,79 @@ Analysis Parameters:
 - DEFAULT_HOP_LENGTH: The number of samples between successive frames.
 - DEFAULT_N_FFT: The length of the windowed signal for FFT.
 - DEFAULT_FRAME_LENGTH: The length of each frame for analysis.
+- DEFAULT_N_MFCC: The number of MFCCs to return.
+- DEFAULT_ENVELOPE_FRAME_SIZE: The frame size for amplitude envelopes.
+- DEFAULT_ENVELOPE_HOP_LENGTH: The hop length for amplitude envelopes.
+- DEFAULT_BLOCK_LENGTH: The number of samples read per block when streaming.
+- DEFAULT_CALLBACK_LENGTH: The number of samples per real-time callback.
+- FEATURE_BATCH_FRAMES: The number of STFT frames computed at once when
+  extracting features of many clips in batches.
+- FEATURE_BATCH_FFT_FRAMES: The number of frames of a batch windowed and
+  transformed at once, sized for the CPU cache.
+- SPARSE_MEL_BASIS: Whether the mel projection uses a sparse filterbank.
+
+Resampling Parameters:
+- ANALYSIS_SAMPLE_RATES: The sample rate each analysis runs at, None for
+  the native rate of the file. Every analysis runs at the native rate by
+  default, so that the frequency domain analyses of a file share one STFT;
+  setting a rate changes the features of that analysis.
+- RESAMPLE_QUALITY: The resampler used, "fast" or "high".
+- RESAMPLERS: The librosa resampler of each quality.
+
+Cache Parameters:
+- FEATURE_CACHE_MAX_BYTES: Size cap of the on-disk feature cache.
+- DECODED_AUDIO_MAX_BYTES: Size cap of the store of decoded audio.
+- BASIS_CACHE_SIZE: Number of parameter sets whose windows, filterbanks
+  and DCT bases are kept in memory.
+
+Feature Store Parameters:
+- FEATURE_STORE_CHUNK_BYTES: Approximate size of the compressed chunks of
+  stored feature arrays.
+- FEATURE_STORE_COMPRESSION: The HDF5 compression filter of stored
+  feature arrays.
+
+Memory Parameters:
+- MEMORY_BUDGET_BYTES: The memory the temporary arrays of a chunk of STFT
+  frames may take. Longer signals are transformed chunk by chunk; 0
+  transforms every signal at once.
+
+Similarity Parameters:
+- SIMILARITY_IVF_MIN_FILES: The number of indexed files from which the
+  similarity index clusters its summaries into inverted lists and answers
+  queries approximately.
+- SIMILARITY_N_PROBE: The number of inverted lists scanned per query.
+- SIMILARITY_KMEANS_ITERATIONS: The number of k-means rounds when training
+  the inverted lists.
+
+Service Parameters:
+- SERVICE_HOST: The address the analysis service listens on.
+- SERVICE_PORT: The port the analysis service listens on.
+- SERVICE_CACHE_MAX_BYTES: Size cap of the encoded feature arrays the
+  analysis service keeps in memory.
+- SERVICE_SIGNAL_CACHE_SIZE: Number of decoded signals each worker of the
+  analysis service keeps in memory.
+
+Logging Parameters:
+- TRACE_STAGE_MEMORY: Whether instrumented stages trace their peak memory
+  allocation with tracemalloc by default. Tracing slows the traced code
+  down severalfold, so it is off unless a run asks for it, e.g. with the
+  ``--trace-memory`` flag of the batch runner.
 
 Visualization Parameters:
 - FIGURE_SIZE: Default size for matplotlib figures.
+- FIGURE_DPI: Resolution of rendered figures in dots per inch.
 - FONTSIZE_TITLE: Font size for plot titles.
 - FONTSIZE_SUBTITLE: Font size for plot subtitles.
+- DECIMATION_METHOD: How long signals are reduced before plotting.
+- PLOTLY_TARGET_POINTS: Number of points kept per plotly trace.
+- PLOTLY_WEBGL: Whether plotly signal traces render with WebGL.
+- PLOTLY_INCLUDE_JS: How saved plotly HTML files include plotly.js:
+  "directory" loads one plotly.min.js shared by the files of an output
+  directory, True embeds it in every file (about 4.6 MB each), making the
+  file self-contained, and "cdn" loads it online.
+- SPECTROGRAM_TILE_FRAMES: Number of STFT frames per spectrogram tile.
+- SPECTROGRAM_TILE_MIN_BINS: Frequency bins below which the levels of a
+  spectrogram pyramid stop halving the frequency resolution.
 
 Color Schemes:
 - Various color constants for different elements in visualizations.
@@ -22,11 +90,62 @@ Audio Files:
 DEFAULT_HOP_LENGTH = 512
 DEFAULT_N_FFT = 2048
 DEFAULT_FRAME_LENGTH = 1024
+DEFAULT_N_MFCC = 13
+DEFAULT_ENVELOPE_FRAME_SIZE = 2056
+DEFAULT_ENVELOPE_HOP_LENGTH = 128
+DEFAULT_BLOCK_LENGTH = 2**16
+DEFAULT_CALLBACK_LENGTH = 512
+FEATURE_BATCH_FRAMES = 2**14
+FEATURE_BATCH_FFT_FRAMES = 128
+SPARSE_MEL_BASIS = True
+
+# Resampling Parameters
+ANALYSIS_SAMPLE_RATES = {
+    "envelope": None,
+    "rms": None,
+    "spectrogram": None,
+    "mfcc": None,
+}
+RESAMPLE_QUALITY = "high"
+RESAMPLERS = {"fast": "soxr_lq", "high": "soxr_hq"}
+
+# Cache Parameters
+FEATURE_CACHE_MAX_BYTES = 2 * 1024**3
+DECODED_AUDIO_MAX_BYTES = 8 * 1024**3
+BASIS_CACHE_SIZE = 32
+
+# Feature Store Parameters
+FEATURE_STORE_CHUNK_BYTES = 2**20
+FEATURE_STORE_COMPRESSION = "gzip"
+
+# Memory Parameters
+MEMORY_BUDGET_BYTES = 256 * 1024**2
+
+# Similarity Parameters
+SIMILARITY_IVF_MIN_FILES = 20000
+SIMILARITY_N_PROBE = 8
+SIMILARITY_KMEANS_ITERATIONS = 10
+
+# Service Parameters
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8765
+SERVICE_CACHE_MAX_BYTES = 512 * 1024**2
+SERVICE_SIGNAL_CACHE_SIZE = 8
+
+# Logging Parameters
+TRACE_STAGE_MEMORY = False
 
 # Visualisation Parameters
 FIGURE_SIZE = (14, 5)
+FIGURE_DPI = 100
 FONTSIZE_TITLE = 14
 FONTSIZE_SUBTITLE = 12
+DECIMATION_METHOD = "minmax"
+PLOTLY_TARGET_POINTS = 4000
+PLOTLY_WEBGL = True
+PLOTLY_INCLUDE_JS = "directory"
+SPECTROGRAM_TILE_FRAMES = 512
+SPECTROGRAM_TILE_MIN_BINS = 64
 
 # Color Schemes Matplotlib
 BACKGROUND_COLOR = "#2E3440"
@@ -10,6 +10,24 @@ OUTPUT_DIR = os.path.join(DATA_DIR, "output_graphs")
 # Raw audio files directory
 AUDIO_DIR = os.path.join(DATA_DIR, "raw_audio_files")
 
+# Cache directory for computed features
+FEATURE_CACHE_DIR = os.path.join(DATA_DIR, "feature_cache")
+
+# Store of decoded PCM audio, reused instead of decoding files again
+DECODED_AUDIO_DIR = os.path.join(DATA_DIR, "decoded_audio")
+
+# Multi-resolution spectrogram tiles of long recordings
+SPECTROGRAM_TILES_DIR = os.path.join(DATA_DIR, "spectrogram_tiles")
+
+# SQLite index of the audio files and their header properties
+CATALOGUE_PATH = os.path.join(DATA_DIR, "audio_catalogue.sqlite")
+
+# Nearest-neighbour index of the MFCC summaries of the audio files
+SIMILARITY_INDEX_PATH = os.path.join(DATA_DIR, "similarity_index.npz")
+
+# Stored benchmark results, one file per commit
+BENCHMARK_DIR = os.path.join(DATA_DIR, "benchmarks")
+
 
 # Function to dynamically generate audio file paths
 def get_audio_file(file_name):
@@ -17,7 +35,8 @@ def get_audio_file(file_name):
     return os.path.join(AUDIO_DIR, file_name)
 
 
-# List of audio files available
+# Short aliases for audio files. Every other file in AUDIO_DIR is found
+# through the audio catalogue by its relative path without extension.
 AUDIO_FILES = {
     "sax_a3": get_audio_file("sax-baritone_a3.wav"),
     "suno_wits": get_audio_file("SUNO_Whispers-in-the-Shadows.mp3"),
@@ -37,15 +56,14 @@ OUTPUT_DIRS = {
     "frequency_domain": get_output_dir(
         "frequency_domain_audio_representations"
     ),
+    "arrays": get_output_dir("feature_arrays"),
+    "sweeps": get_output_dir("parameter_sweeps"),
 }
 
 
-# Ensure all output directories exist
+# Ensure all output directories exist. This is not run on import; output
+# paths create their directory when they are requested.
 def ensure_directories():
     """Ensure that all output directories exist."""
     for dir_path in OUTPUT_DIRS.values():
         os.makedirs(dir_path, exist_ok=True)
-
-
-# Initialise directories
-ensure_directories()
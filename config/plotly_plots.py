@@ -1,15 +1,84 @@
-import plotly.graph_objs as go
+"""Plotly traces, layout and HTML output of the interactive plots.
 
+Signal traces are decimated, hold their values as float32 arrays, which
+plotly serialises as base64-encoded typed arrays instead of JSON number
+lists, and render with WebGL (``Scattergl``) rather than SVG, so that long
+recordings stay small on disk and responsive in the browser.
+"""
+
+import logging
 import os
+import numpy as np
+
+from .decimation import decimate
+from .logging import stage
 from .parameters import (
     BACKGROUND_COLOR,
     SPINE_COLOR,
     FONTSIZE_TITLE,
+    DECIMATION_METHOD,
+    PLOTLY_INCLUDE_JS,
+    PLOTLY_TARGET_POINTS,
+    PLOTLY_WEBGL,
 )
 
 
+def typed_array(values):
+    """Return values as a float32 array, serialised as a typed array."""
+    return np.ascontiguousarray(values, dtype=np.float32)
+
+
+def signal_trace(
+    x,
+    y,
+    name,
+    color,
+    n_points=PLOTLY_TARGET_POINTS,
+    method=DECIMATION_METHOD,
+    webgl=PLOTLY_WEBGL,
+):
+    """Create a line trace of a signal decimated to ``n_points`` points.
+
+    The trace is a WebGL ``Scattergl`` unless ``webgl`` is False.
+    """
+    import plotly.graph_objs as go
+
+    x, y = decimate(y, n_points, x=x, method=method)
+    trace = go.Scattergl if webgl else go.Scatter
+    return trace(
+        x=typed_array(x),
+        y=typed_array(y),
+        mode="lines",
+        name=name,
+        line=dict(color=color),
+    )
+
+
+def save_html(fig, output_path, include_plotlyjs=PLOTLY_INCLUDE_JS):
+    """Save a plotly figure as an HTML file.
+
+    Args:
+        fig (plotly.graph_objs.Figure): The figure to save.
+        output_path (str): The path of the HTML file.
+        include_plotlyjs (bool or str): "directory" to load plotly.js
+            from a plotly.min.js written once next to the file, True to
+            embed it, making the file self-contained, or "cdn" to load it
+            online.
+    """
+    with stage("save", path=output_path):
+        fig.write_html(
+            output_path,
+            include_plotlyjs=include_plotlyjs,
+            full_html=True,
+            config={"responsive": True},
+        )
+    logging.info(f"Interactive plot saved to {output_path}")
+
+
 def configure_plotly_layout(title, audio_file_path):
     """Configure the layout for plotly plots."""
+    import plotly.graph_objs as go
+
     layout = go.Layout(
         title={
             "text": f"Interactive Plot: {os.path.basename(audio_file_path)}",
@@ -0,0 +1,311 @@
+"""Real-time feature extraction over a ring buffer.
+
+``RealtimeAnalyser`` takes audio in callbacks of any size, as delivered by
+a sound card, and emits the RMS energy, amplitude envelope and MFCC frames
+as soon as the last sample of each frame has arrived. The samples are kept
+in a fixed-size ring buffer, so memory does not grow with the length of
+the stream.
+
+The frames use the same framing as the offline analyses and match them
+frame for frame, up to floating point rounding in the mel projection:
+
+- ``rms`` matches ``RMS_energy.py``, which centres its frames. The first
+  frames read the ``n_fft // 2`` zeros before the stream, and ``flush``
+  emits the frames that read the zeros after its end.
+- ``envelope`` matches ``amplitude_envelopes.py``.
+- ``mfcc`` matches ``MFCCs.py`` computed with ``top_db=None``. The default
+  80 dB floor is relative to the loudest frame of the whole file, which a
+  live stream does not know in advance.
+
+Every emitted frame records its processing latency, the wall time between
+the arrival of the callback that completed it and its emission. On top of
+that, a centred frame cannot be emitted before the ``n_fft // 2`` samples
+after its centre have arrived, which ``lookahead`` reports in seconds.
+"""
+
+import logging
+import statistics
+import time
+import numpy as np
+
+from .envelopes import sliding_max
+from .features import FeatureEngine, warm_up
+from .logging import unmeasured
+from .parameters import (
+    DEFAULT_N_FFT,
+    DEFAULT_HOP_LENGTH,
+    DEFAULT_N_MFCC,
+    DEFAULT_ENVELOPE_FRAME_SIZE,
+    DEFAULT_ENVELOPE_HOP_LENGTH,
+    DEFAULT_CALLBACK_LENGTH,
+)
+
+# Features that can be computed in real time
+REALTIME_FEATURES = ("envelope", "rms", "mfcc")
+
+
+class RingBuffer:
+    """A fixed-size buffer of the most recent samples of a stream.
+
+    Samples are addressed by their absolute index in the stream. Indices
+    before the start of the stream or after its end read as zeros, which
+    gives the padding of centred frames for free.
+
+    Args:
+        capacity (int): The number of samples kept.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._data = np.zeros(capacity, dtype=np.float32)
+        self.start = 0
+        self.end = 0
+
+    def write(self, block):
+        """Append a block of samples to the stream."""
+        n = len(block)
+        if self.end + n - self.start > self.capacity:
+            raise ValueError(
+                f"Ring buffer overrun: {n} new samples do not fit in "
+                f"{self.capacity - (self.end - self.start)} free samples"
+            )
+        position = self.end % self.capacity
+        head = min(n, self.capacity - position)
+        stop = position + head
+        self._data[position:stop] = block[:head]
+        self._data[: n - head] = block[head:]
+        self.end += n
+
+    def read(self, start, stop):
+        """Return a copy of the samples from ``start`` to ``stop``."""
+        if max(start, 0) < self.start:
+            raise ValueError(f"Sample {start} was already discarded")
+        out = np.zeros(stop - start, dtype=np.float32)
+        first, last = max(start, self.start, 0), min(stop, self.end)
+        if first < last:
+            index = np.arange(first, last) % self.capacity
+            lo, hi = first - start, last - start
+            out[lo:hi] = self._data[index]
+        return out
+
+    def discard(self, index):
+        """Free the samples before ``index``."""
+        self.start = max(self.start, min(index, self.end))
+
+
+class _FrameTrack:
+    """The framing of one feature over the stream.
+
+    Frame ``i`` covers the samples from ``i * hop_length - pad`` to
+    ``i * hop_length - pad + frame_length``.
+    """
+
+    def __init__(self, frame_length, hop_length, pad=0):
+        self.frame_length = frame_length
+        self.hop_length = hop_length
+        self.pad = pad
+        self.next_frame = 0
+
+    def frame_start(self, frame):
+        return frame * self.hop_length - self.pad
+
+    def complete_frames(self, end, final=False):
+        """Return the index after the last frame complete at ``end``."""
+        if final and self.pad:
+            # Centred framing stops at the frame centred on the last hop
+            return 1 + end // self.hop_length
+        available = end + self.pad - self.frame_length
+        if available < 0:
+            return 0
+        return 1 + available // self.hop_length
+
+
+class RealtimeAnalyser:
+    """Compute features incrementally from audio callbacks.
+
+    Args:
+        sr (int): The sampling rate of the stream.
+        features (tuple): Any of "envelope", "rms" and "mfcc".
+        n_fft (int): The length of the windowed signal for FFT.
+        hop_length (int): The number of samples between successive frames.
+        frame_size (int): The frame size of the amplitude envelope.
+        envelope_hop_length (int): The hop length of the amplitude envelope.
+        n_mfcc (int): The number of MFCCs to return.
+        max_callback_length (int): The largest callback the analyser
+            accepts, which sizes the ring buffer.
+    """
+
+    def __init__(
+        self,
+        sr,
+        features=REALTIME_FEATURES,
+        n_fft=DEFAULT_N_FFT,
+        hop_length=DEFAULT_HOP_LENGTH,
+        frame_size=DEFAULT_ENVELOPE_FRAME_SIZE,
+        envelope_hop_length=DEFAULT_ENVELOPE_HOP_LENGTH,
+        n_mfcc=DEFAULT_N_MFCC,
+        max_callback_length=DEFAULT_CALLBACK_LENGTH,
+    ):
+        unknown = set(features) - set(REALTIME_FEATURES)
+        if unknown:
+            raise ValueError(f"Unknown real-time features: {sorted(unknown)}")
+
+        self.sr = sr
+        self.features = tuple(features)
+        self.n_fft = n_fft
+        self.n_mfcc = n_mfcc
+        self.tracks = {}
+        if "envelope" in features:
+            self.tracks["envelope"] = _FrameTrack(
+                frame_size, envelope_hop_length
+            )
+        if set(features) - {"envelope"}:
+            self.tracks["stft"] = _FrameTrack(
+                n_fft, hop_length, pad=n_fft // 2
+            )
+        if "stft" in self.tracks:
+            # Import librosa's submodules, which it loads lazily on first
+            # use, and build the window and filters up front, so that the
+            # first frame does not wait
+            warm_up(sr, n_fft=n_fft, hop_length=hop_length)
+
+        longest = max(track.frame_length for track in self.tracks.values())
+        self.buffer = RingBuffer(longest + max_callback_length)
+        self.latencies = {name: [] for name in self.tracks}
+        self.finished = False
+
+    @property
+    def lookahead(self):
+        """The delay in seconds between a frame's centre and its end."""
+        if "stft" not in self.tracks:
+            return 0.0
+        return self.tracks["stft"].pad / self.sr
+
+    def process(self, block):
+        """Add a callback of samples and return the frames it completed.
+
+        Args:
+            block (np.ndarray): The new mono samples.
+
+        Returns:
+            dict: The new frames keyed by feature name, with time along the
+            last axis. Features without a complete frame have none.
+        """
+        if self.finished:
+            raise ValueError("The stream has already been flushed")
+        arrived = time.perf_counter()
+        self.buffer.write(np.asarray(block, dtype=np.float32))
+        return self._emit(arrived, final=False)
+
+    def flush(self):
+        """End the stream and return the frames that read past its end."""
+        arrived = time.perf_counter()
+        self.finished = True
+        return self._emit(arrived, final=True)
+
+    def _emit(self, arrived, final):
+        results = {}
+        with unmeasured():
+            for name, track in self.tracks.items():
+                stop = track.complete_frames(self.buffer.end, final=final)
+                first = track.next_frame
+                if stop > first:
+                    start = track.frame_start(first)
+                    end = track.frame_start(stop - 1) + track.frame_length
+                    chunk = self.buffer.read(start, end)
+                    if name == "envelope":
+                        results["envelope"] = sliding_max(
+                            chunk, track.frame_length, track.hop_length
+                        )
+                    else:
+                        results.update(self._stft_features(chunk, track))
+                    track.next_frame = stop
+                    latency = time.perf_counter() - arrived
+                    self.latencies[name].extend([latency] * (stop - first))
+                elif name == "envelope":
+                    results["envelope"] = np.zeros(0, dtype=np.float32)
+                else:
+                    results.update(self._empty_stft_features())
+
+        self.buffer.discard(
+            min(
+                track.frame_start(track.next_frame)
+                for track in self.tracks.values()
+            )
+        )
+        return results
+
+    def _stft_features(self, chunk, track):
+        engine = FeatureEngine(
+            chunk,
+            self.sr,
+            n_fft=track.frame_length,
+            hop_length=track.hop_length,
+            center=False,
+        )
+        results = {}
+        if "rms" in self.features:
+            results["rms"] = engine.rms()
+        if "mfcc" in self.features:
+            results["mfcc"] = engine.mfcc(n_mfcc=self.n_mfcc, top_db=None)
+        return results
+
+    def _empty_stft_features(self):
+        empty = {
+            "rms": np.zeros(0, dtype=np.float32),
+            "mfcc": np.zeros((self.n_mfcc, 0), dtype=np.float32),
+        }
+        return {name: empty[name] for name in self.features if name in empty}
+
+    def latency_summary(self):
+        """Summarise the per-frame processing latency in milliseconds.
+
+        Returns:
+            list: A dict per framing ("envelope" or "stft") with its number
+            of frames and the median, 95th percentile and maximum latency.
+        """
+        rows = []
+        for name, latencies in self.latencies.items():
+            if not latencies:
+                continue
+            milliseconds = np.array(latencies) * 1000
+            rows.append(
+                {
+                    "framing": name,
+                    "frames": len(latencies),
+                    "median_ms": statistics.median(milliseconds),
+                    "p95_ms": float(np.percentile(milliseconds, 95)),
+                    "max_ms": float(milliseconds.max()),
+                }
+            )
+        return rows
+
+
+def replay(analyser, y, callback_length=DEFAULT_CALLBACK_LENGTH, pace=False):
+    """Feed a decoded signal to an analyser in callbacks.
+
+    Args:
+        analyser (RealtimeAnalyser): The analyser to feed.
+        y (np.ndarray): The audio time series, at the analyser's rate.
+        callback_length (int): The number of samples per callback.
+        pace (bool): Whether to wait between callbacks so that they arrive
+            at the rate of live audio.
+
+    Yields:
+        dict: The frames of each callback, then those of the final flush.
+    """
+    logging.info(
+        f"Replaying {len(y) / analyser.sr:.1f} s in callbacks of "
+        f"{callback_length} samples "
+        f"(lookahead {analyser.lookahead * 1000:.1f} ms)"
+    )
+    period = callback_length / analyser.sr
+    started = time.perf_counter()
+    for index, start in enumerate(range(0, len(y), callback_length)):
+        if pace:
+            delay = started + index * period - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        stop = start + callback_length
+        yield analyser.process(y[start:stop])
+    yield analyser.flush()
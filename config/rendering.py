@@ -0,0 +1,78 @@
+"""Headless rendering of analysis figures.
+
+Figures are drawn on the pre-styled templates of ``matplotlib_plots`` and
+saved on the Agg canvas, without pyplot or a display. ``RenderPool`` runs
+the rendering in its own worker processes, so that PNGs are written while
+the features of the next files are still being computed.
+
+A renderer is a module-level function ``draw(template, data)`` that draws
+``data`` on a ``FigureTemplate``. It must be importable by name so that it
+can be sent to the render workers along with its data.
+"""
+
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+from .logging import log_context, stage, worker_initializer
+from .matplotlib_plots import get_template
+
+
+def use_headless_backend():
+    """Switch pyplot to the non-interactive Agg backend."""
+    import matplotlib
+
+    matplotlib.use("Agg")
+
+
+def render_figure(draw, data, output_path, kind="signal"):
+    """Draw data on a reused figure template and save it.
+
+    Args:
+        draw (callable): The renderer, called as ``draw(template, data)``.
+        data (dict): The plot data passed to the renderer.
+        output_path (str): The path of the image to write.
+        kind (str): The kind of figure template to draw on.
+
+    Returns:
+        str: The path of the saved image.
+    """
+    with log_context(output_path):
+        with stage("plot", kind=kind):
+            template = get_template(kind).reset()
+            draw(template, data)
+        with stage("save", path=output_path):
+            template.save(output_path)
+        logging.info(f"Plot saved to {output_path}")
+    return output_path
+
+
+class RenderPool:
+    """Worker processes that render figures off the computation path.
+
+    Use as a context manager; leaving it waits for every pending render.
+
+    Args:
+        workers (int): The number of render processes. Defaults to the
+            number of CPUs.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers
+        self._executor = None
+
+    def __enter__(self):
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            **worker_initializer(use_headless_backend),
+        )
+        return self
+
+    def __exit__(self, *exc_info):
+        self._executor.shutdown(wait=True)
+        self._executor = None
+
+    def submit(self, draw, data, output_path, kind="signal"):
+        """Queue a figure for rendering and return its future."""
+        return self._executor.submit(
+            render_figure, draw, data, output_path, kind
+        )
@@ -0,0 +1,345 @@
+"""Local HTTP service computing the analyses of catalogued audio files.
+
+Every analysis script pays for interpreter start, imports and decoding on
+each run. ``AnalysisService`` keeps them paid for: it is a small asyncio
+HTTP server that computes the envelope, RMS, spectrogram and MFCC arrays
+of an audio file, looked up by its key in ``AudioConfig``, and keeps what
+it computed in memory:
+
+- Each worker of its process pool keeps the last ``SERVICE_SIGNAL_CACHE_SIZE``
+  decoded signals, so that the analyses of a file decode it at most once
+  per worker, even when the store of decoded audio is disabled.
+- The event loop keeps the encoded arrays in an LRU cache of at most
+  ``SERVICE_CACHE_MAX_BYTES``, so that a repeated request is answered
+  without leaving the event loop. Concurrent requests for the same array
+  share a single computation.
+
+Both caches are keyed on the size and modification time of the audio
+file, so a changed file is analysed again. Below them, the on-disk
+feature cache and the store of decoded audio still apply.
+
+Routes, all GET:
+
+- ``/analyses``: the names of the analyses, as JSON.
+- ``/files``: the aliases and catalogue keys of the audio files, as JSON.
+- ``/stats``: the hits, misses and size of the array cache, as JSON.
+- ``/<analysis>/<key>``: the full feature array of the analysis, time
+  along the last axis, as an ``.npy`` file (``numpy.load`` reads it back
+  without copying the data). Its parameters, such as the sample rate and
+  hop length, are sent as ``X-Sr``, ``X-Hop-Length`` and similar headers.
+"""
+
+import asyncio
+import collections
+import functools
+import io
+import json
+import logging
+import os
+import urllib.parse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .config import audio_config, get_sample_rate, get_setting
+from .logging import stage, worker_initializer
+from .parameters import SERVICE_SIGNAL_CACHE_SIZE
+
+# Analyses served, as in ``config.analyses.ANALYSES``
+SERVICE_ANALYSES = ("envelope", "rms", "spectrogram", "mfcc")
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+}
+
+
+def encode_array(array):
+    """Encode an array as the bytes of an ``.npy`` file."""
+    buffer = io.BytesIO()
+    np.save(buffer, np.ascontiguousarray(array), allow_pickle=False)
+    return buffer.getvalue()
+
+
+@functools.lru_cache(maxsize=SERVICE_SIGNAL_CACHE_SIZE)
+def _signal(audio_file_path, sr, source):
+    """Load a decoded signal into memory, once per worker and version.
+
+    ``source`` holds the size and modification time of the file, so that
+    a changed file is loaded again.
+    """
+    from .utils import load_audio_file
+
+    y, sr = load_audio_file(audio_file_path, sr=sr)
+    return np.array(y), sr
+
+
+def _compute(audio_file_path, analysis, source):
+    """Compute the encoded feature array of an analysis in a worker.
+
+    Returns:
+        tuple: The ``.npy`` bytes of the array and its parameters.
+    """
+    from .analyses import analysis_arrays
+    from .features import FeatureEngine
+
+    y, sr = _signal(audio_file_path, get_sample_rate(analysis), source)
+    with stage(f"service.{analysis}", file=audio_file_path):
+        frames, params = analysis_arrays(
+            analysis, audio_file_path, y, sr, FeatureEngine(y, sr)
+        )
+        return encode_array(frames), params
+
+
+class LRUCache:
+    """In-memory cache of byte strings with a size cap and LRU eviction.
+
+    Args:
+        max_bytes (int): The size cap of the cache. A cap of 0 disables the
+            cache.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+
+    def get(self, key):
+        """Return the value of a key, or None, and refresh its recency."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key, body, params):
+        """Cache a body and its parameters, evicting the oldest entries."""
+        if len(body) > self.max_bytes:
+            return
+        if key in self._entries:
+            self.size -= len(self._entries.pop(key)[0])
+        self._entries[key] = (body, params)
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            evicted, _ = self._entries.popitem(last=False)[1]
+            self.size -= len(evicted)
+
+    def stats(self):
+        """Return the hits, misses and size of the cache."""
+        return {
+            "entries": len(self._entries),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def _header_name(param):
+    """Return the response header of a parameter, e.g. X-Hop-Length."""
+    return "X-" + "-".join(
+        word.capitalize() for word in param.split("_") if word
+    )
+
+
+class AnalysisService:
+    """Asyncio HTTP service serving the feature arrays of audio files.
+
+    Args:
+        workers (int): The number of worker processes. Defaults to the
+            number of CPUs.
+        max_bytes (int): The size cap of the in-memory array cache.
+            Defaults to the SERVICE_CACHE_MAX_BYTES setting.
+    """
+
+    def __init__(self, workers=None, max_bytes=None):
+        self.workers = workers
+        if max_bytes is None:
+            max_bytes = get_setting("SERVICE_CACHE_MAX_BYTES")
+        self.cache = LRUCache(max_bytes)
+        self._pending = {}
+        self._executor = None
+
+    def _finish(self, key, future):
+        """Cache the result of a computation and forget it as pending."""
+        self._pending.pop(key, None)
+        if not future.cancelled() and future.exception() is None:
+            self.cache.put(key, *future.result())
+
+    async def features(self, analysis, audio_key):
+        """Return the encoded feature array of an analysis of a file.
+
+        Returns:
+            tuple: The ``.npy`` bytes of the array and its parameters.
+
+        Raises:
+            KeyError: If the analysis or the audio key is unknown.
+        """
+        if analysis not in SERVICE_ANALYSES:
+            raise KeyError(f"Unknown analysis: {analysis}")
+        audio_file_path = audio_config.get_audio_file(audio_key)
+        if not audio_file_path or not os.path.isfile(audio_file_path):
+            raise KeyError(f"Audio file key '{audio_key}' not found.")
+
+        stat = os.stat(audio_file_path)
+        source = (stat.st_size, stat.st_mtime_ns)
+        key = (os.path.abspath(audio_file_path), analysis) + source
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(
+                self._executor, _compute, audio_file_path, analysis, source
+            )
+            self._pending[key] = future
+            future.add_done_callback(functools.partial(self._finish, key))
+        # A client that disconnects must not cancel the shared computation
+        return await asyncio.shield(future)
+
+    def audio_keys(self):
+        """Return the aliases and catalogue keys of the audio files."""
+        keys = {
+            alias
+            for alias, path in audio_config.audio_files.items()
+            if os.path.isfile(path)
+        }
+        keys.update(entry["key"] for entry in audio_config.catalogue.filter())
+        return sorted(keys)
+
+    async def respond(self, method, target):
+        """Answer a request.
+
+        Returns:
+            tuple: The status code, extra headers and body of the response.
+        """
+        if method != "GET":
+            return _json(405, {"error": f"Method not allowed: {method}"})
+
+        path = urllib.parse.unquote(urllib.parse.urlsplit(target).path)
+        route = path.strip("/").split("/", 1)
+        if route == ["analyses"]:
+            return _json(200, {"analyses": list(SERVICE_ANALYSES)})
+        if route == ["files"]:
+            return _json(200, {"files": self.audio_keys()})
+        if route == ["stats"]:
+            return _json(200, self.cache.stats())
+        if len(route) != 2:
+            return _json(404, {"error": f"Unknown route: {path}"})
+
+        analysis, audio_key = route
+        try:
+            body, params = await self.features(analysis, audio_key)
+        except KeyError as e:
+            return _json(404, {"error": e.args[0]})
+        except Exception as e:
+            logging.error(f"Error computing {analysis} of {audio_key}: {e}")
+            return _json(500, {"error": str(e)})
+        headers = {"Content-Type": "application/x-npy"}
+        headers.update(
+            {_header_name(name): str(value) for name, value in params.items()}
+        )
+        return 200, headers, body
+
+    async def _answer(self, request_line, headers):
+        """Answer a parsed request.
+
+        Returns:
+            tuple: The status code, extra headers and body of the response,
+            and whether to keep the connection alive.
+        """
+        parts = request_line.decode("latin-1").split()
+        if len(parts) != 3:
+            status, extra, body = _json(
+                400, {"error": "Malformed request line."}
+            )
+            return status, extra, body, False
+
+        method, target, version = parts
+        status, extra, body = await self.respond(method, target)
+        connection = headers.get("connection", "").lower()
+        if version == "HTTP/1.1":
+            keep_alive = connection != "close"
+        else:
+            keep_alive = connection == "keep-alive"
+        return status, extra, body, keep_alive
+
+    async def handle(self, reader, writer):
+        """Serve the requests of a connection, kept alive as asked.
+
+        A request line or header longer than the limit of the stream is
+        answered with a 431 and closes the connection, since the rest of
+        the line cannot be told apart from the next request.
+        """
+        try:
+            while True:
+                try:
+                    request_line = await reader.readline()
+                    if not request_line.strip():
+                        break
+                    headers = await _read_headers(reader)
+                except (ValueError, asyncio.LimitOverrunError):
+                    status, extra, body = _json(
+                        431, {"error": "Request line or header too long."}
+                    )
+                    keep_alive = False
+                else:
+                    response = await self._answer(request_line, headers)
+                    status, extra, body, keep_alive = response
+
+                extra["Content-Length"] = str(len(body))
+                extra["Connection"] = "keep-alive" if keep_alive else "close"
+                head = f"HTTP/1.1 {status} {_REASONS[status]}\r\n" + "".join(
+                    f"{name}: {value}\r\n" for name, value in extra.items()
+                )
+                writer.write(head.encode("latin-1") + b"\r\n" + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host, port):
+        """Serve requests on ``host:port`` until cancelled.
+
+        The audio catalogue is brought up to date first, so that every
+        file of the audio directory can be requested by its key.
+        """
+        audio_config.update_catalogue()
+        with ProcessPoolExecutor(
+            max_workers=self.workers, **worker_initializer()
+        ) as executor:
+            self._executor = executor
+            server = await asyncio.start_server(self.handle, host, port)
+            logging.info(f"Analysis service listening on http://{host}:{port}")
+            async with server:
+                await server.serve_forever()
+
+
+async def _read_headers(reader):
+    """Read the header lines of a request, up to the blank line."""
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if not line.strip():
+            return headers
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+
+def _json(status, payload):
+    """Return a JSON response."""
+    body = json.dumps(payload).encode()
+    return status, {"Content-Type": "application/json"}, body
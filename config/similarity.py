@@ -0,0 +1,381 @@
+"""Nearest-neighbour search over MFCC summaries of the audio files.
+
+Each file is summarised by the mean and standard deviation of its MFCCs
+over time, leaving out the first coefficient, which follows the level of
+the recording rather than its timbre. The summary is normalised to unit
+length, so the similarity of two files is the cosine of their summaries
+and finding the most similar files is a maximum inner product search.
+
+``SimilarityIndex`` keeps the summaries of a collection in a single
+``.npz`` file. Up to ``SIMILARITY_IVF_MIN_FILES`` files it answers queries
+exactly with one matrix product over all summaries. Larger collections
+are clustered with spherical k-means into an inverted file (IVF) of about
+``sqrt(n)`` lists, and a query only scans the lists of the
+``SIMILARITY_N_PROBE`` centroids closest to it, which keeps the latency
+low for hundreds of thousands of files at the cost of occasionally
+missing a neighbour in an unprobed list.
+
+``update_similarity_index`` brings the index up to date with the audio
+directory: files that are new or changed since they were indexed are
+summarised and inserted into the lists of their closest centroid, removed
+files are dropped, and the lists are trained again once the collection
+has doubled since they were last trained.
+"""
+
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from .config import audio_config, get_setting
+from .logging import worker_initializer
+from .parameters import (
+    DEFAULT_N_MFCC,
+    SIMILARITY_IVF_MIN_FILES,
+    SIMILARITY_KMEANS_ITERATIONS,
+    SIMILARITY_N_PROBE,
+)
+
+# Rows of summaries scored at once while clustering
+_SCORE_ROWS = 2**14
+
+
+def summarise_mfcc(mfcc):
+    """Summarise MFCC frames as a unit vector.
+
+    Args:
+        mfcc (np.ndarray): The MFCCs, of shape (n_mfcc, frames).
+
+    Returns:
+        np.ndarray: The float32 mean and standard deviation over time of
+        every coefficient but the first, normalised to unit length.
+    """
+    coefficients = np.asarray(mfcc, dtype=np.float64)[1:]
+    summary = np.concatenate(
+        [coefficients.mean(axis=-1), coefficients.std(axis=-1)]
+    )
+    norm = np.linalg.norm(summary)
+    if norm > 0:
+        summary /= norm
+    return summary.astype(np.float32)
+
+
+def file_summary(audio_file_path, n_mfcc=DEFAULT_N_MFCC):
+    """Compute the MFCC summary of an audio file.
+
+    The MFCCs go through the feature cache, so files already analysed by
+    the MFCC analysis are not transformed again.
+    """
+    from .features import cached_features
+    from .utils import load_analysis_audio
+
+    y, sr = load_analysis_audio(audio_file_path, "mfcc")
+    mfcc = cached_features(
+        audio_file_path, y, sr, features=("mfcc",), n_mfcc=n_mfcc
+    )["mfcc"]
+    return summarise_mfcc(mfcc)
+
+
+def _top_k(scores, k):
+    """Return the indices of the ``k`` largest scores, largest first."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+def spherical_kmeans(vectors, n_clusters, iterations, seed=0):
+    """Cluster unit vectors by cosine similarity.
+
+    Args:
+        vectors (np.ndarray): The unit vectors, one per row.
+        n_clusters (int): The number of clusters.
+        iterations (int): The number of assignment and update rounds.
+        seed (int): The seed of the initial centroids.
+
+    Returns:
+        tuple: The unit centroids, one per row, and the cluster of every
+        vector.
+    """
+    rng = np.random.default_rng(seed)
+    n_clusters = min(n_clusters, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)]
+    for _ in range(iterations):
+        assignments = assign_clusters(vectors, centroids)
+        sums = np.stack(
+            [
+                np.bincount(assignments, weights=column, minlength=n_clusters)
+                for column in vectors.T
+            ],
+            axis=1,
+        )
+        norms = np.linalg.norm(sums, axis=1)
+        # Reseed empty clusters with random vectors
+        empty = norms == 0
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+        norms[empty] = 1.0
+        centroids = (sums / norms[:, np.newaxis]).astype(np.float32)
+    return centroids, assign_clusters(vectors, centroids)
+
+
+def assign_clusters(vectors, centroids):
+    """Return the closest centroid of every vector, in blocks of rows."""
+    assignments = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), _SCORE_ROWS):
+        stop = start + _SCORE_ROWS
+        scores = vectors[start:stop] @ centroids.T
+        assignments[start:stop] = scores.argmax(axis=1)
+    return assignments
+
+
+class SimilarityIndex:
+    """A persistent nearest-neighbour index of file summaries.
+
+    Args:
+        path (str): The path of the ``.npz`` index file, loaded if it
+            exists. Defaults to the SIMILARITY_INDEX_PATH setting.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or get_setting("SIMILARITY_INDEX_PATH")
+        self.keys = []
+        self.sources = np.zeros((0, 2), dtype=np.int64)
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.centroids = None
+        self.assignments = np.zeros(0, dtype=np.int64)
+        self.trained_size = 0
+        self._rows = {}
+        self._lists = None
+        if os.path.exists(self.path):
+            self._load()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self._rows
+
+    @property
+    def trained(self):
+        """Whether queries search the inverted lists."""
+        return self.centroids is not None
+
+    def _load(self):
+        with np.load(self.path) as arrays:
+            self.keys = arrays["keys"].tolist()
+            self.sources = arrays["sources"]
+            self.vectors = arrays["vectors"]
+            if "centroids" in arrays:
+                self.centroids = arrays["centroids"]
+                self.assignments = arrays["assignments"]
+                self.trained_size = int(arrays["trained_size"])
+        self._rows = {key: row for row, key in enumerate(self.keys)}
+
+    def save(self):
+        """Write the index to its file atomically."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        arrays = {
+            "keys": np.array(self.keys, dtype=str),
+            "sources": self.sources,
+            "vectors": self.vectors,
+        }
+        if self.trained:
+            arrays.update(
+                centroids=self.centroids,
+                assignments=self.assignments,
+                trained_size=np.array(self.trained_size),
+            )
+        tmp_path = f"{self.path}.tmp.npz"
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, self.path)
+        logging.info(f"Similarity index of {len(self)} files saved")
+
+    def source(self, key):
+        """Return the size and mtime the summary of a key was computed at."""
+        row = self._rows.get(key)
+        return None if row is None else tuple(self.sources[row])
+
+    def remove(self, keys):
+        """Remove files from the index."""
+        rows = [self._rows[key] for key in keys if key in self._rows]
+        if not rows:
+            return
+        self.keys = np.delete(np.array(self.keys, dtype=object), rows).tolist()
+        self.sources = np.delete(self.sources, rows, axis=0)
+        self.vectors = np.delete(self.vectors, rows, axis=0)
+        if self.trained:
+            self.assignments = np.delete(self.assignments, rows)
+        self._rows = {key: row for row, key in enumerate(self.keys)}
+        self._lists = None
+
+    def add(self, keys, vectors, sources):
+        """Insert or replace the summaries of files.
+
+        New summaries join the list of their closest centroid. The lists
+        are trained, or trained again, once the index holds
+        ``SIMILARITY_IVF_MIN_FILES`` files and twice as many as when they
+        were last trained.
+
+        Args:
+            keys (list): The catalogue keys of the files.
+            vectors (np.ndarray): Their summaries, one per row.
+            sources (np.ndarray): Their size and modification time.
+        """
+        if not len(keys):
+            return
+        self.remove(keys)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not len(self.vectors):
+            self.vectors = self.vectors.reshape(0, vectors.shape[1])
+        self._rows.update(
+            (key, row) for row, key in enumerate(keys, start=len(self.keys))
+        )
+        self.keys.extend(keys)
+        self.sources = np.concatenate(
+            [self.sources, np.asarray(sources, dtype=np.int64)]
+        )
+        self.vectors = np.concatenate([self.vectors, vectors])
+        if self.trained:
+            self.assignments = np.concatenate(
+                [self.assignments, assign_clusters(vectors, self.centroids)]
+            )
+            self._lists = None
+
+        if len(self) >= max(SIMILARITY_IVF_MIN_FILES, 2 * self.trained_size):
+            self.train()
+
+    def train(self, n_lists=None, iterations=SIMILARITY_KMEANS_ITERATIONS):
+        """Cluster the summaries into inverted lists.
+
+        Args:
+            n_lists (int): The number of lists. Defaults to the square root
+                of the number of files.
+            iterations (int): The number of k-means rounds.
+        """
+        if n_lists is None:
+            n_lists = max(1, int(np.sqrt(len(self))))
+        logging.info(
+            f"Training the similarity index: {len(self)} files "
+            f"in {n_lists} lists"
+        )
+        self.centroids, self.assignments = spherical_kmeans(
+            self.vectors, n_lists, iterations
+        )
+        self.trained_size = len(self)
+        self._lists = None
+
+    def _inverted_lists(self):
+        """Return the rows of every list, sorted by list, and their bounds."""
+        if self._lists is None:
+            order = np.argsort(self.assignments, kind="stable")
+            bounds = np.searchsorted(
+                self.assignments[order], np.arange(len(self.centroids) + 1)
+            )
+            self._lists = order, bounds
+        return self._lists
+
+    def _candidates(self, vector, n_probe):
+        """Return the rows of the lists of the centroids closest to a query."""
+        order, bounds = self._inverted_lists()
+        rows = []
+        for i in _top_k(self.centroids @ vector, n_probe):
+            start, stop = bounds[i], bounds[i + 1]
+            rows.append(order[start:stop])
+        return np.concatenate(rows)
+
+    def query(self, vector, k=10, n_probe=SIMILARITY_N_PROBE, exact=False):
+        """Return the files most similar to a summary.
+
+        Args:
+            vector (np.ndarray): The summary to search for.
+            k (int): The number of files to return.
+            n_probe (int): The number of inverted lists scanned.
+            exact (bool): Whether to scan every file even if the index is
+                trained.
+
+        Returns:
+            list: The (key, similarity) pairs of the ``k`` most similar
+            files, most similar first.
+        """
+        if not len(self):
+            return []
+        vector = np.asarray(vector, dtype=np.float32)
+        if self.trained and not exact:
+            rows = self._candidates(vector, n_probe)
+        else:
+            rows = np.arange(len(self))
+        scores = self.vectors[rows] @ vector
+        top = _top_k(scores, k)
+        return [(self.keys[rows[i]], float(scores[i])) for i in top]
+
+    def query_key(self, key, k=10, **kwargs):
+        """Return the files most similar to an indexed file, except itself."""
+        vector = self.vectors[self._rows[key]]
+        matches = self.query(vector, k + 1, **kwargs)
+        return [match for match in matches if match[0] != key][:k]
+
+
+def update_similarity_index(index=None, audio_dir=None, workers=None):
+    """Summarise the new and changed files of a directory into an index.
+
+    Args:
+        index (SimilarityIndex): The index to update. Defaults to the index
+            at the SIMILARITY_INDEX_PATH setting.
+        audio_dir (str): The directory of the audio files. Defaults to the
+            AUDIO_DIR setting.
+        workers (int): The number of processes summarising files. Defaults
+            to the number of CPUs.
+
+    Returns:
+        dict: The number of "added", "removed", "unchanged" and "failed"
+        files.
+    """
+    if index is None:
+        index = SimilarityIndex()
+    catalogue = audio_config.catalogue_for(audio_dir)
+    catalogue.update()
+    entries = catalogue.filter()
+
+    current = {entry["key"] for entry in entries}
+    removed = [key for key in index.keys if key not in current]
+    index.remove(removed)
+    pending = [
+        entry
+        for entry in entries
+        if index.source(entry["key"]) != (entry["size"], entry["mtime_ns"])
+    ]
+    counts = {
+        "added": 0,
+        "removed": len(removed),
+        "unchanged": len(entries) - len(pending),
+        "failed": 0,
+    }
+
+    keys, vectors, sources = [], [], []
+    if pending:
+        with ProcessPoolExecutor(
+            max_workers=workers, **worker_initializer()
+        ) as executor:
+            futures = {
+                executor.submit(file_summary, entry["path"]): entry
+                for entry in pending
+            }
+            for future in as_completed(futures):
+                entry = futures[future]
+                try:
+                    vectors.append(future.result())
+                except Exception as e:
+                    logging.error(f"Error summarising {entry['path']}: {e}")
+                    counts["failed"] += 1
+                    continue
+                keys.append(entry["key"])
+                sources.append((entry["size"], entry["mtime_ns"]))
+    index.add(keys, np.array(vectors), np.array(sources))
+    counts["added"] = len(keys)
+
+    if removed or keys or not os.path.exists(index.path):
+        index.save()
+    logging.info(f"Similarity index updated: {counts}")
+    return counts
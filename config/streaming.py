@@ -0,0 +1,203 @@
+"""Block-streaming analysis for long recordings.
+
+The in-memory analyses decode the whole file before computing anything.
+The functions here read the file in fixed-size blocks instead and carry
+the samples shared by neighbouring frames from one block to the next, so
+peak memory depends on the block size rather than on the file length.
+
+Every block yields the frames that became complete with it. Concatenating
+the frames of all blocks gives the same result as the in-memory path, up
+to floating point rounding in the mel projection:
+
+- ``envelope`` matches ``calculate_amplitude_envelope`` on the whole signal.
+- ``stft``, ``rms`` and ``spectrogram`` match ``FeatureEngine``.
+- ``mfcc`` matches ``FeatureEngine.mfcc(top_db=None)``. The default 80 dB
+  floor is relative to the loudest frame of the whole file, which is not
+  known until the stream has ended.
+"""
+
+import logging
+import numpy as np
+
+from .envelopes import sliding_max
+from .features import FeatureEngine
+from .parameters import (
+    DEFAULT_N_FFT,
+    DEFAULT_HOP_LENGTH,
+    DEFAULT_N_MFCC,
+    DEFAULT_ENVELOPE_FRAME_SIZE,
+    DEFAULT_ENVELOPE_HOP_LENGTH,
+    DEFAULT_BLOCK_LENGTH,
+)
+
+# Features that can be computed while streaming
+STREAM_FEATURES = ("envelope", "stft", "spectrogram", "rms", "mfcc")
+
+
+class FrameCarry:
+    """Carry the overlap between blocks so frames can span block edges.
+
+    Args:
+        frame_length (int): The length of each frame.
+        hop_length (int): The number of samples between successive frames.
+        pad (int): The number of zeros added before the first and after the
+            last sample, as done by centred framing.
+    """
+
+    def __init__(self, frame_length, hop_length, pad=0):
+        self.frame_length = frame_length
+        self.hop_length = hop_length
+        self.pad = pad
+        self._buffer = np.zeros(pad, dtype=np.float32)
+
+    def push(self, block, final=False):
+        """Add a block and return the samples covering every new frame.
+
+        The returned array can be framed with ``center=False`` and holds
+        exactly the frames completed by this block. The samples needed by
+        later frames are kept for the next call.
+        """
+        parts = [self._buffer, block]
+        if final and self.pad:
+            parts.append(np.zeros(self.pad, dtype=self._buffer.dtype))
+        buffer = np.concatenate(parts)
+
+        if len(buffer) < self.frame_length:
+            self._buffer = buffer
+            return buffer[:0]
+
+        n_frames = 1 + (len(buffer) - self.frame_length) // self.hop_length
+        consumed = n_frames * self.hop_length
+        self._buffer = buffer[consumed:]
+        end = (n_frames - 1) * self.hop_length + self.frame_length
+        return buffer[:end]
+
+
+def iter_blocks(audio_file_path, block_length=DEFAULT_BLOCK_LENGTH):
+    """Read a mono float32 audio file block by block.
+
+    Args:
+        audio_file_path (str): The path to the audio file.
+        block_length (int): The number of samples per block.
+
+    Yields:
+        tuple: A tuple containing:
+            - block (np.ndarray): The samples of the block, downmixed to mono.
+            - sr (int): The sampling rate of the audio.
+            - final (bool): Whether this is the last block of the file.
+    """
+    import soundfile as sf
+
+    with sf.SoundFile(audio_file_path) as audio_file:
+        sr = audio_file.samplerate
+        block = _read_mono(audio_file, block_length)
+        while len(block):
+            next_block = _read_mono(audio_file, block_length)
+            final = len(next_block) == 0
+            yield block, sr, final
+            block = next_block
+
+
+def _read_mono(audio_file, block_length):
+    """Read one block and downmix it the way ``librosa.load`` does."""
+    import librosa
+
+    block = audio_file.read(block_length, dtype="float32", always_2d=True)
+    return librosa.to_mono(block.T)
+
+
+def stream_features(
+    audio_file_path,
+    features=STREAM_FEATURES,
+    block_length=DEFAULT_BLOCK_LENGTH,
+    n_fft=DEFAULT_N_FFT,
+    hop_length=DEFAULT_HOP_LENGTH,
+    frame_size=DEFAULT_ENVELOPE_FRAME_SIZE,
+    envelope_hop_length=DEFAULT_ENVELOPE_HOP_LENGTH,
+    n_mfcc=DEFAULT_N_MFCC,
+):
+    """Compute features incrementally over fixed-size blocks.
+
+    Args:
+        audio_file_path (str): The path to the audio file.
+        features (tuple): Any of "envelope", "stft", "spectrogram", "rms"
+            and "mfcc".
+        block_length (int): The number of samples read per block.
+        n_fft (int): The length of the windowed signal for FFT.
+        hop_length (int): The number of samples between successive frames.
+        frame_size (int): The frame size of the amplitude envelope.
+        envelope_hop_length (int): The hop length of the amplitude envelope.
+        n_mfcc (int): The number of MFCCs to return.
+
+    Yields:
+        dict: The frames completed by each block, keyed by feature name.
+        Time runs along the last axis of every array.
+    """
+    unknown = set(features) - set(STREAM_FEATURES)
+    if unknown:
+        raise ValueError(f"Unknown streaming features: {sorted(unknown)}")
+
+    envelope_carry = FrameCarry(frame_size, envelope_hop_length)
+    stft_carry = FrameCarry(n_fft, hop_length, pad=n_fft // 2)
+    needs_stft = bool(set(features) - {"envelope"})
+
+    logging.info(f"Streaming features from: {audio_file_path}")
+    for block, sr, final in iter_blocks(audio_file_path, block_length):
+        results = {}
+        if "envelope" in features:
+            chunk = envelope_carry.push(block)
+            results["envelope"] = _frame_max(
+                chunk, frame_size, envelope_hop_length
+            )
+        if needs_stft:
+            chunk = stft_carry.push(block, final=final)
+            results.update(
+                _stft_features(chunk, sr, features, n_fft, hop_length, n_mfcc)
+            )
+        yield results
+
+
+def _frame_max(chunk, frame_size, hop_length):
+    """Return the maximum of each frame in a carried chunk."""
+    if len(chunk) < frame_size:
+        return np.zeros(0, dtype=chunk.dtype)
+    return sliding_max(chunk, frame_size, hop_length)
+
+
+def _stft_features(chunk, sr, features, n_fft, hop_length, n_mfcc):
+    """Compute the STFT-based features of a carried chunk."""
+    if len(chunk) < n_fft:
+        n_bins = 1 + n_fft // 2
+        empty = {
+            "stft": np.zeros((n_bins, 0), dtype=np.complex64),
+            "spectrogram": np.zeros((n_bins, 0), dtype=np.float32),
+            "rms": np.zeros(0, dtype=np.float32),
+            "mfcc": np.zeros((n_mfcc, 0), dtype=np.float32),
+        }
+        return {name: empty[name] for name in features if name in empty}
+
+    engine = FeatureEngine(
+        chunk, sr, n_fft=n_fft, hop_length=hop_length, center=False
+    )
+    results = {}
+    if "stft" in features:
+        results["stft"] = engine.stft
+    if "spectrogram" in features:
+        results["spectrogram"] = engine.spectrogram()
+    if "rms" in features:
+        results["rms"] = engine.rms()
+    if "mfcc" in features:
+        results["mfcc"] = engine.mfcc(n_mfcc=n_mfcc, top_db=None)
+    return results
+
+
+def collect_features(stream):
+    """Concatenate the per-block frames of a stream along the time axis."""
+    collected = {}
+    for results in stream:
+        for name, frames in results.items():
+            collected.setdefault(name, []).append(frames)
+    return {
+        name: np.concatenate(frames, axis=-1)
+        for name, frames in collected.items()
+    }
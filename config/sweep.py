@@ -0,0 +1,246 @@
+"""Parameter sweeps of the STFT-based features over a single decode.
+
+Tuning ``DEFAULT_N_FFT`` and ``DEFAULT_HOP_LENGTH`` by editing the
+constants and rerunning a script decodes and transforms the file once per
+try. ``sweep`` takes a grid of n_fft, hop length, frame (window) length
+and n_mfcc values and shares the work between its combinations:
+
+- The file is decoded once, into the store of decoded audio, and every
+  worker maps the decoded signal from there.
+- Combinations with the same n_fft and frame length share one STFT: a hop
+  that is a multiple of a finer hop of the grid takes every k-th frame of
+  the finer STFT, which is exactly the STFT at the coarser hop.
+- MFCCs are computed once with the largest n_mfcc of the grid; fewer
+  coefficients are the first rows of the same DCT.
+
+The STFT groups run in parallel in a process pool, whose workers warm up
+librosa before timing anything. Each combination of the report records
+its frequency and time resolution, number of frames, compute time, which
+hop it was derived from, and how close the MFCC summary of the file stays
+to the one at the default parameters.
+"""
+
+import csv
+import itertools
+import logging
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from .features import warm_up
+from .logging import stage, worker_initializer
+from .parameters import DEFAULT_HOP_LENGTH, DEFAULT_N_FFT, DEFAULT_N_MFCC
+
+# Parameters of a sweep grid, in the order of the report
+SWEEP_PARAMETERS = ("n_fft", "hop_length", "frame_length", "n_mfcc")
+
+# Columns of the sweep report
+SWEEP_COLUMNS = SWEEP_PARAMETERS + (
+    "freq_res_hz",
+    "time_res_ms",
+    "frames",
+    "wall_s",
+    "shared_from",
+    "mfcc_similarity",
+)
+
+
+def expand_grid(grid):
+    """Return the valid combinations of a sweep grid.
+
+    Args:
+        grid (dict): Lists of values keyed by parameter name. Missing
+            parameters take their default; a missing frame length is
+            ``n_fft``.
+
+    Returns:
+        list: A dict per combination whose frame length fits in its n_fft.
+    """
+    unknown = set(grid) - set(SWEEP_PARAMETERS)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters: {sorted(unknown)}")
+
+    values = {
+        "n_fft": grid.get("n_fft", [DEFAULT_N_FFT]),
+        "hop_length": grid.get("hop_length", [DEFAULT_HOP_LENGTH]),
+        "frame_length": grid.get("frame_length", [None]),
+        "n_mfcc": grid.get("n_mfcc", [DEFAULT_N_MFCC]),
+    }
+    combinations = []
+    for combination in itertools.product(*values.values()):
+        params = dict(zip(values, combination))
+        if params["frame_length"] is None:
+            params["frame_length"] = params["n_fft"]
+        if params["frame_length"] > params["n_fft"]:
+            logging.warning(f"Skipping frame_length > n_fft: {params}")
+            continue
+        if params not in combinations:
+            combinations.append(params)
+    return combinations
+
+
+def plan_hops(hop_lengths):
+    """Map every hop length to the finest hop it can be derived from.
+
+    Returns:
+        dict: The source hop of every hop, itself for the hops that need
+        their own STFT.
+    """
+    roots, sources = [], {}
+    for hop in sorted(set(hop_lengths)):
+        source = next((root for root in roots if hop % root == 0), None)
+        if source is None:
+            roots.append(hop)
+            source = hop
+        sources[hop] = source
+    return sources
+
+
+def _sweep_group(audio_file_path, analysis, n_fft, frame_length, combos):
+    """Compute the features of the combinations sharing an STFT.
+
+    Returns:
+        list: A row per combination, with the MFCC summary under "summary".
+    """
+    from .features import FeatureEngine
+    from .similarity import summarise_mfcc
+    from .utils import load_analysis_audio
+
+    y, sr = load_analysis_audio(audio_file_path, analysis)
+    sources = plan_hops(combo["hop_length"] for combo in combos)
+    n_mfcc = max(combo["n_mfcc"] for combo in combos)
+    engines, mfccs, rows = {}, {}, []
+    for hop_length in sorted(sources):
+        started = time.perf_counter()
+        source = sources[hop_length]
+        with stage("sweep", n_fft=n_fft, hop_length=hop_length):
+            if source == hop_length:
+                engine = FeatureEngine(
+                    y,
+                    sr,
+                    n_fft=n_fft,
+                    hop_length=hop_length,
+                    win_length=frame_length,
+                )
+            else:
+                engine = engines[source].with_hop_length(hop_length)
+            engines[hop_length] = engine
+            engine.rms()
+            mfccs[hop_length] = engine.mfcc(n_mfcc=n_mfcc)
+        wall = time.perf_counter() - started
+
+        for combo in combos:
+            if combo["hop_length"] != hop_length:
+                continue
+            rows.append(
+                {
+                    **combo,
+                    "freq_res_hz": sr / n_fft,
+                    "time_res_ms": 1000 * hop_length / sr,
+                    "frames": engine.n_frames,
+                    "wall_s": wall,
+                    "shared_from": (
+                        "-" if source == hop_length else f"hop {source}"
+                    ),
+                    "summary": summarise_mfcc(
+                        mfccs[hop_length][: combo["n_mfcc"]]
+                    ),
+                }
+            )
+    return rows
+
+
+def _similarity(summary, reference, n_mfcc):
+    """Return the cosine similarity of MFCC summaries over n_mfcc."""
+    # Summaries hold the means, then the deviations, of coefficients 1..n
+    n, half = n_mfcc - 1, len(reference) // 2
+    stop = half + n
+    reference = np.concatenate([reference[:n], reference[half:stop]])
+    norm = np.linalg.norm(reference) * np.linalg.norm(summary)
+    return float(summary @ reference / norm) if norm else math.nan
+
+
+def sweep(audio_file_path, grid, analysis="mfcc", workers=None):
+    """Compute the features of a file for every combination of a grid.
+
+    Args:
+        audio_file_path (str): The path to the audio file.
+        grid (dict): Lists of "n_fft", "hop_length", "frame_length" and
+            "n_mfcc" values, as in ``expand_grid``.
+        analysis (str): The analysis whose sample rate the file loads at.
+        workers (int): The number of worker processes. Defaults to the
+            number of CPUs.
+
+    Returns:
+        list: A report row per combination, with the columns of
+        ``SWEEP_COLUMNS``.
+    """
+    from .utils import load_analysis_audio
+
+    combinations = expand_grid(grid)
+    groups = {}
+    for combo in combinations:
+        key = (combo["n_fft"], combo["frame_length"])
+        groups.setdefault(key, []).append(combo)
+
+    # Decode once up front, so that every worker maps the stored signal
+    load_analysis_audio(audio_file_path, analysis)
+    max_mfcc = max(combo["n_mfcc"] for combo in combinations)
+    reference = {
+        "n_fft": DEFAULT_N_FFT,
+        "hop_length": DEFAULT_HOP_LENGTH,
+        "frame_length": DEFAULT_N_FFT,
+        "n_mfcc": max_mfcc,
+    }
+    logging.info(
+        f"Sweeping {len(combinations)} combinations of {audio_file_path} "
+        f"in {len(groups)} STFT groups"
+    )
+
+    rows = []
+    # Warm the workers up so that the first group timed does not include
+    # importing librosa
+    with ProcessPoolExecutor(
+        max_workers=workers, **worker_initializer(warm_up)
+    ) as executor:
+        reference_future = executor.submit(
+            _sweep_group,
+            audio_file_path,
+            analysis,
+            DEFAULT_N_FFT,
+            DEFAULT_N_FFT,
+            [reference],
+        )
+        futures = [
+            executor.submit(
+                _sweep_group,
+                audio_file_path,
+                analysis,
+                n_fft,
+                frame_length,
+                combos,
+            )
+            for (n_fft, frame_length), combos in groups.items()
+        ]
+        for future in as_completed(futures):
+            rows.extend(future.result())
+        reference_summary = reference_future.result()[0]["summary"]
+
+    for row in rows:
+        row["mfcc_similarity"] = _similarity(
+            row.pop("summary"), reference_summary, row["n_mfcc"]
+        )
+    return sorted(rows, key=lambda row: [row[p] for p in SWEEP_PARAMETERS])
+
+
+def write_report(rows, path):
+    """Write sweep report rows to a CSV file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", newline="") as report_file:
+        writer = csv.DictWriter(report_file, fieldnames=SWEEP_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    logging.info(f"Sweep report saved to {path}")
@@ -0,0 +1,475 @@
+"""Multi-resolution spectrogram tiles for browsing long recordings.
+
+A full-resolution spectrogram of an hour of audio does not fit in a figure,
+nor comfortably in memory. ``build_pyramid`` instead reads the recording
+and computes its STFT a tile at a time, and stores it as a pyramid of
+levels on disk:
+
+- level 0 holds every STFT frame and frequency bin;
+- each next level halves the number of frames and, down to
+  ``SPECTROGRAM_TILE_MIN_BINS`` bins, the number of frequency bins, keeping
+  the maximum of each pair so that short events stay visible;
+- every level is split in time into tiles of ``SPECTROGRAM_TILE_FRAMES``
+  frames, stored as float16 dB ``.npy`` files.
+
+The top level fits in a single tile. ``TilePyramid`` reads the tiles of a
+time range memory-mapped, and ``SpectrogramViewer`` draws them with plotly,
+choosing the coarsest level that still has a frame per pixel, so the cost
+of a view depends on the figure width and not on the recording length.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import numpy as np
+
+from .bases import stft_window
+from .config import get_sample_rate, get_setting
+from .parameters import (
+    DEFAULT_HOP_LENGTH,
+    DEFAULT_N_FFT,
+    SPECTROGRAM_TILE_FRAMES,
+    SPECTROGRAM_TILE_MIN_BINS,
+)
+from .plotly_plots import configure_plotly_layout
+from .streaming import FrameCarry, iter_blocks
+from .utils import load_audio_file
+
+# Levels computed while building, before the unused top ones are dropped
+_MAX_LEVELS = 24
+
+# Dynamic range shown by the viewer, in dB below the loudest bin
+TOP_DB = 80.0
+
+
+def _pool(x, axis):
+    """Keep the maximum of each pair of rows (axis 0) or columns (axis 1)
+    of a 2-D array, dropping an odd last one."""
+    n_bins, n_frames = x.shape
+    if axis == 0:
+        pairs = x[: n_bins // 2 * 2].reshape(n_bins // 2, 2, n_frames)
+    else:
+        pairs = x[:, : n_frames // 2 * 2].reshape(n_bins, n_frames // 2, 2)
+    return pairs.max(axis=axis + 1)
+
+
+class _LevelWriter:
+    """Write the frames of one pyramid level as tiles."""
+
+    def __init__(self, level_dir, tile_frames):
+        self.level_dir = level_dir
+        self.tile_frames = tile_frames
+        self.pending = []
+        self.n_pending = 0
+        self.n_frames = 0
+        self.n_tiles = 0
+        self.n_bins = None
+
+    def push(self, frames):
+        self.pending.append(frames)
+        self.n_pending += frames.shape[1]
+        self.n_bins = frames.shape[0]
+        while self.n_pending >= self.tile_frames:
+            self._write(self.tile_frames)
+
+    def flush(self):
+        if self.n_pending:
+            self._write(self.n_pending)
+
+    def _write(self, n_frames):
+        frames = np.concatenate(self.pending, axis=1)
+        tile, rest = frames[:, :n_frames], frames[:, n_frames:]
+        self.pending = [rest] if rest.shape[1] else []
+        self.n_pending = rest.shape[1]
+        os.makedirs(self.level_dir, exist_ok=True)
+        np.save(
+            os.path.join(self.level_dir, f"tile_{self.n_tiles}.npy"),
+            tile.astype(np.float16),
+        )
+        self.n_tiles += 1
+        self.n_frames += n_frames
+
+
+class _PyramidWriter:
+    """Cascade frames through every level of a pyramid."""
+
+    def __init__(self, pyramid_dir, tile_frames, min_bins):
+        self.writers = [
+            _LevelWriter(
+                os.path.join(pyramid_dir, f"level_{level}"), tile_frames
+            )
+            for level in range(_MAX_LEVELS)
+        ]
+        self.min_bins = min_bins
+        # Odd frames left over from pooling, per level
+        self.carry = [None] * _MAX_LEVELS
+
+    def push(self, frames, level=0, final=False):
+        self.writers[level].push(frames)
+        if level + 1 == _MAX_LEVELS:
+            return
+        if self.carry[level] is not None:
+            frames = np.concatenate([self.carry[level], frames], axis=1)
+            self.carry[level] = None
+        if frames.shape[1] % 2 and not final:
+            self.carry[level] = frames[:, -1:]
+            frames = frames[:, :-1]
+        elif frames.shape[1] % 2:
+            # Pair the last frame with itself so that no frame is lost
+            frames = np.concatenate([frames, frames[:, -1:]], axis=1)
+        if not frames.shape[1]:
+            return
+        frames = _pool(frames, axis=1)
+        if frames.shape[0] // 2 >= self.min_bins:
+            frames = _pool(frames, axis=0)
+        self.push(frames, level + 1, final)
+
+
+def pyramid_dir_for(audio_file_path, n_fft, hop_length, sr):
+    """Return the directory of the pyramid of a file and its parameters."""
+    payload = json.dumps(
+        [os.path.abspath(audio_file_path), n_fft, hop_length, sr]
+    )
+    digest = hashlib.sha256(payload.encode()).hexdigest()[:12]
+    stem = os.path.splitext(os.path.basename(audio_file_path))[0]
+    return os.path.join(
+        get_setting("SPECTROGRAM_TILES_DIR"), f"{stem}-{digest}"
+    )
+
+
+def _native_rate(audio_file_path):
+    """Return the sample rate of a file libsndfile can read, or None."""
+    import soundfile as sf
+
+    try:
+        return sf.info(audio_file_path).samplerate
+    except RuntimeError:
+        return None
+
+
+def _tile_chunks(audio_file_path, n_fft, hop_length, tile_frames):
+    """Read a signal in chunks of about a tile of uncentred frames.
+
+    Files that libsndfile can read at the spectrogram sample rate are read
+    block by block, carrying the overlap of the frames between blocks.
+    Files that must be resampled first, or that only audioread can open,
+    are loaded memory-mapped through the store of decoded audio.
+
+    Returns:
+        tuple: The sample rate, and an iterator of the chunks, each holding
+        the samples of whole frames, with a flag marking the last one.
+    """
+    target_sr = get_sample_rate("spectrogram")
+    native_sr = _native_rate(audio_file_path)
+    if native_sr is not None and target_sr in (None, native_sr):
+        return native_sr, _read_chunks(
+            audio_file_path, n_fft, hop_length, tile_frames
+        )
+
+    y, sr = load_audio_file(audio_file_path, sr=target_sr)
+    n_frames = max(0, 1 + (len(y) - n_fft) // hop_length)
+
+    def slices():
+        for first in range(0, n_frames, tile_frames):
+            last = min(first + tile_frames, n_frames)
+            start, stop = first * hop_length, (last - 1) * hop_length + n_fft
+            yield np.asarray(y[start:stop]), last == n_frames
+
+    return sr, slices()
+
+
+def _read_chunks(audio_file_path, n_fft, hop_length, tile_frames):
+    """Read the frames of a file block by block, flagging the last chunk."""
+    carry = FrameCarry(n_fft, hop_length)
+    held = None
+    for block, _, _ in iter_blocks(
+        audio_file_path, block_length=tile_frames * hop_length
+    ):
+        chunk = carry.push(block)
+        if len(chunk) < n_fft:
+            continue
+        if held is not None:
+            yield held, False
+        held = chunk
+    if held is not None:
+        yield held, True
+
+
+def build_pyramid(
+    audio_file_path,
+    pyramid_dir=None,
+    n_fft=DEFAULT_N_FFT,
+    hop_length=DEFAULT_HOP_LENGTH,
+    tile_frames=SPECTROGRAM_TILE_FRAMES,
+    min_bins=SPECTROGRAM_TILE_MIN_BINS,
+):
+    """Compute the spectrogram tile pyramid of an audio file.
+
+    The signal is read from the source one tile of frames at a time and
+    transformed as it is read, so memory use does not grow with the length
+    of the recording. Only a file that must be resampled to the
+    spectrogram sample rate, or that libsndfile cannot read, is decoded as
+    a whole first, into the memory-mapped store of decoded audio. Frames
+    are not centred: frame ``i`` starts at sample ``i * hop_length``.
+
+    Args:
+        audio_file_path (str): The path to the audio file.
+        pyramid_dir (str): The directory to write the pyramid to. Defaults
+            to a directory per file and parameters under
+            ``SPECTROGRAM_TILES_DIR``.
+        n_fft (int): The length of the windowed signal for FFT.
+        hop_length (int): The number of samples between successive frames.
+        tile_frames (int): The number of frames per tile.
+        min_bins (int): The number of frequency bins below which levels
+            stop halving the frequency resolution.
+
+    Returns:
+        TilePyramid: The pyramid.
+    """
+    import librosa
+
+    stat = os.stat(audio_file_path)
+    sr, chunks = _tile_chunks(audio_file_path, n_fft, hop_length, tile_frames)
+    if pyramid_dir is None:
+        pyramid_dir = pyramid_dir_for(audio_file_path, n_fft, hop_length, sr)
+    shutil.rmtree(pyramid_dir, ignore_errors=True)
+
+    writer = _PyramidWriter(pyramid_dir, tile_frames, min_bins)
+    max_db = -np.inf
+    for chunk, final in chunks:
+        magnitude = np.abs(
+            librosa.stft(
+                chunk,
+                n_fft=n_fft,
+                hop_length=hop_length,
+                window=stft_window(n_fft),
+                center=False,
+            )
+        )
+        db = librosa.amplitude_to_db(magnitude, ref=1.0, top_db=None)
+        max_db = max(max_db, float(db.max()))
+        writer.push(db, final=final)
+    if max_db == -np.inf:
+        raise ValueError(f"{audio_file_path} is shorter than n_fft={n_fft}")
+
+    # Keep the levels up to the first that fits in a single tile
+    levels = []
+    for level, level_writer in enumerate(writer.writers):
+        level_writer.flush()
+        if levels and levels[-1]["n_tiles"] <= 1:
+            shutil.rmtree(level_writer.level_dir, ignore_errors=True)
+            continue
+        levels.append(
+            {
+                "level": level,
+                "time_factor": 2**level,
+                "freq_factor": (n_fft // 2 + 1) // level_writer.n_bins,
+                "n_frames": level_writer.n_frames,
+                "n_bins": level_writer.n_bins,
+                "n_tiles": level_writer.n_tiles,
+            }
+        )
+
+    metadata = {
+        "source": os.path.abspath(audio_file_path),
+        "source_stat": [stat.st_size, stat.st_mtime_ns],
+        "sr": sr,
+        "n_fft": n_fft,
+        "hop_length": hop_length,
+        "tile_frames": tile_frames,
+        "max_db": max_db,
+        "levels": levels,
+    }
+    with open(os.path.join(pyramid_dir, "pyramid.json"), "w") as meta:
+        json.dump(metadata, meta, indent=2)
+    logging.info(
+        f"Built spectrogram pyramid of {audio_file_path} with "
+        f"{len(levels)} levels in {pyramid_dir}"
+    )
+    return TilePyramid(pyramid_dir)
+
+
+def get_pyramid(
+    audio_file_path, n_fft=DEFAULT_N_FFT, hop_length=DEFAULT_HOP_LENGTH
+):
+    """Return the pyramid of a file, building it if missing or stale."""
+    sr = get_sample_rate("spectrogram")
+    pyramid_dir = pyramid_dir_for(audio_file_path, n_fft, hop_length, sr)
+    if os.path.exists(os.path.join(pyramid_dir, "pyramid.json")):
+        pyramid = TilePyramid(pyramid_dir)
+        stat = os.stat(audio_file_path)
+        if pyramid.metadata["source_stat"] == [
+            stat.st_size,
+            stat.st_mtime_ns,
+        ]:
+            return pyramid
+    return build_pyramid(audio_file_path, pyramid_dir, n_fft, hop_length)
+
+
+class TilePyramid:
+    """Read access to a spectrogram tile pyramid on disk.
+
+    Args:
+        pyramid_dir (str): The directory written by ``build_pyramid``.
+    """
+
+    def __init__(self, pyramid_dir):
+        self.pyramid_dir = pyramid_dir
+        with open(os.path.join(pyramid_dir, "pyramid.json")) as meta:
+            self.metadata = json.load(meta)
+        self.levels = self.metadata["levels"]
+        self.sr = self.metadata["sr"]
+        self.hop_length = self.metadata["hop_length"]
+        self.n_fft = self.metadata["n_fft"]
+        self.tile_frames = self.metadata["tile_frames"]
+
+    @property
+    def duration(self):
+        """The time covered by the frames of level 0, in seconds."""
+        n_frames = self.levels[0]["n_frames"]
+        return ((n_frames - 1) * self.hop_length + self.n_fft) / self.sr
+
+    def frame_seconds(self, level):
+        """The time step between the frames of a level, in seconds."""
+        return self.levels[level]["time_factor"] * self.hop_length / self.sr
+
+    def times(self, level, first, last):
+        """The centre time of frames ``first`` to ``last`` of a level."""
+        step = self.frame_seconds(level)
+        return (np.arange(first, last) + 0.5) * step + (
+            self.n_fft - self.hop_length
+        ) / (2 * self.sr)
+
+    def frequencies(self, level):
+        """The centre frequency of the bins of a level, in Hz."""
+        factor = self.levels[level]["freq_factor"]
+        bin_hz = self.sr / self.n_fft
+        return (np.arange(self.levels[level]["n_bins"]) + 0.5) * factor * (
+            bin_hz
+        ) - bin_hz / 2
+
+    def tile(self, level, index):
+        """Return a tile memory-mapped, in dB."""
+        return np.load(
+            os.path.join(
+                self.pyramid_dir, f"level_{level}", f"tile_{index}.npy"
+            ),
+            mmap_mode="r",
+        )
+
+    def choose_level(self, t0, t1, width):
+        """Return the coarsest level with at least ``width`` frames in a
+        time range, or level 0 if none has."""
+        chosen = 0
+        for level in range(len(self.levels)):
+            if (t1 - t0) / self.frame_seconds(level) >= width:
+                chosen = level
+        return chosen
+
+    def read(self, level, t0=0.0, t1=None):
+        """Read the frames of a level covering a time range.
+
+        Only the tiles overlapping the range are read.
+
+        Returns:
+            tuple: The frame times, bin frequencies and dB values
+            (bins x frames).
+        """
+        info = self.levels[level]
+        t1 = self.duration if t1 is None else t1
+        step = self.frame_seconds(level)
+        first = int(np.clip(np.floor(t0 / step), 0, info["n_frames"] - 1))
+        last = int(
+            np.clip(np.ceil(t1 / step) + 1, first + 1, info["n_frames"])
+        )
+
+        first_tile = first // self.tile_frames
+        last_tile = (last - 1) // self.tile_frames
+        frames = np.concatenate(
+            [
+                self.tile(level, index)
+                for index in range(first_tile, last_tile + 1)
+            ],
+            axis=1,
+        )
+        offset = first - first_tile * self.tile_frames
+        end = offset + last - first
+        db = frames[:, offset:end]
+        return self.times(level, first, last), self.frequencies(level), db
+
+
+class SpectrogramViewer:
+    """Plotly viewer that reads only the tiles of the visible range.
+
+    Args:
+        pyramid (TilePyramid): The pyramid to browse.
+        width (int): The number of frames to draw across the figure,
+            about its width in pixels.
+        title (str): The title of the figure.
+    """
+
+    def __init__(self, pyramid, width=1200, title=None):
+        self.pyramid = pyramid
+        self.width = width
+        self.title = title or os.path.basename(pyramid.metadata["source"])
+
+    def view(self, t0=0.0, t1=None):
+        """Return the level, times, frequencies and dB of a time range."""
+        t1 = self.pyramid.duration if t1 is None else t1
+        level = self.pyramid.choose_level(t0, t1, self.width)
+        times, freqs, db = self.pyramid.read(level, t0, t1)
+        # Relative to the loudest bin of the whole file, like ref=np.max;
+        # the 0 Hz bin is dropped for the log frequency axis.
+        db = np.maximum(
+            db[1:].astype(np.float32) - self.pyramid.metadata["max_db"],
+            -TOP_DB,
+        )
+        return level, times, freqs[1:], db
+
+    def figure(self, t0=0.0, t1=None):
+        """Create a figure of a time range."""
+        import plotly.graph_objs as go
+
+        level, times, freqs, db = self.view(t0, t1)
+        layout = configure_plotly_layout(
+            "Spectrogram", self.pyramid.metadata["source"]
+        )
+        layout.yaxis.title = "Frequency (Hz)"
+        layout.yaxis.type = "log"
+        heatmap = go.Heatmap(
+            x=times,
+            y=freqs,
+            z=db,
+            zmin=-TOP_DB,
+            zmax=0,
+            colorscale="Magma",
+            colorbar=dict(title="dB"),
+            name=f"level {level}",
+        )
+        return go.Figure(data=[heatmap], layout=layout)
+
+    def update(self, fig, t0, t1):
+        """Replace the heatmap of a figure with the tiles of a range."""
+        level, times, freqs, db = self.view(max(0.0, t0), t1)
+        with fig.batch_update():
+            heatmap = fig.data[0]
+            heatmap.x, heatmap.y, heatmap.z = times, freqs, db
+            heatmap.name = f"level {level}"
+
+    def widget(self):
+        """Create a notebook figure that loads tiles as it is zoomed.
+
+        Requires the plotly ``FigureWidget`` notebook support.
+        """
+        import plotly.graph_objs as go
+
+        fig = go.FigureWidget(self.figure())
+
+        def on_range(xaxis, x_range):
+            if x_range:
+                self.update(fig, *x_range)
+
+        fig.layout.xaxis.on_change(on_range, "range")
+        return fig
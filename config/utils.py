@@ -1,12 +1,11 @@
 import os
 import sys
 import logging
-import librosa
 
 # import numpy as np
-import matplotlib.pyplot as plt
 
-from .config import audio_config
+from .config import audio_config, get_resampler, get_sample_rate
+from .logging import stage
 
 # from .logging import setup_logging
 # from .matplotlib_plots import configure_plot
@@ -18,10 +17,34 @@ def setup_environment():
         sys.path.append(root_dir)
 
 
-def load_audio(audio_file_key):
+def load_audio_file(audio_file_path, sr=None, mono=True, quality=None):
+    """Load an audio file through the store of decoded audio.
+
+    The first load decodes the file; later loads return a read-only
+    memory map of the decoded PCM until the file changes. Other sample
+    rates than the native one are resampled once with the resampler of
+    ``quality``, which defaults to the RESAMPLE_QUALITY setting.
+    """
+    with stage("load", file=audio_file_path, sr=sr):
+        return audio_config.decoded_audio.load(
+            audio_file_path, sr=sr, mono=mono, res_type=get_resampler(quality)
+        )
+
+
+def load_analysis_audio(audio_file_path, analysis, mono=True):
+    """Load an audio file at the sample rate declared for an analysis."""
+    return load_audio_file(
+        audio_file_path, sr=get_sample_rate(analysis), mono=mono
+    )
+
+
+def load_audio(audio_file_key, analysis=None, mono=True):
     audio_file_path = audio_config.get_audio_file(audio_file_key)
     try:
-        y, sr = librosa.load(audio_file_path, sr=None)
+        if analysis is None:
+            y, sr = load_audio_file(audio_file_path, mono=mono)
+        else:
+            y, sr = load_analysis_audio(audio_file_path, analysis, mono=mono)
         return y, sr, audio_file_path
     except FileNotFoundError:
         logging.error(f"File not found: {audio_file_path}")
@@ -31,4 +54,6 @@ def load_audio(audio_file_key):
 
 
 def create_plot(figsize=(14, 5)):
+    import matplotlib.pyplot as plt
+
     return plt.subplots(figsize=figsize)
@@ -0,0 +1,65 @@
+"""Serve the analyses of the audio files over a local HTTP service.
+
+Usage (from the repository root):
+
+    python -m scripts.analysis_service --port 8765 --workers 4
+
+The service keeps decoded signals and computed feature arrays in memory
+between requests; see ``config.service`` for its routes. For example:
+
+    curl -o mfcc.npy http://127.0.0.1:8765/mfcc/sax_a3
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+from config.logging import setup_logging
+from config.parameters import SERVICE_HOST, SERVICE_PORT
+from config.service import AnalysisService
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Serve the analyses of the audio files over HTTP."
+    )
+    parser.add_argument(
+        "--host",
+        default=SERVICE_HOST,
+        help="The address to listen on.",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=SERVICE_PORT,
+        help="The port to listen on.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="The number of worker processes (default: number of CPUs).",
+    )
+    parser.add_argument(
+        "--cache-bytes",
+        type=int,
+        default=None,
+        help="The size cap of the in-memory array cache.",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    setup_logging(os.path.abspath(__file__), queued=True)
+    service = AnalysisService(workers=args.workers, max_bytes=args.cache_bytes)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
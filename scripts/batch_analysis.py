@@ -0,0 +1,87 @@
+"""Run analyses over every audio file in the audio directory.
+
+Usage (from the repository root):
+
+    python -m scripts.batch_analysis --analyses envelope rms --workers 4
+
+Files whose outputs are newer than the audio are skipped, so an
+interrupted batch resumes where it stopped.
+"""
+
+import argparse
+import os
+import sys
+
+from config.analyses import ANALYSES
+from config.batch import run_batch
+from config.config import get_setting
+from config.logging import setup_logging, trace_stage_memory
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Analyse every audio file in the audio directory."
+    )
+    parser.add_argument(
+        "--analyses",
+        nargs="+",
+        choices=sorted(ANALYSES),
+        default=list(ANALYSES),
+        help="The analyses to run (default: all).",
+    )
+    parser.add_argument(
+        "--audio-dir",
+        default=None,
+        help="The directory to search for audio files (default: AUDIO_DIR).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="The number of worker processes (default: number of CPUs).",
+    )
+    parser.add_argument(
+        "--render-workers",
+        type=int,
+        default=None,
+        help="The number of figure rendering processes "
+        "(default: number of CPUs).",
+    )
+    parser.add_argument(
+        "--store-arrays",
+        action="store_true",
+        help="Also save the full feature arrays of every file in the "
+        "feature store.",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="Trace the peak memory of every stage (slows the run down).",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rerun analyses whose outputs are up to date.",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Workers log through the listener of the main process
+    setup_logging(os.path.abspath(__file__), queued=True)
+    if args.trace_memory:
+        trace_stage_memory()
+    summary = run_batch(
+        analyses=tuple(args.analyses),
+        audio_dir=args.audio_dir or get_setting("AUDIO_DIR"),
+        workers=args.workers,
+        force=args.force,
+        render_workers=args.render_workers,
+        store_arrays=args.store_arrays,
+    )
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
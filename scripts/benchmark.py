@@ -0,0 +1,368 @@
+"""Benchmark decoding, feature extraction and rendering on synthetic audio.
+
+Usage (from the repository root):
+
+    python -m scripts.benchmark --preset standard
+    python -m scripts.benchmark --compare <commit> --threshold 0.1
+
+Every benchmark runs on generated signals, so the suite works offline and
+gives the same input on every commit. Results are stored under
+``BENCHMARK_DIR`` by commit; with ``--compare`` the run exits with status 1
+if any benchmark is slower or uses more memory than the stored results by
+more than the threshold.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+
+from config.analyses import ANALYSES, render_analysis
+from config.batch_features import batch_features
+from config.benchmarking import (
+    compare_results,
+    format_table,
+    load_results,
+    measure,
+    save_results,
+    synthetic_signal,
+)
+from config.config import get_resampler, get_setting
+from config.decoded_audio import decode_audio, resample_audio
+from config.features import FeatureEngine
+from config.logging import setup_logging
+from scripts.frequency_domain_audio_representations.spectrogram import (
+    compute_spectrogram,
+)
+from scripts.time_domain_audio_representations.amplitude_envelopes import (
+    calculate_amplitude_envelope,
+    load_audio_file,
+)
+
+# Signal lengths in seconds, sample rates and (n_fft, hop_length) settings
+PRESETS = {
+    "quick": {
+        "durations": (1, 10),
+        "sample_rates": (22050,),
+        "fft_settings": ((2048, 512),),
+    },
+    "standard": {
+        "durations": (1, 10, 60, 600),
+        "sample_rates": (22050, 44100, 48000),
+        "fft_settings": ((1024, 256), (2048, 512), (4096, 1024)),
+    },
+    "full": {
+        "durations": (1, 10, 60, 600, 3600),
+        "sample_rates": (22050, 44100, 48000),
+        "fft_settings": ((1024, 256), (2048, 512), (4096, 1024)),
+    },
+}
+
+
+def _engine(context):
+    return FeatureEngine(
+        context["y"],
+        context["sr"],
+        n_fft=context["n_fft"],
+        hop_length=context["hop_length"],
+    )
+
+
+def bench_decode(context):
+    return lambda: decode_audio(context["path"])
+
+
+def bench_load_audio(context):
+    return lambda: load_audio_file(context["path"])
+
+
+def bench_resample(quality):
+    """Benchmark resampling to the analysis rate with a resampler."""
+
+    def setup(context):
+        target_sr = 22050 if context["sr"] != 22050 else 16000
+        return lambda: resample_audio(
+            context["y"], context["sr"], target_sr, get_resampler(quality)
+        )
+
+    return setup
+
+
+def bench_spectrogram(context):
+    return lambda: compute_spectrogram(
+        context["y"], context["sr"], context["n_fft"], context["hop_length"]
+    )
+
+
+def bench_mfcc(context):
+    return lambda: _engine(context).mfcc()
+
+
+def bench_rms(context):
+    return lambda: _engine(context).rms()
+
+
+def _clips(context, seconds=0.5):
+    """Split the signal into short clips, as in a dataset of samples."""
+    length = int(seconds * context["sr"])
+    y = context["y"]
+    return [y[start:][:length] for start in range(0, len(y), length)]
+
+
+def bench_clip_mfcc(context):
+    clips = _clips(context)
+    return lambda: [
+        FeatureEngine(
+            clip,
+            context["sr"],
+            n_fft=context["n_fft"],
+            hop_length=context["hop_length"],
+        ).mfcc()
+        for clip in clips
+    ]
+
+
+def bench_batch_mfcc(context):
+    clips = _clips(context)
+    return lambda: batch_features(
+        clips,
+        context["sr"],
+        n_fft=context["n_fft"],
+        hop_length=context["hop_length"],
+    )
+
+
+def bench_envelope(context):
+    return lambda: calculate_amplitude_envelope(context["y"])
+
+
+def bench_render(analysis):
+    """Benchmark the plotting and saving of an analysis figure."""
+
+    def setup(context):
+        compute = ANALYSES[analysis][2]
+        data = compute(
+            context["path"], context["y"], context["sr"], _engine(context)
+        )
+        output_path = os.path.join(context["tmp_dir"], f"{analysis}.png")
+        return lambda: render_analysis(analysis, data, output_path)
+
+    return setup
+
+
+# Benchmarks by name: (setup, whether they depend on n_fft and hop_length).
+# A setup prepares the inputs and returns the call to measure.
+BENCHMARKS = {
+    "decode": (bench_decode, False),
+    "load_audio": (bench_load_audio, False),
+    "resample_fast": (bench_resample("fast"), False),
+    "resample_high": (bench_resample("high"), False),
+    "spectrogram": (bench_spectrogram, True),
+    "mfcc": (bench_mfcc, True),
+    "rms": (bench_rms, True),
+    "clip_mfcc": (bench_clip_mfcc, True),
+    "batch_mfcc": (bench_batch_mfcc, True),
+    "envelope": (bench_envelope, False),
+    "render_envelope": (bench_render("envelope"), False),
+    "render_rms": (bench_render("rms"), True),
+    "render_spectrogram": (bench_render("spectrogram"), True),
+    "render_mfcc": (bench_render("mfcc"), True),
+}
+
+
+def run_benchmarks(
+    cases, durations, sample_rates, fft_settings, repeat=3, tmp_dir=None
+):
+    """Run benchmarks over every signal length, sample rate and setting.
+
+    Returns:
+        list: The result of each benchmark as a dict.
+    """
+    import soundfile as sf
+
+    results = []
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as tmp:
+        for duration in durations:
+            for sr in sample_rates:
+                y = synthetic_signal(duration, sr)
+                path = os.path.join(tmp, f"synthetic_{duration}s_{sr}.wav")
+                sf.write(path, y, sr, subtype="PCM_16")
+
+                for case in cases:
+                    setup, uses_fft = BENCHMARKS[case]
+                    settings = fft_settings if uses_fft else ((None, None),)
+                    for n_fft, hop_length in settings:
+                        context = {
+                            "y": y,
+                            "sr": sr,
+                            "path": path,
+                            "tmp_dir": tmp,
+                            "n_fft": n_fft,
+                            "hop_length": hop_length,
+                        }
+                        logging.info(
+                            f"Benchmark {case}: {duration} s at {sr} Hz, "
+                            f"n_fft={n_fft}, hop_length={hop_length}"
+                        )
+                        result = measure(setup(context), repeat=repeat)
+                        results.append(
+                            {
+                                "case": case,
+                                "duration": duration,
+                                "sr": sr,
+                                "n_fft": n_fft,
+                                "hop_length": hop_length,
+                                **result,
+                            }
+                        )
+                os.remove(path)
+    return results
+
+
+def parse_fft_setting(value):
+    """Parse an "n_fft:hop_length" setting."""
+    try:
+        n_fft, hop_length = (int(part) for part in value.split(":"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"Expected n_fft:hop_length, got {value!r}"
+        )
+    return n_fft, hop_length
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the analysis hot paths on synthetic audio."
+    )
+    parser.add_argument(
+        "--preset",
+        choices=sorted(PRESETS),
+        default="quick",
+        help="The signal lengths, sample rates and settings to run.",
+    )
+    parser.add_argument(
+        "--cases",
+        nargs="+",
+        choices=list(BENCHMARKS),
+        default=list(BENCHMARKS),
+        help="The benchmarks to run (default: all).",
+    )
+    parser.add_argument(
+        "--durations",
+        nargs="+",
+        type=float,
+        help="Signal lengths in seconds, overriding the preset.",
+    )
+    parser.add_argument(
+        "--sample-rates",
+        nargs="+",
+        type=int,
+        help="Sample rates, overriding the preset.",
+    )
+    parser.add_argument(
+        "--fft",
+        nargs="+",
+        type=parse_fft_setting,
+        help="n_fft:hop_length settings, overriding the preset.",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="The number of timed runs of each benchmark.",
+    )
+    parser.add_argument(
+        "--output-dir",
+        default=None,
+        help="The directory of stored results (default: BENCHMARK_DIR).",
+    )
+    parser.add_argument(
+        "--name",
+        default=None,
+        help="The name to store the results under (default: the commit).",
+    )
+    parser.add_argument(
+        "--compare",
+        default=None,
+        help="A commit name or results file to compare against.",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="The relative slowdown or memory growth that fails --compare.",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    setup_logging(os.path.abspath(__file__))
+
+    # Measure the computations themselves, never feature cache hits. The
+    # synthetic signals are loaded through a store of decoded audio of
+    # their own, so "load_audio" measures reloading and "decode" decoding.
+    os.environ["FEATURE_CACHE_MAX_BYTES"] = "0"
+    preset = PRESETS[args.preset]
+    with tempfile.TemporaryDirectory() as decoded_audio_dir:
+        os.environ["DECODED_AUDIO_DIR"] = decoded_audio_dir
+        results = run_benchmarks(
+            args.cases,
+            args.durations or preset["durations"],
+            args.sample_rates or preset["sample_rates"],
+            args.fft or preset["fft_settings"],
+            repeat=args.repeat,
+        )
+    for result in results:
+        result["peak_mb"] = result["peak_bytes"] / 2**20
+    print(
+        format_table(
+            results,
+            (
+                "case",
+                "duration",
+                "sr",
+                "n_fft",
+                "hop_length",
+                "time_min",
+                "time_median",
+                "peak_mb",
+            ),
+        )
+    )
+
+    benchmark_dir = args.output_dir or get_setting("BENCHMARK_DIR")
+    save_results(results, benchmark_dir, commit=args.name)
+
+    if args.compare is None:
+        return 0
+    baseline = load_results(args.compare, benchmark_dir)
+    comparison = compare_results(
+        baseline, {"results": results}, threshold=args.threshold
+    )
+    print(f"\nCompared with {baseline['commit']}:")
+    print(
+        format_table(
+            comparison,
+            (
+                "case",
+                "duration",
+                "sr",
+                "n_fft",
+                "hop_length",
+                "time_ratio",
+                "memory_ratio",
+                "regression",
+            ),
+        )
+    )
+    regressions = [row for row in comparison if row["regression"]]
+    if regressions:
+        logging.error(f"{len(regressions)} benchmarks regressed")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""Report the loudness of every channel of audio files.
+
+Usage (from the repository root):
+
+    python -m scripts.channel_report --audio-key sax_a3
+    python -m scripts.channel_report --audio-key sax_a3 --layout mid_side
+
+Each file is decoded once without downmixing, and the RMS energy and
+amplitude envelope of all its channels are computed in a single pass by
+``config.channels.channel_features``. The table lists the overall RMS
+level, the loudest RMS frame and the sample peak of each channel in dBFS.
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+from config.benchmarking import format_table
+from config.channels import (
+    CHANNEL_LAYOUTS,
+    LOUDNESS_COLUMNS,
+    channel_features,
+    channel_loudness,
+)
+from config.config import audio_config
+from config.logging import setup_logging
+from config.parameters import AUDIO_FILE_SAX_A3
+
+
+def loudness_rows(audio_file_path, layout):
+    """Return the loudness rows of every channel of a file."""
+    names, features = channel_features(
+        audio_file_path,
+        features=("envelope", "rms"),
+        layout=layout,
+        envelope_mode="abs",
+    )
+    rows = channel_loudness(names, features["rms"], features["envelope"])
+    name = os.path.basename(audio_file_path)
+    return [{"file": name, **row} for row in rows]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Report the loudness of every channel of audio files."
+    )
+    parser.add_argument(
+        "--audio-key",
+        nargs="+",
+        default=[AUDIO_FILE_SAX_A3],
+        help="The keys of the audio files.",
+    )
+    parser.add_argument(
+        "--layout",
+        choices=CHANNEL_LAYOUTS,
+        default="channels",
+        help="Analyse the channels as is, downmixed or as mid and side.",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    setup_logging(os.path.abspath(__file__))
+    rows = []
+    for audio_key in args.audio_key:
+        audio_file_path = audio_config.get_audio_file(audio_key)
+        if not audio_file_path:
+            logging.error(f"Audio file key '{audio_key}' not found.")
+            return 1
+        try:
+            rows.extend(loudness_rows(audio_file_path, args.layout))
+        except (FileNotFoundError, ValueError) as e:
+            logging.error(f"Failed to analyse {audio_file_path}: {e}")
+            return 1
+    print(format_table(rows, ("file",) + LOUDNESS_COLUMNS))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
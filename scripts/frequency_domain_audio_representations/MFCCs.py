@@ -1,32 +1,22 @@
 import os
 import sys
 import logging
-import librosa
-import matplotlib.pyplot as plt
 
 from config.config import audio_config, output_config
+from config.features import cached_features
 from config.parameters import AUDIO_FILE_SAX_A3, BACKGROUND_COLOR
-from config.logging import setup_logging
+from config.logging import setup_logging, timed
+from config.utils import load_analysis_audio
 from config.matplotlib_plots import configure_plot, create_custom_colormap
-
-# Adjust sys.path to include the root directory
-root_dir = os.path.abspath(os.path.join(os.getcwd(), "../../"))
-if root_dir not in sys.path:
-    sys.path.append(root_dir)
-
-# Set up logging for this script
-notebook_path = os.path.join(os.getcwd(), "MFCCs.py")
-setup_logging(notebook_path)
-
-# Set the audio file to analyse
-audio_file_key = AUDIO_FILE_SAX_A3
-audio_file_path = audio_config.get_audio_file(audio_file_key)
+from config.rendering import use_headless_backend
 
 
 def analyse_audio(audio_file_path):
     try:
-        y, sr = librosa.load(audio_file_path, sr=None)
-        mfccs = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
+        y, sr = load_analysis_audio(audio_file_path, "mfcc")
+        mfccs = cached_features(
+            audio_file_path, y, sr, features=("mfcc",), n_mfcc=13
+        )["mfcc"]
         return y, sr, mfccs
     except FileNotFoundError:
         logging.error(f"File not found: {audio_file_path}")
@@ -34,28 +24,65 @@ def analyse_audio(audio_file_path):
         logging.error(f"An error occurred: {e}")
 
 
-try:
-    y, sr, mfccs = analyse_audio(audio_file_path)
-except Exception as e:
-    logging.error(f"Error analysing audio file {audio_file_path}: {e}")
-    raise
-
-# Plot the MFCCs
-custom_cmap = create_custom_colormap()
-fig, ax = plt.subplots(figsize=(14, 5))
-img = librosa.display.specshow(mfccs, x_axis="time", ax=ax, cmap=custom_cmap)
-fig.colorbar(img, ax=ax)
-configure_plot(ax, title=os.path.basename(audio_file_path), subtitle="MFCCs")
-
-# Ensure the output directory exists
-output_directory = output_config.get_output_directory("frequency_domain")
-if not os.path.exists(output_directory):
-    os.makedirs(output_directory)
-
-# Save the plot
-output_path = os.path.join(
-    output_directory,
-    f"MFCC_{os.path.splitext(os.path.basename(audio_file_path))[0]}.png",
-)
-plt.savefig(output_path, facecolor=BACKGROUND_COLOR)
-plt.show()
+def plot_mfccs(mfccs, sr, audio_file_path):
+    """Plot the MFCCs with the custom colormap."""
+    import librosa.display
+    import matplotlib.pyplot as plt
+
+    custom_cmap = create_custom_colormap()
+    fig, ax = plt.subplots(figsize=(14, 5))
+    img = librosa.display.specshow(
+        mfccs, sr=sr, x_axis="time", ax=ax, cmap=custom_cmap
+    )
+    fig.colorbar(img, ax=ax)
+    configure_plot(
+        ax, title=os.path.basename(audio_file_path), subtitle="MFCCs"
+    )
+    return fig
+
+
+@timed("save")
+def save_plot(fig, audio_file_path):
+    """Save the plot to the output directory."""
+    output_directory = output_config.get_output_directory("frequency_domain")
+    output_path = os.path.join(
+        output_directory,
+        f"MFCC_{os.path.splitext(os.path.basename(audio_file_path))[0]}.png",
+    )
+    fig.savefig(output_path, facecolor=BACKGROUND_COLOR)
+    logging.info(f"Plot saved to {output_path}")
+    return output_path
+
+
+def main(audio_file_key=AUDIO_FILE_SAX_A3, show=True):
+    if not show:
+        use_headless_backend()
+    import matplotlib.pyplot as plt
+
+    # Adjust sys.path to include the root directory
+    root_dir = os.path.abspath(os.path.join(os.getcwd(), "../../"))
+    if root_dir not in sys.path:
+        sys.path.append(root_dir)
+
+    # Set up logging for this script
+    notebook_path = os.path.join(os.getcwd(), "MFCCs.py")
+    setup_logging(notebook_path)
+
+    # Set the audio file to analyse
+    audio_file_path = audio_config.get_audio_file(audio_file_key)
+
+    try:
+        y, sr, mfccs = analyse_audio(audio_file_path)
+    except Exception as e:
+        logging.error(f"Error analysing audio file {audio_file_path}: {e}")
+        raise
+
+    fig = plot_mfccs(mfccs, sr, audio_file_path)
+    save_plot(fig, audio_file_path)
+    if show:
+        plt.show()
+    plt.close(fig)
+
+
+if __name__ == "__main__":
+    main()
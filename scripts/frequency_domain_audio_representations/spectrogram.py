@@ -1,11 +1,10 @@
 import os
 import sys
 import logging
-import librosa
 import numpy as np
-import matplotlib.pyplot as plt
 
 from config.config import audio_config, output_config
+from config.features import FeatureEngine, amplitude_to_db, cached_features
 from config.parameters import (
     DEFAULT_N_FFT,
     DEFAULT_HOP_LENGTH,
@@ -14,17 +13,10 @@ from config.parameters import (
     SPINE_COLOR,
     AUDIO_FILE_SAX_A3,
 )
-from config.logging import setup_logging
+from config.logging import setup_logging, stage
+from config.utils import load_analysis_audio
 from config.matplotlib_plots import configure_plot
-
-# Adjust sys.path to include the root directory
-root_dir = os.path.abspath(os.path.join(os.getcwd(), "../../"))
-if root_dir not in sys.path:
-    sys.path.append(root_dir)
-
-# Set up logging for this script
-notebook_path = os.path.join(os.getcwd(), "spectrogram.py")
-setup_logging(notebook_path)
+from config.rendering import use_headless_backend
 
 
 def load_audio(file_key):
@@ -33,7 +25,7 @@ def load_audio(file_key):
         logging.error(f"Audio file key '{file_key}' not found.")
         raise ValueError(f"Audio file key '{file_key}' not found.")
     try:
-        y, sr = librosa.load(audio_file)
+        y, sr = load_analysis_audio(audio_file, "spectrogram")
         logging.info(f"Loaded audio file: {audio_file}")
         return y, sr
     except Exception as e:
@@ -42,19 +34,40 @@ def load_audio(file_key):
 
 
 def compute_spectrogram(
-    y, sr, n_fft=DEFAULT_N_FFT, hop_length=DEFAULT_HOP_LENGTH
+    y,
+    sr,
+    n_fft=DEFAULT_N_FFT,
+    hop_length=DEFAULT_HOP_LENGTH,
+    engine=None,
+    audio_file_path=None,
 ):
-    D = np.abs(librosa.stft(y, n_fft=n_fft, hop_length=hop_length))
+    if engine is None:
+        engine = FeatureEngine(y, sr, n_fft=n_fft, hop_length=hop_length)
+    if audio_file_path is None:
+        D = engine.spectrogram()
+    else:
+        D = cached_features(
+            audio_file_path,
+            y,
+            sr,
+            features=("spectrogram",),
+            n_fft=n_fft,
+            hop_length=hop_length,
+            engine=engine,
+        )["spectrogram"]
     logging.info("Computed spectrogram.")
     return D
 
 
-def plot_and_save_spectrogram(D, sr, hop_length, output_path):
+def plot_and_save_spectrogram(D, sr, hop_length, output_path, show=True):
+    import librosa.display
+    import matplotlib.pyplot as plt
+
     fig, ax = plt.subplots(figsize=FIGURE_SIZE)
     fig.patch.set_facecolor(BACKGROUND_COLOR)
     ax.set_facecolor(BACKGROUND_COLOR)
     img = librosa.display.specshow(
-        librosa.amplitude_to_db(D, ref=np.max),
+        amplitude_to_db(D, ref=np.max),
         sr=sr,
         hop_length=hop_length,
         x_axis="time",
@@ -69,20 +82,44 @@ def plot_and_save_spectrogram(D, sr, hop_length, output_path):
         ax, title="Spectrogram", subtitle="Frequency Domain Representation"
     )
     plt.tight_layout()
-    plt.savefig(output_path, facecolor=BACKGROUND_COLOR)
-    plt.show()
+    with stage("save", path=output_path):
+        plt.savefig(output_path, facecolor=BACKGROUND_COLOR)
+    if show:
+        plt.show()
+    plt.close(fig)
     logging.info(f"Spectrogram plot saved to: {output_path}")
 
 
-# Load Audio File
-y, sr = load_audio(AUDIO_FILE_SAX_A3)
+def main(audio_file_key=AUDIO_FILE_SAX_A3, show=True):
+    if not show:
+        use_headless_backend()
+
+    # Adjust sys.path to include the root directory
+    root_dir = os.path.abspath(os.path.join(os.getcwd(), "../../"))
+    if root_dir not in sys.path:
+        sys.path.append(root_dir)
+
+    # Set up logging for this script
+    notebook_path = os.path.join(os.getcwd(), "spectrogram.py")
+    setup_logging(notebook_path)
 
-# Compute Spectrogram
-D = compute_spectrogram(y, sr)
+    # Load Audio File
+    y, sr = load_audio(audio_file_key)
+
+    # Compute Spectrogram
+    D = compute_spectrogram(
+        y, sr, audio_file_path=audio_config.get_audio_file(audio_file_key)
+    )
+
+    # Define Output Path
+    output_dir = output_config.get_output_directory("frequency_domain")
+    output_path = os.path.join(output_dir, "Spectrogram.png")
+
+    # Plot and Save Spectrogram
+    plot_and_save_spectrogram(
+        D, sr, DEFAULT_HOP_LENGTH, output_path, show=show
+    )
 
-# Define Output Path
-output_dir = output_config.get_output_directory("frequency_domain")
-output_path = os.path.join(output_dir, "Spectrogram.png")
 
-# Plot and Save Spectrogram
-plot_and_save_spectrogram(D, sr, DEFAULT_HOP_LENGTH, output_path)
+if __name__ == "__main__":
+    main()
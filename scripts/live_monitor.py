@@ -0,0 +1,138 @@
+"""Replay an audio file through the real-time analyser.
+
+Usage (from the repository root):
+
+    python -m scripts.live_monitor --audio-key sax_a3 --callback-length 256
+    python -m scripts.live_monitor --pace --check
+
+The file is fed to ``RealtimeAnalyser`` in callbacks of a fixed size, as a
+sound card would deliver it, and the per-frame processing latency of each
+framing is reported. With ``--pace`` callbacks arrive at the rate of live
+audio; with ``--check`` the live frames are compared with the offline
+analyses of the same signal.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import numpy as np
+
+from config.benchmarking import format_table
+from config.config import audio_config, get_sample_rate
+from config.envelopes import amplitude_envelope
+from config.features import FeatureEngine
+from config.logging import setup_logging
+from config.parameters import AUDIO_FILE_SAX_A3, DEFAULT_CALLBACK_LENGTH
+from config.realtime import REALTIME_FEATURES, RealtimeAnalyser, replay
+from config.streaming import collect_features
+from config.utils import load_analysis_audio
+
+
+def offline_features(y, sr, features):
+    """Compute the offline features the live frames should match."""
+    engine = FeatureEngine(y, sr)
+    offline = {
+        "envelope": lambda: amplitude_envelope(y),
+        "rms": engine.rms,
+        "mfcc": lambda: engine.mfcc(top_db=None),
+    }
+    return {name: offline[name]() for name in features}
+
+
+def monitor(audio_file_path, features, callback_length, pace, check):
+    """Replay a file once per analysis sample rate.
+
+    Returns:
+        tuple: The latency summary rows and the number of features whose
+        live frames differ from the offline ones.
+    """
+    by_rate = {}
+    for feature in features:
+        by_rate.setdefault(get_sample_rate(feature), []).append(feature)
+
+    rows, mismatches = [], 0
+    for group in by_rate.values():
+        y, sr = load_analysis_audio(audio_file_path, group[0])
+        analyser = RealtimeAnalyser(
+            sr, features=group, max_callback_length=callback_length
+        )
+        live = collect_features(
+            replay(analyser, y, callback_length=callback_length, pace=pace)
+        )
+        for row in analyser.latency_summary():
+            rows.append({"sr": sr, **row})
+        if not check:
+            continue
+
+        for name, expected in offline_features(y, sr, group).items():
+            if live[name].shape == expected.shape and np.allclose(
+                live[name], expected, rtol=1e-4, atol=1e-4
+            ):
+                logging.info(f"Live {name} matches the offline frames")
+            else:
+                logging.error(
+                    f"Live {name} differs from the offline frames: "
+                    f"{live[name].shape} vs {expected.shape}"
+                )
+                mismatches += 1
+    return rows, mismatches
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Replay an audio file through the real-time analyser."
+    )
+    parser.add_argument(
+        "--audio-key",
+        default=AUDIO_FILE_SAX_A3,
+        help="The key of the audio file to replay.",
+    )
+    parser.add_argument(
+        "--features",
+        nargs="+",
+        choices=REALTIME_FEATURES,
+        default=list(REALTIME_FEATURES),
+        help="The features to compute (default: all).",
+    )
+    parser.add_argument(
+        "--callback-length",
+        type=int,
+        default=DEFAULT_CALLBACK_LENGTH,
+        help="The number of samples per callback.",
+    )
+    parser.add_argument(
+        "--pace",
+        action="store_true",
+        help="Deliver callbacks at the rate of live audio.",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Compare the live frames with the offline analyses.",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    setup_logging(os.path.abspath(__file__))
+    audio_file_path = audio_config.get_audio_file(args.audio_key)
+    rows, mismatches = monitor(
+        audio_file_path,
+        args.features,
+        args.callback_length,
+        args.pace,
+        args.check,
+    )
+    print(
+        format_table(
+            rows,
+            ("sr", "framing", "frames", "median_ms", "p95_ms", "max_ms"),
+        )
+    )
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
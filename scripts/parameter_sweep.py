@@ -0,0 +1,85 @@
+"""Sweep the STFT and MFCC parameters of the analyses over an audio file.
+
+Usage (from the repository root):
+
+    python -m scripts.parameter_sweep --n-fft 1024 2048 4096 \\
+        --hop-length 128 256 512 1024 --n-mfcc 13 20
+
+The file is decoded once and every combination of the grid is computed by
+``config.sweep.sweep``, sharing STFTs between hop lengths where it can.
+The comparison table is printed and saved as a CSV file in
+``local_data/output_graphs/parameter_sweeps``.
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+from config.benchmarking import format_table
+from config.config import audio_config, output_config
+from config.logging import setup_logging
+from config.parameters import AUDIO_FILE_SAX_A3
+from config.sweep import SWEEP_COLUMNS, sweep, write_report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Sweep the STFT and MFCC parameters over an audio file."
+    )
+    parser.add_argument(
+        "--audio-key",
+        default=AUDIO_FILE_SAX_A3,
+        help="The key of the audio file to analyse.",
+    )
+    for name, help_text in (
+        ("n_fft", "The FFT lengths to try."),
+        ("hop_length", "The hop lengths to try."),
+        ("frame_length", "The window lengths to try (default: n_fft)."),
+        ("n_mfcc", "The numbers of MFCCs to try."),
+    ):
+        parser.add_argument(
+            f"--{name.replace('_', '-')}",
+            dest=name,
+            type=int,
+            nargs="+",
+            help=help_text,
+        )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="The number of worker processes (default: number of CPUs).",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    setup_logging(os.path.abspath(__file__), queued=True)
+    audio_file_path = audio_config.get_audio_file(args.audio_key)
+    if not audio_file_path:
+        logging.error(f"Audio file key '{args.audio_key}' not found.")
+        return 1
+
+    grid = {
+        name: getattr(args, name)
+        for name in ("n_fft", "hop_length", "frame_length", "n_mfcc")
+        if getattr(args, name)
+    }
+    try:
+        rows = sweep(audio_file_path, grid, workers=args.workers)
+    except ValueError as e:
+        logging.error(f"Invalid sweep: {e}")
+        return 1
+
+    print(format_table(rows, SWEEP_COLUMNS))
+    stem = os.path.splitext(os.path.basename(audio_file_path))[0]
+    write_report(
+        rows, output_config.get_output_path("sweeps", f"sweep_{stem}", "csv")
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""Find the audio files that sound most like a given file.
+
+Usage (from the repository root):
+
+    python -m scripts.similar_files --update
+    python -m scripts.similar_files --audio-key sax-baritone_a3 -k 5
+
+``--update`` summarises the MFCCs of the new and changed files of the
+audio directory into the similarity index and drops removed files. The
+query lists the most similar indexed files by the cosine similarity of
+their MFCC summaries.
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+from config.benchmarking import format_table
+from config.config import audio_config
+from config.logging import setup_logging
+from config.similarity import (
+    SimilarityIndex,
+    file_summary,
+    update_similarity_index,
+)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Find the audio files most similar to a given file."
+    )
+    parser.add_argument(
+        "--audio-key",
+        help="The key of the audio file to find similar files for.",
+    )
+    parser.add_argument(
+        "-k",
+        type=int,
+        default=10,
+        help="The number of similar files to list.",
+    )
+    parser.add_argument(
+        "--update",
+        action="store_true",
+        help="Index the new and changed files of the audio directory.",
+    )
+    parser.add_argument(
+        "--exact",
+        action="store_true",
+        help="Scan every indexed file instead of the closest lists.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="The number of processes summarising files.",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    setup_logging(os.path.abspath(__file__), queued=True)
+    index = SimilarityIndex()
+    if args.update:
+        update_similarity_index(
+            index, audio_config.audio_dir, workers=args.workers
+        )
+    if args.audio_key is None:
+        return 0
+
+    if args.audio_key in index:
+        matches = index.query_key(args.audio_key, args.k, exact=args.exact)
+    else:
+        audio_file_path = audio_config.get_audio_file(args.audio_key)
+        if not audio_file_path:
+            logging.error(f"Audio file key '{args.audio_key}' not found.")
+            return 1
+        matches = index.query(
+            file_summary(audio_file_path), args.k, exact=args.exact
+        )
+    rows = [
+        {"rank": rank, "key": key, "similarity": similarity}
+        for rank, (key, similarity) in enumerate(matches, start=1)
+    ]
+    print(format_table(rows, ("rank", "key", "similarity")))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
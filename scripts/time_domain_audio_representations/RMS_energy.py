@@ -1,35 +1,19 @@
 import os
 import sys
 import logging
-import librosa
-import numpy as np
-import matplotlib.pyplot as plt
 
-from config.config import audio_config, output_config
+from config.config import output_config
+from config.decimation import TimeAxis
+from config.features import FeatureEngine, cached_features
 from config.utils import setup_environment, load_audio, create_plot
 from config.parameters import (
     AUDIO_FILE_SAX_A3,
     ORIGINAL_SIGNAL_COLOR,
     RMS_ENERGY_COLOR,
 )
-from config.logging import setup_logging
-from config.matplotlib_plots import configure_plot
-
-# Code Review: Consider moving this to setup_environment()
-# function in config/utils.py
-root_dir = os.path.abspath(os.path.join(os.getcwd(), "../../"))
-if root_dir not in sys.path:
-    sys.path.append(root_dir)
-
-setup_environment()
-
-# Set up logging for this script
-notebook_path = os.path.join(os.getcwd(), "RMS_energy.py")
-setup_logging(notebook_path)
-
-# Set the audio file to analyse
-audio_file_key = AUDIO_FILE_SAX_A3
-audio_file_path = audio_config.get_audio_file(audio_file_key)
+from config.logging import setup_logging, timed
+from config.matplotlib_plots import configure_plot, plot_signal
+from config.rendering import use_headless_backend
 
 
 def analyse_audio(audio_file_key):
@@ -43,21 +27,25 @@ def analyse_audio(audio_file_key):
             - y (np.ndarray): The audio time series.
             - sr (int): The sampling rate of the audio.
             - rms_energy (np.ndarray): The RMS energy of the audio.
-            - time (np.ndarray): The time array for the audio.
+            - time (TimeAxis): The time axis of the audio.
             - t_frames (np.ndarray): The time array for the RMS energy frames.
             - audio_file_path (str): The path to the analyzed audio file.
         Returns (None, None, None, None, None, None) if audio loading fails.
     """
-    y, sr, audio_file_path = load_audio(audio_file_key)
+    y, sr, audio_file_path = load_audio(audio_file_key, analysis="rms")
     if y is None or sr is None:
         return None, None, None, None, None, None
 
-    rms_energy = librosa.feature.rms(y=y)[0]
-    time = np.arange(len(y)) / sr
-    t_frames = librosa.frames_to_time(np.arange(len(rms_energy)), sr=sr)
+    engine = FeatureEngine(y, sr)
+    rms_energy = cached_features(
+        audio_file_path, y, sr, features=("rms",), engine=engine
+    )["rms"]
+    time = TimeAxis(len(y), sr)
+    t_frames = engine.frame_times()
     return y, sr, rms_energy, time, t_frames, audio_file_path
 
 
+@timed("save")
 def save_plot(fig, audio_file_key):
     """Save the plot to the output directory.
 
@@ -73,18 +61,43 @@ def save_plot(fig, audio_file_key):
     logging.info(f"Plot saved to {output_path}")
 
 
-if __name__ == "__main__":
+def main(audio_file_key=AUDIO_FILE_SAX_A3, show=True):
+    if not show:
+        use_headless_backend()
+    import matplotlib.pyplot as plt
+
+    # Code Review: Consider moving this to setup_environment()
+    # function in config/utils.py
+    root_dir = os.path.abspath(os.path.join(os.getcwd(), "../../"))
+    if root_dir not in sys.path:
+        sys.path.append(root_dir)
+
+    setup_environment()
+
+    # Set up logging for this script
+    notebook_path = os.path.join(os.getcwd(), "RMS_energy.py")
+    setup_logging(notebook_path)
+
     y, sr, rms_energy, time, t_frames, audio_file_path = analyse_audio(
-        AUDIO_FILE_SAX_A3
+        audio_file_key
     )
     if y is None:
         logging.error("Failed to analyse audio file")
-        sys.exit(1)
+        return 1
 
     # Plot the original signal and RMS Energy
     fig, ax = create_plot()
-    ax.plot(time, y, color=ORIGINAL_SIGNAL_COLOR, label="Original Signal")
-    ax.plot(t_frames, rms_energy, color=RMS_ENERGY_COLOR, label="RMS Energy")
+    plot_signal(
+        ax, time, y, color=ORIGINAL_SIGNAL_COLOR, label="Original Signal"
+    )
+    plot_signal(
+        ax,
+        t_frames,
+        rms_energy,
+        method="lttb",
+        color=RMS_ENERGY_COLOR,
+        label="RMS Energy",
+    )
     configure_plot(
         ax,
         title=os.path.basename(audio_file_path),
@@ -94,7 +107,14 @@ if __name__ == "__main__":
     plt.tight_layout()
 
     # Save the plot
-    save_plot(fig, AUDIO_FILE_SAX_A3)
+    save_plot(fig, audio_file_key)
 
     # Show the plot
-    plt.show()
+    if show:
+        plt.show()
+    plt.close(fig)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,64 +1,61 @@
 import os
 import sys
 import logging
-import librosa
-import numpy as np
-import matplotlib.pyplot as plt
-import plotly.graph_objs as go
-import plotly.io as pio
-
 
 # Local imports & configurations
-from config.config import audio_config, output_config
+from config.config import audio_config, get_resampler, output_config
+from config.decimation import TimeAxis
+from config.envelopes import amplitude_envelope as sliding_envelope
 from config.parameters import (
     AUDIO_FILE_SAX_A3,
+    DEFAULT_ENVELOPE_FRAME_SIZE,
+    DEFAULT_ENVELOPE_HOP_LENGTH,
     ORIGINAL_SIGNAL_COLOR,
     AMPLITUDE_ENVELOPE_COLOR,
     BACKGROUND_COLOR,
 )
-from config.logging import setup_logging
-from config.matplotlib_plots import configure_plot
-from config.plotly_plots import configure_plotly_layout
-
-
-# Adjust sys.path to include the root directory
-root_dir = os.path.abspath(os.path.join(os.getcwd(), "../../"))
-if root_dir not in sys.path:
-    sys.path.append(root_dir)
-
-# Ensure the config directory is in the path
-config_dir = os.path.join(root_dir, "config")
-if config_dir not in sys.path:
-    sys.path.append(config_dir)
-
-
-# Set up logging for this script
-script_path = os.path.join(os.getcwd(), "amplitude_envelopes.py")
-setup_logging(script_path)
+from config.logging import setup_logging, timed
+from config.matplotlib_plots import configure_plot, plot_signal
+from config.plotly_plots import (
+    configure_plotly_layout,
+    save_html,
+    signal_trace,
+)
+from config.rendering import use_headless_backend
+from config import utils
 
 
 def load_audio_file(audio_file_path):
     """Load an audio file."""
     logging.info(f"Loading audio file from: {audio_file_path}")
-    return librosa.load(audio_file_path, sr=None)
+    return utils.load_analysis_audio(audio_file_path, "envelope")
 
 
-def calculate_amplitude_envelope(y, frame_size=2056, hop_length=128):
+def calculate_amplitude_envelope(
+    y,
+    frame_size=DEFAULT_ENVELOPE_FRAME_SIZE,
+    hop_length=DEFAULT_ENVELOPE_HOP_LENGTH,
+    mode="max",
+    decay=None,
+):
     """Calculate the amplitude envelope of an audio signal."""
     logging.info("Calculating amplitude envelope")
-    frames = librosa.util.frame(
-        y, frame_length=frame_size, hop_length=hop_length
-    )
-    return frames.max(axis=0)
+    return sliding_envelope(y, frame_size, hop_length, mode=mode, decay=decay)
 
 
 def plot_signals(time, y, t_frames, amplitude_envelope, audio_file_path):
     """Plot the original signal and amplitude envelope using matplotlib."""
+    import matplotlib.pyplot as plt
+
     fig, ax = plt.subplots(figsize=(14, 5))
-    ax.plot(time, y, color=ORIGINAL_SIGNAL_COLOR, label="Original Signal")
-    ax.plot(
+    plot_signal(
+        ax, time, y, color=ORIGINAL_SIGNAL_COLOR, label="Original Signal"
+    )
+    plot_signal(
+        ax,
         t_frames,
         amplitude_envelope,
+        method="lttb",
         color=AMPLITUDE_ENVELOPE_COLOR,
         label="Amplitude Envelope",
     )
@@ -67,9 +64,10 @@ def plot_signals(time, y, t_frames, amplitude_envelope, audio_file_path):
         title=os.path.basename(audio_file_path),
         subtitle="Original Signal and Amplitude Envelope",
     )
-    plt.show()
+    return fig
 
 
+@timed("save")
 def save_plot(fig, audio_file_path):
     """Save the plot to the output directory."""
     output_directory = output_config.get_output_directory("time_domain")
@@ -82,30 +80,29 @@ def save_plot(fig, audio_file_path):
         f"AE_{os.path.splitext(os.path.basename(audio_file_path))[0]}.png",
     )
     fig.savefig(output_path, facecolor=BACKGROUND_COLOR)
+    logging.info(f"Plot saved to {output_path}")
 
 
 def plot_interactive_signals(
-    time, y, t_frames, amplitude_envelope, audio_file_path
+    time, y, t_frames, amplitude_envelope, audio_file_path, show=True
 ):
     """Create an interactive plot of the original signal and amplitude envelope
-    using plotly."""
+    using plotly, save it as HTML and optionally show it."""
+    import plotly.graph_objs as go
+    import plotly.io as pio
 
     logging.info("Creating interactive plot")
 
     # Create traces for the original signal and amplitude envelope
-    original_trace = go.Scatter(
-        x=time,
-        y=y,
-        mode="lines",
-        name="Original Signal",
-        line=dict(color=ORIGINAL_SIGNAL_COLOR),
+    original_trace = signal_trace(
+        time, y, "Original Signal", ORIGINAL_SIGNAL_COLOR
     )
-    envelope_trace = go.Scatter(
-        x=t_frames,
-        y=amplitude_envelope,
-        mode="lines",
-        name="Amplitude Envelope",
-        line=dict(color=AMPLITUDE_ENVELOPE_COLOR),
+    envelope_trace = signal_trace(
+        t_frames,
+        amplitude_envelope,
+        "Amplitude Envelope",
+        AMPLITUDE_ENVELOPE_COLOR,
+        method="lttb",
     )
 
     # Use the configure_plotly_layout function
@@ -114,32 +111,59 @@ def plot_interactive_signals(
     # Create the figure
     fig = go.Figure(data=[original_trace, envelope_trace], layout=layout)
 
-    # Show the plot
-    pio.show(fig)
+    # Save the plot as an HTML file, then show it
+    stem = os.path.splitext(os.path.basename(audio_file_path))[0]
+    save_html(
+        fig, output_config.get_output_path("time_domain", f"AE_{stem}", "html")
+    )
+    if show:
+        pio.show(fig)
 
 
-def analyse_audio(audio_file_path, interactive=False):
+def analyse_audio(audio_file_path, interactive=False, show=True):
     """Analyse the audio file and plot the amplitude envelope."""
+    import librosa
+    import matplotlib.pyplot as plt
+
     try:
         y, sr = load_audio_file(audio_file_path)
-        amplitude_envelope = calculate_amplitude_envelope(y)
-        time = np.linspace(0, len(y) / sr, num=len(y))
+        amplitude_envelope = output_config.feature_cache.get_or_compute(
+            audio_file_path,
+            lambda: {"envelope": calculate_amplitude_envelope(y)},
+            feature="envelope",
+            sr=sr,
+            frame_size=DEFAULT_ENVELOPE_FRAME_SIZE,
+            hop_length=DEFAULT_ENVELOPE_HOP_LENGTH,
+            res_type=get_resampler(),
+        )["envelope"]
+        time = TimeAxis(len(y), sr)
         frames_count = amplitude_envelope.shape[0]
         t_frames = librosa.frames_to_time(
-            range(frames_count), sr=sr, hop_length=128
+            range(frames_count),
+            sr=sr,
+            hop_length=DEFAULT_ENVELOPE_HOP_LENGTH,
+        )
+
+        # Save the static plot before anything is shown, so that the saved
+        # figure does not depend on the display
+        fig = plot_signals(
+            time, y, t_frames, amplitude_envelope, audio_file_path
         )
+        save_plot(fig, audio_file_path)
 
         # Choose between interactive and static plotting
         if interactive:
             plot_interactive_signals(
-                time, y, t_frames, amplitude_envelope, audio_file_path
-            )
-        else:
-            plot_signals(
-                time, y, t_frames, amplitude_envelope, audio_file_path
+                time,
+                y,
+                t_frames,
+                amplitude_envelope,
+                audio_file_path,
+                show=show,
             )
-
-        save_plot(plt.gcf(), audio_file_path)
+        elif show:
+            plt.show()
+        plt.close(fig)
         return y, sr, amplitude_envelope, time, t_frames
     except FileNotFoundError:
         logging.error(f"File not found: {audio_file_path}")
@@ -147,16 +171,37 @@ def analyse_audio(audio_file_path, interactive=False):
         logging.error(f"An error occurred: {e}")
 
 
-# Set the audio file to analyse
-audio_file_key = AUDIO_FILE_SAX_A3
-audio_file_path = audio_config.get_audio_file(audio_file_key)
+def main(audio_file_key=AUDIO_FILE_SAX_A3, interactive=True, show=True):
+    if not show:
+        use_headless_backend()
 
-try:
-    # Set interactive=True for plotly, False for matplotlib
-    y, sr, amplitude_envelope, time, t_frames = analyse_audio(
-        audio_file_path, interactive=True
-    )
-    logging.info(f"Successfully analysed audio file {audio_file_path}")
-except Exception as e:
-    logging.error(f"Error analysing audio file {audio_file_path}: {e}")
-    raise
+    # Adjust sys.path to include the root directory
+    root_dir = os.path.abspath(os.path.join(os.getcwd(), "../../"))
+    if root_dir not in sys.path:
+        sys.path.append(root_dir)
+
+    # Ensure the config directory is in the path
+    config_dir = os.path.join(root_dir, "config")
+    if config_dir not in sys.path:
+        sys.path.append(config_dir)
+
+    # Set up logging for this script
+    script_path = os.path.join(os.getcwd(), "amplitude_envelopes.py")
+    setup_logging(script_path)
+
+    # Set the audio file to analyse
+    audio_file_path = audio_config.get_audio_file(audio_file_key)
+
+    try:
+        # Set interactive=True for plotly, False for matplotlib
+        y, sr, amplitude_envelope, time, t_frames = analyse_audio(
+            audio_file_path, interactive=interactive, show=show
+        )
+        logging.info(f"Successfully analysed audio file {audio_file_path}")
+    except Exception as e:
+        logging.error(f"Error analysing audio file {audio_file_path}: {e}")
+        raise
+
+
+if __name__ == "__main__":
+    main()
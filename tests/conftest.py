@@ -0,0 +1,77 @@
+"""Shared fixtures of the test suite.
+
+Every test runs with the caches, stores, indexes and output directories
+in a temporary directory, and with an empty temporary audio directory, so
+that the tests neither read nor write ``local_data``.
+"""
+
+import numpy as np
+import pytest
+
+from config.config import OUTPUT_DIRS, audio_config, output_config
+
+# Settings pointing at the file system, and the file or directory each
+# takes in the temporary directory of a test
+_PATH_SETTINGS = {
+    "AUDIO_DIR": "audio",
+    "FEATURE_CACHE_DIR": "feature_cache",
+    "DECODED_AUDIO_DIR": "decoded_audio",
+    "SPECTROGRAM_TILES_DIR": "spectrogram_tiles",
+    "CATALOGUE_PATH": "audio_catalogue.sqlite",
+    "SIMILARITY_INDEX_PATH": "similarity_index.npz",
+    "BENCHMARK_DIR": "benchmarks",
+}
+
+
+def _reset_configs():
+    """Forget the caches and catalogue built from earlier settings."""
+    for config, name in (
+        (audio_config, "catalogue"),
+        (audio_config, "decoded_audio"),
+        (output_config, "feature_cache"),
+    ):
+        config.__dict__.pop(name, None)
+
+
+@pytest.fixture(autouse=True)
+def local_data(tmp_path, monkeypatch):
+    """Point the path settings and output directories at a temporary
+    directory."""
+    for name, path in _PATH_SETTINGS.items():
+        monkeypatch.setenv(name, str(tmp_path / path))
+    for analysis_type in OUTPUT_DIRS:
+        monkeypatch.setitem(
+            OUTPUT_DIRS,
+            analysis_type,
+            str(tmp_path / "output" / analysis_type),
+        )
+    (tmp_path / "audio").mkdir()
+    _reset_configs()
+    yield tmp_path
+    _reset_configs()
+
+
+@pytest.fixture
+def audio_dir(local_data):
+    """The temporary audio directory."""
+    return local_data / "audio"
+
+
+def sine(frequency=440.0, amplitude=0.5, duration=1.0, sr=22050):
+    """Return a float32 sine wave."""
+    t = np.arange(int(duration * sr)) / sr
+    return (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+
+def write_audio(path, y, sr=22050):
+    """Write a signal, or a (channels, samples) array, as an audio file.
+
+    WAV files are written as float, other formats in their default
+    subtype.
+    """
+    import soundfile as sf
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    subtype = "FLOAT" if path.suffix == ".wav" else None
+    sf.write(str(path), np.asarray(y).T, sr, subtype=subtype)
+    return str(path)
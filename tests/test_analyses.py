@@ -0,0 +1,42 @@
+import os
+
+from config.analyses import arrays_path, output_path, output_stem
+from config.batch import run_batch
+from conftest import sine, write_audio
+
+
+def test_files_sharing_a_stem_get_their_own_outputs(audio_dir):
+    wav = write_audio(audio_dir / "a.wav", sine())
+    flac = write_audio(audio_dir / "a.flac", sine(amplitude=0.2))
+    single = write_audio(audio_dir / "sub" / "b.wav", sine())
+
+    assert output_stem(wav) == "a.wav"
+    assert output_stem(flac) == "a.flac"
+    assert output_stem(single) == "sub_b"
+    assert output_path(wav, "envelope") != output_path(flac, "envelope")
+    assert arrays_path(wav) != arrays_path(flac)
+
+
+def test_outputs_of_files_outside_the_audio_dir_use_their_name(tmp_path):
+    other = write_audio(tmp_path / "elsewhere" / "c.wav", sine())
+
+    assert output_stem(other) == "c"
+
+
+def test_a_second_batch_run_finds_nothing_pending(audio_dir):
+    write_audio(audio_dir / "a.wav", sine())
+    write_audio(audio_dir / "a.flac", sine(amplitude=0.2))
+    analyses = ("envelope", "rms")
+
+    first = run_batch(
+        analyses, audio_dir=str(audio_dir), workers=1, render_workers=1
+    )
+    second = run_batch(
+        analyses, audio_dir=str(audio_dir), workers=1, render_workers=1
+    )
+
+    assert len(first["done"]) == 2 and not first["failed"]
+    assert second["done"] == [] and len(second["skipped"]) == 2
+    for path in first["done"]:
+        for analysis in analyses:
+            assert os.path.exists(output_path(path, analysis))
@@ -0,0 +1,73 @@
+import librosa
+import numpy as np
+import pytest
+
+from config.bases import (
+    dct_basis,
+    mel_basis,
+    mfcc_from_log_mel,
+    project_mel,
+    stft_window,
+)
+
+
+@pytest.fixture
+def power():
+    rng = np.random.default_rng(0)
+    y = (0.1 * rng.standard_normal(22050)).astype(np.float32)
+    return np.abs(librosa.stft(y)) ** 2
+
+
+def test_sparse_mel_projection_matches_dense(power):
+    dense = project_mel(power, 22050, 2048, sparse=False)
+    sparse = project_mel(power, 22050, 2048, sparse=True)
+
+    np.testing.assert_allclose(sparse, dense, rtol=1e-5, atol=1e-8)
+    np.testing.assert_allclose(
+        dense,
+        librosa.feature.melspectrogram(S=power, sr=22050),
+        rtol=1e-5,
+        atol=1e-8,
+    )
+
+
+def test_sparse_mel_projection_of_a_batch_matches_each_spectrogram(power):
+    batch = np.stack([power, 2 * power, power[:, ::-1]])
+
+    mel = project_mel(batch, 22050, 2048, sparse=True)
+
+    assert mel.shape == (3, 128, power.shape[-1])
+    assert mel.flags.c_contiguous
+    for spectrogram, projected in zip(batch, mel):
+        np.testing.assert_allclose(
+            projected,
+            project_mel(spectrogram, 22050, 2048, sparse=False),
+            rtol=1e-5,
+            atol=1e-8,
+        )
+
+
+def test_mfcc_from_log_mel_matches_librosa(power):
+    log_mel = librosa.power_to_db(
+        librosa.feature.melspectrogram(S=power, sr=22050)
+    )
+
+    np.testing.assert_allclose(
+        mfcc_from_log_mel(log_mel, 13),
+        librosa.feature.mfcc(S=log_mel, n_mfcc=13),
+        rtol=1e-4,
+        atol=1e-3,
+    )
+
+
+def test_bases_are_built_once_and_read_only():
+    assert stft_window(2048) is stft_window(2048)
+    assert mel_basis(22050, 2048) is mel_basis(22050, 2048)
+    assert dct_basis(13) is dct_basis(13)
+    np.testing.assert_allclose(
+        stft_window(2048),
+        librosa.filters.get_window("hann", 2048),
+        rtol=1e-6,
+    )
+    with pytest.raises(ValueError):
+        mel_basis(22050, 2048)[0, 0] = 1.0
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+import soundfile as sf
+
+from config.batch_features import (
+    batch_features,
+    batch_file_features,
+    plan_batches,
+)
+from config.features import FeatureEngine
+from conftest import sine, write_audio
+
+FEATURES = ("spectrogram", "mel", "mfcc", "rms")
+
+
+@pytest.fixture
+def clips():
+    rng = np.random.default_rng(0)
+    return [
+        (0.1 * rng.standard_normal(n)).astype(np.float32)
+        for n in (3000, 11025, 20000, 44100, 5000, 11025)
+    ]
+
+
+@pytest.mark.parametrize("block_frames", [7, 128, 10_000])
+def test_batch_features_match_each_clip_on_its_own(clips, block_frames):
+    results = batch_features(
+        clips,
+        22050,
+        features=FEATURES,
+        max_frames=200,
+        block_frames=block_frames,
+    )
+
+    for clip, result in zip(clips, results):
+        engine = FeatureEngine(clip, 22050, memory_budget=0)
+        np.testing.assert_allclose(
+            result["spectrogram"], engine.spectrogram(), atol=1e-5
+        )
+        np.testing.assert_allclose(result["mel"], engine.mel(), rtol=1e-4)
+        np.testing.assert_allclose(result["mfcc"], engine.mfcc(), atol=1e-3)
+        np.testing.assert_allclose(result["rms"], engine.rms(), rtol=1e-5)
+
+
+def test_plan_batches_groups_clips_of_similar_length():
+    lengths = [512 * 99, 512 * 9, 512 * 49, 512 * 10, 512 * 200]
+
+    batches = plan_batches(lengths, 512, max_frames=100)
+
+    # Sorted by length, with at most 100 padded frames per batch
+    assert batches == [[1, 3], [2], [0], [4]]
+
+
+def test_batch_file_features_are_keyed_by_path(audio_dir):
+    paths = [
+        write_audio(audio_dir / "a.wav", sine(duration=0.5)),
+        write_audio(audio_dir / "b.wav", sine(duration=0.5), sr=16000),
+    ]
+
+    results = batch_file_features(paths, features=("mfcc",))
+
+    for path, sr in zip(paths, (22050, 16000)):
+        y, _ = sf.read(path, dtype="float32")
+        np.testing.assert_allclose(
+            results[path]["mfcc"],
+            FeatureEngine(y, sr).mfcc(),
+            atol=1e-3,
+        )
@@ -0,0 +1,82 @@
+import os
+
+import numpy as np
+import pytest
+
+from config.cache import EVICTION_TARGET, FeatureCache
+from conftest import sine, write_audio
+
+
+@pytest.fixture
+def audio_file(audio_dir):
+    return write_audio(audio_dir / "a.wav", sine())
+
+
+def _arrays(n_bytes):
+    return {"frames": np.zeros(n_bytes // 4, dtype=np.float32)}
+
+
+def test_get_or_compute_computes_once_per_parameters(tmp_path, audio_file):
+    cache = FeatureCache(str(tmp_path / "cache"), 10**6)
+    calls = []
+
+    def compute():
+        calls.append(None)
+        return {"frames": np.arange(4, dtype=np.float32)}
+
+    first = cache.get_or_compute(audio_file, compute, feature="x", sr=1)
+    second = cache.get_or_compute(audio_file, compute, feature="x", sr=1)
+    cache.get_or_compute(audio_file, compute, feature="x", sr=2)
+
+    assert len(calls) == 2
+    np.testing.assert_array_equal(first["frames"], second["frames"])
+
+
+def test_key_follows_the_content_of_the_file(tmp_path, audio_dir):
+    cache = FeatureCache(str(tmp_path / "cache"), 10**6)
+    a = write_audio(audio_dir / "a.wav", sine())
+    b = write_audio(audio_dir / "b.wav", sine())
+    c = write_audio(audio_dir / "c.wav", sine(amplitude=0.1))
+
+    assert cache.key(a, sr=1) == cache.key(b, sr=1)
+    assert cache.key(a, sr=1) != cache.key(c, sr=1)
+
+
+def test_eviction_keeps_the_cache_under_its_cap(tmp_path, audio_file):
+    max_bytes = 100_000
+    cache = FeatureCache(str(tmp_path / "cache"), max_bytes)
+
+    for index in range(30):
+        key = cache.key(audio_file, index=index)
+        cache.put(key, _arrays(10_000))
+        assert cache.size() <= max_bytes
+
+    assert cache.size() >= max_bytes * EVICTION_TARGET - 20_000
+    assert cache._total == cache.size()
+
+
+def test_eviction_removes_the_least_recently_used_entries(
+    tmp_path, audio_file
+):
+    cache = FeatureCache(str(tmp_path / "cache"), 35_000)
+    keys = [cache.key(audio_file, index=index) for index in range(4)]
+    for age, key in enumerate(keys[:3]):
+        cache.put(key, _arrays(10_000))
+        # Entries are ordered by modification time, oldest first
+        os.utime(cache._entry_dir(key), (age, age))
+    cache.get(keys[0])
+
+    cache.put(keys[3], _arrays(10_000))
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[3]) is not None
+
+
+def test_a_zero_cap_disables_the_cache(tmp_path, audio_file):
+    cache = FeatureCache(str(tmp_path / "cache"), 0)
+
+    arrays = cache.get_or_compute(audio_file, lambda: _arrays(40), sr=1)
+
+    assert arrays["frames"].shape == (10,)
+    assert not os.path.exists(cache.cache_dir)
@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+from config.catalogue import AudioCatalogue, catalogue_keys
+from config.config import audio_config
+from conftest import sine, write_audio
+
+
+@pytest.fixture
+def catalogue(local_data, audio_dir):
+    write_audio(audio_dir / "long.wav", sine(duration=2.0))
+    write_audio(audio_dir / "sub" / "st.wav", sine(duration=0.5), sr=44100)
+    write_audio(audio_dir / "a.wav", sine(duration=1.0))
+    write_audio(audio_dir / "a.flac", sine(duration=1.0))
+    return AudioCatalogue(
+        str(local_data / "audio_catalogue.sqlite"), str(audio_dir)
+    )
+
+
+def test_update_reads_new_changed_and_removed_files(catalogue, audio_dir):
+    assert catalogue.update()["added"] == 4
+    assert catalogue.update()["unchanged"] == 4
+
+    write_audio(audio_dir / "long.wav", sine(duration=3.0))
+    os.remove(audio_dir / "a.flac")
+    counts = catalogue.update()
+
+    # The remaining a.wav no longer clashes, so it moves to the key "a"
+    assert counts == {"added": 1, "updated": 1, "removed": 2, "unchanged": 1}
+    assert catalogue.get("long")["duration"] == pytest.approx(3.0)
+    assert catalogue.get("a")["path"].endswith("a.wav")
+
+
+def test_keys_keep_the_extension_only_when_stems_clash(catalogue):
+    catalogue.update()
+
+    keys = [entry["key"] for entry in catalogue.filter()]
+
+    assert keys == ["a.flac", "a.wav", "long", "sub/st"]
+    for entry in catalogue.filter():
+        assert catalogue.key_for(entry["path"]) == entry["key"]
+
+
+def test_catalogue_keys_of_a_list_of_files():
+    keys = catalogue_keys(["/d/x.wav", "/d/x.mp3", "/d/s/y.wav"], "/d")
+
+    assert keys == {
+        "/d/x.wav": "x.wav",
+        "/d/x.mp3": "x.mp3",
+        "/d/s/y.wav": "s/y",
+    }
+
+
+def test_filter_and_shards(catalogue):
+    catalogue.update()
+
+    entries = catalogue.filter(min_duration=0.9, sample_rate=22050)
+    shards = catalogue.shards(2)
+
+    assert [entry["key"] for entry in entries] == ["a.flac", "a.wav", "long"]
+    assert sorted(len(shard) for shard in shards) == [2, 2]
+    assert shards[0][0]["key"] == "long"
+
+
+def test_get_audio_file_finds_new_files_without_an_update(catalogue):
+    path = audio_config.get_audio_file("sub/st")
+
+    assert path is not None and path.endswith(os.path.join("sub", "st.wav"))
+    assert audio_config.get_audio_info("sub/st")["sample_rate"] == 44100
+    assert audio_config.get_audio_file("missing") is None
+
+
+def test_other_directories_get_their_own_catalogue(local_data, audio_dir):
+    other = audio_config.catalogue_for(str(local_data / "other"))
+
+    assert audio_config.catalogue_for() is audio_config.catalogue
+    assert audio_config.catalogue_for(str(audio_dir)) is audio_config.catalogue
+    assert other.index_path != audio_config.catalogue.index_path
+    assert os.path.dirname(other.index_path) == str(local_data)
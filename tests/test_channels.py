@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from config.channels import channel_features, split_channels
+from config.features import FeatureEngine
+from conftest import sine, write_audio
+from scripts.channel_report import loudness_rows
+
+
+@pytest.fixture
+def stereo_file(audio_dir):
+    # A loud sine on the left and a quiet one on the right
+    y = np.stack([sine(amplitude=0.4), sine(frequency=660, amplitude=0.08)])
+    return write_audio(audio_dir / "stereo.wav", y)
+
+
+def test_loudness_reads_the_dbfs_of_a_known_sine(stereo_file):
+    rows = loudness_rows(stereo_file, "channels")
+
+    left, right = rows
+    assert left["channel"] == "left" and right["channel"] == "right"
+    # The RMS of a sine of amplitude A is A / sqrt(2)
+    assert left["rms_dbfs"] == pytest.approx(-10.97, abs=0.05)
+    assert left["peak_rms_dbfs"] == pytest.approx(-10.97, abs=0.05)
+    assert left["peak_dbfs"] == pytest.approx(-7.96, abs=0.05)
+    assert right["rms_dbfs"] == pytest.approx(-24.95, abs=0.05)
+    assert right["peak_rms_dbfs"] == pytest.approx(-24.95, abs=0.05)
+    assert right["peak_dbfs"] == pytest.approx(-21.94, abs=0.05)
+
+
+def test_channel_features_match_each_channel_on_its_own(stereo_file):
+    import soundfile as sf
+
+    names, features = channel_features(
+        stereo_file, features=("rms", "spectrogram", "mfcc")
+    )
+
+    y, sr = sf.read(stereo_file, dtype="float32", always_2d=True)
+    assert names == ["left", "right"]
+    for index in range(2):
+        engine = FeatureEngine(y[:, index], sr)
+        np.testing.assert_allclose(features["rms"][index], engine.rms())
+        np.testing.assert_allclose(
+            features["spectrogram"][index], engine.spectrogram(), atol=1e-5
+        )
+        np.testing.assert_allclose(
+            features["mfcc"][index], engine.mfcc(), atol=1e-3
+        )
+
+
+def test_mid_side_splits_the_centre_from_the_width():
+    left, right = sine(amplitude=0.4), sine(amplitude=0.2)
+
+    rows, names = split_channels(np.stack([left, right]), "mid_side")
+
+    assert names == ["mid", "side"]
+    np.testing.assert_allclose(rows[0], (left + right) / 2)
+    np.testing.assert_allclose(rows[1], (left - right) / 2)
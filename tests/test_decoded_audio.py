@@ -0,0 +1,80 @@
+import os
+
+import librosa
+import numpy as np
+import pytest
+
+from config.decoded_audio import DecodedAudioStore
+from conftest import sine, write_audio
+
+
+@pytest.fixture
+def store(tmp_path):
+    return DecodedAudioStore(str(tmp_path / "decoded"), 10**8)
+
+
+@pytest.fixture
+def audio_file(audio_dir):
+    return write_audio(audio_dir / "a.wav", sine(duration=0.5))
+
+
+def test_loads_match_librosa_and_are_memory_mapped(store, audio_file):
+    y, sr = store.load(audio_file)
+    again, _ = store.load(audio_file)
+
+    expected, expected_sr = librosa.load(audio_file, sr=None)
+    assert sr == expected_sr
+    np.testing.assert_array_equal(y, expected)
+    assert isinstance(again, np.memmap)
+
+
+def test_other_rates_are_resampled_once_from_the_stored_pcm(
+    store, audio_file, monkeypatch
+):
+    store.load(audio_file, sr=16000, res_type="soxr_hq")
+    monkeypatch.setattr(
+        "config.decoded_audio.decode_audio",
+        lambda *args, **kwargs: pytest.fail("decoded again"),
+    )
+    monkeypatch.setattr(
+        "config.decoded_audio.resample_audio",
+        lambda *args, **kwargs: pytest.fail("resampled again"),
+    )
+
+    y, sr = store.load(audio_file, sr=16000, res_type="soxr_hq")
+
+    expected, _ = librosa.load(audio_file, sr=16000, res_type="soxr_hq")
+    assert sr == 16000
+    np.testing.assert_allclose(y, expected, atol=1e-6)
+
+
+def test_a_changed_file_is_decoded_again(store, audio_dir, audio_file):
+    store.load(audio_file)
+
+    write_audio(audio_dir / "a.wav", sine(duration=0.5, amplitude=0.1))
+    y, _ = store.load(audio_file)
+
+    assert np.abs(y).max() == pytest.approx(0.1, rel=1e-3)
+
+
+def test_a_touched_file_keeps_its_entry(store, audio_file, monkeypatch):
+    store.load(audio_file)
+    stat = os.stat(audio_file)
+    os.utime(audio_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    monkeypatch.setattr(
+        "config.decoded_audio.decode_audio",
+        lambda *args, **kwargs: pytest.fail("decoded again"),
+    )
+
+    y, _ = store.load(audio_file)
+
+    assert np.abs(y).max() == pytest.approx(0.5, rel=1e-3)
+
+
+def test_a_zero_cap_decodes_every_load(tmp_path, audio_file):
+    store = DecodedAudioStore(str(tmp_path / "decoded"), 0)
+
+    y, sr = store.load(audio_file, mono=False)
+
+    assert sr == 22050 and y.shape == (11025,)
+    assert not os.path.exists(store.cache_dir)
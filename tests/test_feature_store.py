@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from config.analyses import arrays_path
+from config.batch import pending_analyses, run_batch
+from config.feature_store import (
+    FeatureStore,
+    stored_features,
+    stream_to_store,
+    write_features,
+)
+from config.streaming import collect_features, stream_features
+from conftest import sine, write_audio
+
+
+@pytest.fixture
+def audio_file(audio_dir):
+    return write_audio(audio_dir / "a.wav", sine(duration=2.0))
+
+
+def test_read_returns_the_frames_of_a_time_range(tmp_path, audio_file):
+    mfcc = np.arange(13 * 100, dtype=np.float32).reshape(13, 100)
+    path = str(tmp_path / "a.h5")
+    write_features(
+        path, audio_file, {"mfcc": (mfcc, {"sr": 100, "hop_length": 2})}
+    )
+
+    with FeatureStore(path) as store:
+        # 50 frames per second, so 0.5 s to 1 s is frames 25 to 49
+        frames = store.read(["mfcc"], start=0.5, stop=1.0)["mfcc"]
+        times = store.times("mfcc", start=0.5, stop=1.0)
+        info = store.info("mfcc")
+
+    np.testing.assert_array_equal(frames, mfcc[:, 25:50].T)
+    np.testing.assert_allclose(times, np.arange(25, 50) / 50)
+    assert info["shape"] == (100, 13) and info["hop_length"] == 2
+
+
+def test_stored_features_follow_the_version_of_the_source(
+    tmp_path, audio_dir, audio_file
+):
+    path = str(tmp_path / "a.h5")
+    frames = np.zeros((1, 10), dtype=np.float32)
+    write_features(
+        path, audio_file, {"rms": (frames, {"sr": 1, "hop_length": 1})}
+    )
+    write_features(
+        path, audio_file, {"envelope": (frames, {"sr": 1, "hop_length": 1})}
+    )
+
+    assert sorted(stored_features(path, audio_file)) == ["envelope", "rms"]
+    write_audio(audio_dir / "a.wav", sine(duration=1.0))
+    assert stored_features(path, audio_file) == []
+
+
+def test_streaming_into_a_store_matches_the_streamed_frames(
+    tmp_path, audio_file
+):
+    path = str(tmp_path / "a.h5")
+
+    stream_to_store(audio_file, path, features=("envelope", "rms", "mfcc"))
+
+    expected = collect_features(
+        stream_features(audio_file, ("envelope", "rms", "mfcc"))
+    )
+    with FeatureStore(path) as store:
+        stored = store.read()
+    for feature, frames in expected.items():
+        np.testing.assert_array_equal(stored[feature], frames.T)
+
+
+def test_batch_stores_arrays_and_then_finds_nothing_pending(
+    audio_dir, audio_file
+):
+    analyses = ("envelope", "rms", "mfcc")
+
+    summary = run_batch(
+        analyses, workers=1, render_workers=1, store_arrays=True
+    )
+
+    assert summary["done"] == [audio_file]
+    assert pending_analyses(audio_file, analyses, store_arrays=True) == []
+    assert sorted(stored_features(arrays_path(audio_file), audio_file)) == [
+        "envelope",
+        "mfcc",
+        "rms",
+    ]
+    again = run_batch(analyses, workers=1, render_workers=1, store_arrays=True)
+    assert again["skipped"] == [audio_file]
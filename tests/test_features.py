@@ -0,0 +1,105 @@
+import librosa
+import numpy as np
+import pytest
+
+from config.features import FeatureEngine, amplitude_to_db
+from conftest import sine
+
+
+@pytest.fixture
+def y():
+    rng = np.random.default_rng(0)
+    return (0.1 * rng.standard_normal(22050 * 2)).astype(np.float32)
+
+
+@pytest.mark.parametrize("memory_budget", [0, 200_000])
+def test_features_match_librosa(y, memory_budget):
+    engine = FeatureEngine(y, 22050, memory_budget=memory_budget)
+
+    np.testing.assert_allclose(
+        engine.spectrogram(), np.abs(librosa.stft(y)), atol=1e-5
+    )
+    np.testing.assert_allclose(
+        engine.mfcc(),
+        librosa.feature.mfcc(y=y, sr=22050, n_mfcc=13),
+        atol=1e-3,
+    )
+
+
+@pytest.mark.parametrize("memory_budget", [0, 200_000])
+@pytest.mark.parametrize("center", [True, False])
+def test_rms_is_the_time_domain_rms(y, memory_budget, center):
+    rms = FeatureEngine(
+        y, 22050, center=center, memory_budget=memory_budget
+    ).rms()
+
+    expected = librosa.feature.rms(y=y, center=center)[0]
+    np.testing.assert_allclose(rms, expected, rtol=1e-5)
+
+
+def test_rms_of_a_sine_is_its_amplitude_over_root_two():
+    # 40 whole periods per frame of 2048 samples
+    y = sine(frequency=22050 * 40 / 2048, amplitude=0.4)
+    rms = FeatureEngine(y, 22050).rms()
+
+    # The frames away from the zero-padded edges
+    np.testing.assert_allclose(rms[4:-4], 0.4 / np.sqrt(2), rtol=1e-4)
+
+
+def test_multichannel_features_match_each_channel(y):
+    stereo = np.stack([y, 0.5 * y[::-1]])
+    engine = FeatureEngine(stereo, 22050)
+
+    for channel in range(2):
+        mono = FeatureEngine(stereo[channel], 22050)
+        np.testing.assert_allclose(
+            engine.spectrogram()[channel], mono.spectrogram(), atol=1e-5
+        )
+        np.testing.assert_allclose(engine.rms()[channel], mono.rms())
+        np.testing.assert_allclose(
+            engine.mfcc()[channel], mono.mfcc(), atol=1e-3
+        )
+
+
+def test_with_hop_length_matches_direct_computation(y):
+    engine = FeatureEngine(y, 22050, hop_length=256)
+    subsampled = engine.with_hop_length(1024)
+    direct = FeatureEngine(y, 22050, hop_length=1024)
+
+    np.testing.assert_allclose(
+        subsampled.spectrogram(), direct.spectrogram(), atol=1e-5
+    )
+    np.testing.assert_allclose(subsampled.rms(), direct.rms())
+    np.testing.assert_allclose(subsampled.mfcc(), direct.mfcc(), atol=1e-3)
+
+
+def test_amplitude_to_db_matches_librosa(y):
+    S = np.abs(librosa.stft(y))
+
+    np.testing.assert_allclose(
+        amplitude_to_db(S), librosa.amplitude_to_db(S, ref=np.max), atol=1e-4
+    )
+
+
+def test_features_stay_in_float32_within_a_memory_budget(y):
+    chunked = FeatureEngine(y, 22050, memory_budget=100_000)
+    whole = FeatureEngine(y, 22050, memory_budget=0)
+
+    for name in ("spectrogram", "mel", "mfcc", "rms"):
+        values = getattr(chunked, name)()
+        assert values.dtype == np.float32, name
+        np.testing.assert_allclose(
+            values, getattr(whole, name)(), rtol=1e-4, atol=1e-4
+        )
+    # The complex STFT is never held within a budget
+    assert chunked._stft is None
+
+
+def test_amplitude_to_db_converts_in_place(y):
+    S = np.abs(librosa.stft(y)).astype(np.float32)
+    expected = librosa.amplitude_to_db(S, ref=np.max)
+
+    db = amplitude_to_db(S, ref=np.max, out=S)
+
+    assert db is S
+    np.testing.assert_allclose(db, expected, atol=1e-4)
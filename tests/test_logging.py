@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from config.benchmarking import format_table
+from config.logging import (
+    STAGE_SUMMARY_COLUMNS,
+    StageCollector,
+    stage,
+    summarise_stages,
+    trace_stage_memory,
+)
+
+
+@pytest.fixture
+def traced():
+    trace_stage_memory(True)
+    yield
+    trace_stage_memory(False)
+
+
+def _run_stages():
+    records = []
+    with stage("outer") as outer:
+        with stage("inner") as inner:
+            np.ones(2**20)
+        records.append(inner)
+        with stage("inner") as inner:
+            pass
+        records.append(inner)
+    records.append(outer)
+    return records
+
+
+def test_untraced_stages_report_no_peak_memory():
+    rows = {row["stage"]: row for row in summarise_stages(_run_stages())}
+
+    assert rows["inner"]["calls"] == 2
+    assert rows["outer"]["wall_share"] == pytest.approx(1.0)
+    assert rows["inner"]["peak_mb"] is None
+    table = format_table(rows.values(), STAGE_SUMMARY_COLUMNS)
+    peak_column = STAGE_SUMMARY_COLUMNS.index("peak_mb")
+    for line in table.splitlines()[2:]:
+        assert line.split()[peak_column] == "-"
+
+
+def test_traced_stages_report_their_peak_memory(traced):
+    rows = {row["stage"]: row for row in summarise_stages(_run_stages())}
+
+    # The inner peak of 8 MiB counts towards the outer stage as well
+    assert rows["inner"]["peak_mb"] >= 8
+    assert rows["outer"]["peak_mb"] >= rows["inner"]["peak_mb"]
+
+
+def test_collector_matches_summarise_stages():
+    records = _run_stages()
+    collector = StageCollector()
+    for record in records:
+        collector.add(record)
+
+    assert collector.summary() == summarise_stages(records)
+    collector.clear()
+    assert collector.summary() == []
@@ -0,0 +1,55 @@
+import atexit
+import json
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from config import logging as config_logging
+from config.logging import (
+    log_context,
+    setup_logging,
+    stage,
+    stop_queue_listener,
+    worker_initializer,
+)
+
+
+@pytest.fixture
+def log_file(tmp_path, monkeypatch):
+    """Set up queued logging into a log file under a temporary directory."""
+    monkeypatch.setattr(config_logging, "BASE_DIR", str(tmp_path))
+    handlers = logging.root.handlers[:]
+    setup_logging(str(tmp_path / "notebooks" / "run.py"), queued=True)
+    yield tmp_path / "local_data" / "output_logs" / "run.log"
+    stop_queue_listener()
+    atexit.unregister(config_logging._shutdown)
+    logging.root.handlers[:] = handlers
+
+
+def _work(audio_file_path):
+    with log_context(audio_file_path):
+        with stage("work", file=audio_file_path):
+            logging.info(f"Working on {audio_file_path}")
+    return audio_file_path
+
+
+def test_worker_records_reach_the_single_log_file(log_file):
+    paths = [f"/audio/{index}.wav" for index in range(4)]
+
+    with ProcessPoolExecutor(2, **worker_initializer()) as executor:
+        list(executor.map(_work, paths))
+    stop_queue_listener()
+
+    lines = log_file.read_text().splitlines()
+    messages = [line for line in lines if "Working on" in line]
+    stages = [json.loads(line) for line in lines if line.startswith("{")]
+    assert len(messages) == 4 and len(stages) == 4
+    for path in paths:
+        name = path.rsplit("/", 1)[1]
+        (line,) = [line for line in messages if line.endswith(path)]
+        # Each record names the worker process and the file it processed
+        assert "SpawnProcess" in line or "ForkProcess" in line
+        assert f" {name}]" in line
+    assert {record["file"] for record in stages} == set(paths)
+    assert all(record["stage"] == "work" for record in stages)
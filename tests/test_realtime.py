@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from config.envelopes import amplitude_envelope
+from config.features import FeatureEngine
+from config.realtime import RealtimeAnalyser, RingBuffer, replay
+
+
+@pytest.fixture
+def y():
+    rng = np.random.default_rng(0)
+    return (0.1 * rng.standard_normal(22050 + 301)).astype(np.float32)
+
+
+def _collect(frames):
+    chunks = list(frames)
+    return {
+        name: np.concatenate([chunk[name] for chunk in chunks], axis=-1)
+        for name in chunks[0]
+    }
+
+
+@pytest.mark.parametrize("callback_length", [64, 512, 3000])
+def test_streamed_frames_match_the_offline_analyses(y, callback_length):
+    analyser = RealtimeAnalyser(22050, max_callback_length=callback_length)
+
+    streamed = _collect(replay(analyser, y, callback_length))
+
+    engine = FeatureEngine(y, 22050)
+    np.testing.assert_allclose(streamed["rms"], engine.rms(), rtol=1e-5)
+    np.testing.assert_array_equal(streamed["envelope"], amplitude_envelope(y))
+    np.testing.assert_allclose(
+        streamed["mfcc"], engine.mfcc(top_db=None), rtol=1e-4, atol=1e-3
+    )
+
+
+def test_frames_are_emitted_once_their_samples_have_arrived(y):
+    analyser = RealtimeAnalyser(22050, features=("rms",))
+
+    assert analyser.process(y[:1023])["rms"].shape == (0,)
+    assert analyser.process(y[1023:1024])["rms"].shape == (1,)
+    assert analyser.process(y[1024:1536])["rms"].shape == (1,)
+    assert analyser.lookahead == pytest.approx(1024 / 22050)
+    assert [row["frames"] for row in analyser.latency_summary()] == [2]
+
+
+def test_memory_does_not_grow_with_the_stream(y):
+    analyser = RealtimeAnalyser(22050, max_callback_length=512)
+    capacity = analyser.buffer.capacity
+
+    for _ in replay(analyser, np.tile(y, 4), 512):
+        pass
+
+    assert analyser.buffer.capacity == capacity
+    with pytest.raises(ValueError):
+        analyser.process(y[:512])
+
+
+def test_ring_buffer_reads_zeros_outside_the_stream():
+    buffer = RingBuffer(8)
+    buffer.write(np.arange(1, 6, dtype=np.float32))
+    buffer.discard(3)
+    buffer.write(np.arange(6, 12, dtype=np.float32))
+
+    np.testing.assert_array_equal(
+        buffer.read(3, 13), [4, 5, 6, 7, 8, 9, 10, 11, 0, 0]
+    )
+    with pytest.raises(ValueError):
+        buffer.read(2, 4)
+    with pytest.raises(ValueError):
+        buffer.write(np.zeros(1, dtype=np.float32))
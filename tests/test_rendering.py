@@ -0,0 +1,74 @@
+import os
+
+import numpy as np
+import pytest
+
+from config.analyses import ANALYSES, analyse_file, prepare_file
+from config.decimation import pool_frames
+from config.features import amplitude_to_db
+from config.rendering import RenderPool
+from conftest import sine, write_audio
+
+
+def test_pool_frames_pools_groups_of_frames():
+    image = np.arange(20, dtype=np.float32).reshape(2, 10)
+
+    pooled, factor = pool_frames(image, 4, method="max")
+    averaged, _ = pool_frames(image, 4, method="mean")
+
+    assert factor == 3
+    np.testing.assert_array_equal(pooled[0], [2, 5, 8, 9])
+    np.testing.assert_allclose(averaged[0], [1, 4, 7, 9])
+
+
+def test_pool_frames_keeps_images_that_fit():
+    image = np.ones((3, 5))
+
+    pooled, factor = pool_frames(image, 8)
+
+    assert factor == 1 and pooled.dtype == np.float32
+
+
+def test_max_pooling_the_magnitude_gives_the_pooled_db_image():
+    rng = np.random.default_rng(0)
+    magnitude = rng.random((16, 1000)).astype(np.float32) ** 4
+
+    pooled, _ = pool_frames(magnitude, 100, method="max")
+    pooled_db, _ = pool_frames(amplitude_to_db(magnitude), 100, "max")
+
+    np.testing.assert_allclose(amplitude_to_db(pooled), pooled_db, atol=1e-4)
+
+
+def test_plot_data_is_pooled_to_the_figure_width(audio_dir):
+    path = write_audio(audio_dir / "long.wav", sine(duration=60.0))
+
+    prepared = {analysis: data for analysis, data, _ in prepare_file(path)}
+
+    n_frames = 1 + 60 * 22050 // 512
+    for analysis in ("spectrogram", "mfcc"):
+        data = prepared[analysis]
+        factor = data["hop_length"] // 512
+        assert factor > 1
+        assert data["image"].shape[-1] == -(-n_frames // factor)
+
+
+@pytest.mark.parametrize("analysis", sorted(ANALYSES))
+def test_analyse_file_saves_each_figure(audio_dir, analysis):
+    path = write_audio(audio_dir / "a.wav", sine())
+
+    saved = analyse_file(path, (analysis,))
+
+    assert os.path.getsize(saved[analysis]) > 0
+
+
+def test_render_pool_renders_in_worker_processes(audio_dir):
+    path = write_audio(audio_dir / "a.wav", sine())
+
+    futures = []
+    with RenderPool(1) as pool:
+        for analysis, data, output_path in prepare_file(path):
+            draw, kind = ANALYSES[analysis][3:]
+            futures.append(pool.submit(draw, data, output_path, kind))
+
+    for future in futures:
+        assert os.path.getsize(future.result()) > 0
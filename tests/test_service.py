@@ -0,0 +1,156 @@
+import asyncio
+import io
+import json
+
+import numpy as np
+import pytest
+
+from config import service
+from config.config import audio_config
+from config.features import FeatureEngine
+from config.service import AnalysisService, LRUCache
+from conftest import sine, write_audio
+
+
+async def _exchange(service_, request):
+    """Send raw requests to a served AnalysisService and read to the end."""
+    server = await asyncio.start_server(service_.handle, "127.0.0.1", 0)
+    async with server:
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(request)
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), timeout=60)
+        writer.close()
+    return response
+
+
+def _responses(raw):
+    """Split raw HTTP responses into (status, headers, body) triples."""
+    responses = []
+    while raw:
+        head, _, raw = raw.partition(b"\r\n\r\n")
+        status_line, *lines = head.decode("latin-1").split("\r\n")
+        headers = dict(line.split(": ", 1) for line in lines)
+        length = int(headers["Content-Length"])
+        body, raw = raw[:length], raw[length:]
+        responses.append((int(status_line.split()[1]), headers, body))
+    return responses
+
+
+def _get(path, connection="keep-alive"):
+    return f"GET {path} HTTP/1.1\r\nConnection: {connection}\r\n\r\n".encode()
+
+
+def test_features_are_served_as_npy_over_a_kept_alive_connection(
+    audio_dir,
+):
+    y = sine(duration=2.0)
+    write_audio(audio_dir / "tone.wav", y)
+    audio_config.update_catalogue()
+
+    raw = asyncio.run(
+        _exchange(
+            AnalysisService(),
+            _get("/rms/tone") + _get("/rms/tone") + _get("/stats", "close"),
+        )
+    )
+
+    (status, headers, body), repeat, stats = _responses(raw)
+    assert status == 200
+    assert headers["Content-Type"] == "application/x-npy"
+    assert headers["X-Sr"] == "22050" and headers["X-Hop-Length"] == "512"
+    np.testing.assert_allclose(
+        np.load(io.BytesIO(body)), FeatureEngine(y, 22050).rms(), rtol=1e-5
+    )
+    assert repeat[2] == body
+    assert json.loads(stats[2])["hits"] == 1
+    assert stats[1]["Connection"] == "close"
+
+
+def test_concurrent_requests_share_one_computation(audio_dir, monkeypatch):
+    write_audio(audio_dir / "tone.wav", sine())
+    calls = []
+    compute = service._compute
+    monkeypatch.setattr(
+        service,
+        "_compute",
+        lambda *args: calls.append(args) or compute(*args),
+    )
+    analysis_service = AnalysisService()
+
+    async def request_twice():
+        return await asyncio.gather(
+            analysis_service.features("mfcc", "tone"),
+            analysis_service.features("mfcc", "tone"),
+        )
+
+    first, second = asyncio.run(request_twice())
+
+    assert len(calls) == 1
+    assert first[0] == second[0]
+    assert analysis_service._pending == {}
+    assert analysis_service.cache.stats()["entries"] == 1
+
+
+def test_files_added_after_the_catalogue_update_are_found(audio_dir):
+    write_audio(audio_dir / "first.wav", sine())
+    audio_config.update_catalogue()
+    write_audio(audio_dir / "later.wav", sine())
+
+    raw = asyncio.run(
+        _exchange(
+            AnalysisService(),
+            _get("/envelope/later") + _get("/files", "close"),
+        )
+    )
+
+    (status, _, _), (_, _, files) = _responses(raw)
+    assert status == 200
+    assert {"first", "later"} <= set(json.loads(files)["files"])
+
+
+@pytest.mark.parametrize(
+    "request_",
+    [
+        b"GET /" + b"a" * 100_000 + b" HTTP/1.1\r\n\r\n",
+        b"GET /stats HTTP/1.1\r\nX-Long: " + b"a" * 100_000 + b"\r\n\r\n",
+    ],
+    ids=["request line", "header"],
+)
+def test_over_long_lines_are_rejected_and_close_the_connection(request_):
+    raw = asyncio.run(_exchange(AnalysisService(), request_ + _get("/stats")))
+
+    [(status, headers, body)] = _responses(raw)
+    assert status == 431
+    assert headers["Connection"] == "close"
+    assert "too long" in json.loads(body)["error"]
+
+
+def test_unknown_routes_and_keys_are_not_found():
+    raw = asyncio.run(
+        _exchange(
+            AnalysisService(),
+            _get("/rms/missing")
+            + _get("/pitch/tone")
+            + _get("/a/b/c")
+            + b"garbage\r\n\r\n",
+        )
+    )
+
+    statuses = [status for status, _, _ in _responses(raw)]
+    assert statuses == [404, 404, 404, 400]
+
+
+def test_lru_cache_evicts_the_oldest_entries_under_its_cap():
+    cache = LRUCache(max_bytes=10)
+    cache.put("a", b"1234", {})
+    cache.put("b", b"1234", {})
+    cache.get("a")
+    cache.put("c", b"1234", {})
+    cache.put("d", b"x" * 11, {})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == (b"1234", {})
+    assert cache.get("d") is None
+    assert cache.size == 8 <= cache.max_bytes
@@ -0,0 +1,113 @@
+import os
+
+import numpy as np
+import pytest
+
+from config.similarity import (
+    SimilarityIndex,
+    file_summary,
+    summarise_mfcc,
+    update_similarity_index,
+)
+from conftest import sine, write_audio
+
+
+@pytest.fixture
+def vectors():
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((500, 24)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _index(local_data, vectors):
+    index = SimilarityIndex(str(local_data / "index.npz"))
+    keys = [f"file_{i}" for i in range(len(vectors))]
+    sources = np.zeros((len(vectors), 2), dtype=np.int64)
+    index.add(keys, vectors, sources)
+    return index
+
+
+def test_summaries_are_unit_vectors_without_the_level():
+    rng = np.random.default_rng(0)
+    mfcc = rng.standard_normal((13, 50))
+    louder = mfcc.copy()
+    louder[0] += 10.0
+
+    summary = summarise_mfcc(mfcc)
+
+    assert summary.shape == (24,)
+    assert summary.dtype == np.float32
+    assert np.linalg.norm(summary) == pytest.approx(1.0)
+    np.testing.assert_array_equal(summarise_mfcc(louder), summary)
+
+
+def test_exact_query_finds_the_most_similar_files(local_data, vectors):
+    index = _index(local_data, vectors)
+
+    matches = index.query(vectors[7], k=5)
+
+    expected = np.argsort(-(vectors @ vectors[7]), kind="stable")[:5]
+    assert [key for key, _ in matches] == [f"file_{i}" for i in expected]
+    assert matches[0] == ("file_7", pytest.approx(1.0))
+    assert "file_7" not in dict(index.query_key("file_7", k=5))
+
+
+def test_probing_every_list_matches_the_exact_query(local_data, vectors):
+    index = _index(local_data, vectors)
+    index.train(n_lists=10)
+
+    for i in (0, 123, 499):
+        assert index.query(vectors[i], k=10, n_probe=10) == index.query(
+            vectors[i], k=10, exact=True
+        )
+
+
+def test_index_is_saved_and_loaded(local_data, vectors):
+    index = _index(local_data, vectors)
+    index.train(n_lists=10)
+    index.remove(["file_3"])
+    index.save()
+
+    loaded = SimilarityIndex(index.path)
+
+    assert len(loaded) == 499 and "file_3" not in loaded
+    assert loaded.trained
+    assert loaded.query(vectors[8], n_probe=2) == index.query(
+        vectors[8], n_probe=2
+    )
+
+
+def test_update_indexes_only_new_and_changed_files(local_data, audio_dir):
+    write_audio(audio_dir / "low.wav", sine(220.0))
+    write_audio(audio_dir / "high.wav", sine(1760.0))
+    write_audio(audio_dir / "mid.wav", sine(440.0))
+    index = SimilarityIndex()
+
+    first = update_similarity_index(index, workers=1)
+    second = update_similarity_index(SimilarityIndex(), workers=1)
+    os.remove(audio_dir / "mid.wav")
+    write_audio(audio_dir / "low.wav", sine(247.0))
+    third = update_similarity_index(SimilarityIndex(), workers=1)
+
+    assert first == {"added": 3, "removed": 0, "unchanged": 0, "failed": 0}
+    assert second == {"added": 0, "removed": 0, "unchanged": 3, "failed": 0}
+    assert third == {"added": 1, "removed": 1, "unchanged": 1, "failed": 0}
+    index = SimilarityIndex()
+    assert sorted(index.keys) == ["high", "low"]
+    np.testing.assert_allclose(
+        index.vectors[index.keys.index("low")],
+        file_summary(str(audio_dir / "low.wav")),
+        atol=1e-6,
+    )
+
+
+def test_update_of_another_directory_uses_its_own_catalogue(local_data):
+    other_dir = local_data / "other"
+    write_audio(other_dir / "tone.wav", sine())
+
+    counts = update_similarity_index(
+        SimilarityIndex(), str(other_dir), workers=1
+    )
+
+    assert counts["added"] == 1
+    assert SimilarityIndex().keys == ["tone"]
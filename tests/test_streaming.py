@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from config.envelopes import amplitude_envelope
+from config.features import FeatureEngine
+from config.streaming import FrameCarry, collect_features, stream_features
+from conftest import write_audio
+
+
+@pytest.fixture
+def signal():
+    rng = np.random.default_rng(0)
+    return (0.1 * rng.standard_normal(22050 * 3 + 123)).astype(np.float32)
+
+
+@pytest.mark.parametrize("block_length", [1000, 4096, 2**16])
+def test_streamed_features_match_the_in_memory_path(
+    audio_dir, signal, block_length
+):
+    path = write_audio(audio_dir / "a.wav", signal)
+
+    streamed = collect_features(
+        stream_features(path, block_length=block_length)
+    )
+
+    engine = FeatureEngine(signal, 22050, memory_budget=0)
+    np.testing.assert_array_equal(
+        streamed["envelope"], amplitude_envelope(signal)
+    )
+    np.testing.assert_allclose(
+        streamed["spectrogram"], engine.spectrogram(), atol=1e-5
+    )
+    np.testing.assert_allclose(streamed["rms"], engine.rms(), rtol=1e-5)
+    np.testing.assert_allclose(
+        streamed["mfcc"], engine.mfcc(top_db=None), atol=1e-3
+    )
+
+
+def test_frame_carry_yields_every_frame_once():
+    y = np.arange(50, dtype=np.float32)
+    carry = FrameCarry(frame_length=8, hop_length=3, pad=4)
+
+    starts = range(0, 50, 7)
+    chunks = [
+        carry.push(y[start:][:7], final=start + 7 >= 50) for start in starts
+    ]
+
+    frames = np.concatenate(
+        [
+            np.lib.stride_tricks.sliding_window_view(chunk, 8)[::3]
+            for chunk in chunks
+            if len(chunk) >= 8
+        ]
+    )
+    padded = np.concatenate([np.zeros(4), y, np.zeros(4)])
+    expected = np.lib.stride_tricks.sliding_window_view(padded, 8)[::3]
+    np.testing.assert_array_equal(frames, expected)
+
+
+def test_amplitude_envelope_matches_frame_then_max(signal):
+    import librosa
+
+    frames = librosa.util.frame(signal, frame_length=2056, hop_length=128)
+
+    np.testing.assert_array_equal(
+        amplitude_envelope(signal), frames.max(axis=0)
+    )
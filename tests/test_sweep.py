@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from config.features import FeatureEngine
+from config.sweep import SWEEP_COLUMNS, expand_grid, plan_hops, sweep
+from conftest import sine, write_audio
+
+
+@pytest.fixture
+def y():
+    rng = np.random.default_rng(0)
+    return (0.1 * rng.standard_normal(22050)).astype(np.float32)
+
+
+def test_hops_derive_from_the_finest_hop_dividing_them():
+    assert plan_hops([512, 256, 1024, 384, 768]) == {
+        256: 256,
+        384: 384,
+        512: 256,
+        768: 256,
+        1024: 256,
+    }
+
+
+def test_grid_skips_frames_longer_than_the_fft():
+    combinations = expand_grid(
+        {"n_fft": [512, 1024], "frame_length": [None, 1024]}
+    )
+
+    assert [(c["n_fft"], c["frame_length"]) for c in combinations] == [
+        (512, 512),
+        (1024, 1024),
+    ]
+    with pytest.raises(ValueError):
+        expand_grid({"window": ["hann"]})
+
+
+@pytest.mark.parametrize("factor", [2, 3, 4])
+@pytest.mark.parametrize("win_length", [None, 768])
+def test_subsampled_hops_match_direct_computation(y, factor, win_length):
+    fine = FeatureEngine(y, 22050, hop_length=128, win_length=win_length)
+    direct = FeatureEngine(
+        y, 22050, hop_length=128 * factor, win_length=win_length
+    )
+
+    shared = fine.with_hop_length(128 * factor)
+
+    assert shared.n_frames == direct.n_frames
+    np.testing.assert_allclose(
+        shared.spectrogram(), direct.spectrogram(), rtol=1e-6, atol=1e-6
+    )
+    np.testing.assert_allclose(
+        shared.mel(), direct.mel(), rtol=1e-5, atol=1e-8
+    )
+    np.testing.assert_allclose(
+        shared.mfcc(), direct.mfcc(), rtol=1e-5, atol=1e-4
+    )
+    np.testing.assert_array_equal(shared.rms(), direct.rms())
+
+
+def test_hops_that_are_not_multiples_are_rejected(y):
+    with pytest.raises(ValueError):
+        FeatureEngine(y, 22050, hop_length=256).with_hop_length(384)
+
+
+def test_sweep_reports_every_combination(audio_dir):
+    path = write_audio(audio_dir / "tone.wav", sine(duration=2.0))
+    grid = {
+        "n_fft": [1024, 2048],
+        "hop_length": [256, 512, 768],
+        "n_mfcc": [13, 20],
+    }
+
+    rows = sweep(path, grid, workers=1)
+
+    assert len(rows) == 12
+    assert all(set(row) == set(SWEEP_COLUMNS) for row in rows)
+    shared = {
+        row["hop_length"]: row["shared_from"]
+        for row in rows
+        if row["n_fft"] == 1024
+    }
+    assert shared == {256: "-", 512: "hop 256", 768: "hop 256"}
+    reference = next(
+        row
+        for row in rows
+        if (row["n_fft"], row["hop_length"], row["n_mfcc"]) == (2048, 512, 20)
+    )
+    assert reference["mfcc_similarity"] == pytest.approx(1.0)
@@ -0,0 +1,98 @@
+import librosa
+import numpy as np
+import pytest
+
+from config.tiles import SpectrogramViewer, build_pyramid, get_pyramid
+from conftest import write_audio
+
+
+@pytest.fixture
+def audio_file(audio_dir):
+    rng = np.random.default_rng(0)
+    y = (0.1 * rng.standard_normal(22050 * 5)).astype(np.float32)
+    return write_audio(audio_dir / "long.wav", y)
+
+
+def _level(pyramid, level):
+    return np.concatenate(
+        [
+            pyramid.tile(level, index)
+            for index in range(pyramid.levels[level]["n_tiles"])
+        ],
+        axis=1,
+    ).astype(np.float32)
+
+
+def test_level_zero_holds_the_full_spectrogram(audio_file, monkeypatch):
+    # A file libsndfile reads at its native rate is never loaded whole
+    monkeypatch.setattr(
+        "config.tiles.load_audio_file",
+        lambda *args, **kwargs: pytest.fail("loaded the whole file"),
+    )
+
+    pyramid = build_pyramid(audio_file, tile_frames=16)
+
+    y, _ = librosa.load(audio_file, sr=None)
+    expected = librosa.amplitude_to_db(
+        np.abs(librosa.stft(y, center=False)), ref=1.0, top_db=None
+    )
+    np.testing.assert_allclose(_level(pyramid, 0), expected, atol=0.05)
+    assert pyramid.levels[0]["n_tiles"] == -(-expected.shape[1] // 16)
+
+
+def test_reading_block_by_block_matches_loading_the_file(
+    audio_file, tmp_path, monkeypatch
+):
+    streamed = build_pyramid(audio_file, str(tmp_path / "a"), tile_frames=16)
+    monkeypatch.setattr("config.tiles._native_rate", lambda path: None)
+    loaded = build_pyramid(audio_file, str(tmp_path / "b"), tile_frames=16)
+
+    assert streamed.levels == loaded.levels
+    for level in range(len(loaded.levels)):
+        np.testing.assert_array_equal(
+            _level(streamed, level), _level(loaded, level)
+        )
+
+
+def test_each_level_halves_the_frames_down_to_a_single_tile(audio_file):
+    pyramid = build_pyramid(audio_file, tile_frames=16, min_bins=64)
+
+    levels = pyramid.levels
+    assert levels[-1]["n_tiles"] == 1 and levels[-2]["n_tiles"] > 1
+    for finer, coarser in zip(levels, levels[1:]):
+        assert coarser["n_frames"] == -(-finer["n_frames"] // 2)
+        assert coarser["n_bins"] == max(finer["n_bins"] // 2, 64) or (
+            coarser["n_bins"] == finer["n_bins"]
+        )
+    # Pooling keeps the maximum, so the loudest bin survives every level
+    for level in range(len(levels)):
+        assert _level(pyramid, level).max() == pytest.approx(
+            _level(pyramid, 0).max()
+        )
+
+
+def test_viewer_reads_the_coarsest_level_with_a_frame_per_pixel(
+    audio_file,
+):
+    pyramid = build_pyramid(audio_file, tile_frames=16)
+    viewer = SpectrogramViewer(pyramid, width=10)
+
+    level, times, freqs, db = viewer.view(1.0, 2.0)
+
+    # About 43, 21.5 and 10.8 frames per second at levels 0, 1 and 2
+    assert level == 2
+    step = pyramid.frame_seconds(level)
+    assert times[0] <= 1.0 + step and times[-1] >= 2.0
+    assert db.shape == (len(freqs), len(times))
+    # Relative to the loudest bin, up to the float16 rounding of tiles
+    assert db.max() <= 0.05 and db.min() >= -80
+
+
+def test_get_pyramid_reuses_a_fresh_pyramid(audio_file, monkeypatch):
+    pyramid = get_pyramid(audio_file)
+    monkeypatch.setattr(
+        "config.tiles.build_pyramid",
+        lambda *args, **kwargs: pytest.fail("built again"),
+    )
+
+    assert get_pyramid(audio_file).metadata == pyramid.metadata